@@ -0,0 +1,8 @@
+"""
+    benchmarks
+    ~~~~~~~~~~
+
+    End-to-end throughput benchmarks of the salt-rewrite fixes.
+
+    Run them with ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,85 @@
+"""
+    benchmarks.__main__
+    ~~~~~~~~~~~~~~~~~~~
+
+    ``python -m benchmarks`` CLI interface
+"""
+import json
+import pathlib
+import tempfile
+
+import click
+from benchmarks import corpus
+from benchmarks import runner
+from saltrewrite.fixes import Registry
+
+
+@click.command()
+@click.option(
+    "--size",
+    default="small",
+    show_default=True,
+    help=f"Corpus size, one of {', '.join(corpus.SIZES)} or a number of execution modules",
+)
+@click.option("--seed", type=int, default=0, show_default=True, help="Corpus generation seed")
+@click.option(
+    "--fix",
+    "-F",
+    "fixes",
+    type=click.Choice([runner.ALL_FIXES] + Registry.fix_names()),
+    multiple=True,
+    help="Only run these benchmarks. Defaults to every fix on its own and all of them together",
+)
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1, show_default=True)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Run each benchmark this many times and report the fastest run",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.File("w"),
+    default="-",
+    help="Write the JSON results to this file instead of stdout",
+)
+def main(size, seed, fixes, jobs, repeat, output):
+    """
+    Measure the throughput of the salt-rewrite fixes against a synthetic Salt-like corpus
+    """
+    try:
+        corpus.get_size(size)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--size") from exc
+    if not fixes:
+        fixes = Registry.fix_names() + [runner.ALL_FIXES]
+
+    with tempfile.TemporaryDirectory(prefix="salt-rewrite-bench-") as tempdir:
+        corpus_dir = pathlib.Path(tempdir, "corpus")
+        files = corpus.generate_corpus(corpus_dir, size=size, seed=seed)
+        results = {
+            "environment": runner.get_environment(),
+            "corpus": {
+                "size": size,
+                "modules": corpus.get_size(size),
+                "seed": seed,
+                "files": len(files),
+                "bytes": sum(corpus_dir.joinpath(path).stat().st_size for path in files),
+            },
+            "jobs": jobs,
+            "repeat": repeat,
+            "benchmarks": [],
+        }
+        for name in fixes:
+            click.echo(f"Running the {name} benchmark ...", err=True)
+            results["benchmarks"].append(
+                runner.run_benchmark(name, corpus_dir, tempdir, jobs=jobs, repeat=repeat)
+            )
+    json.dump(results, output, indent=2)
+    output.write("\n")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,171 @@
+"""
+    benchmarks.corpus
+    ~~~~~~~~~~~~~~~~~
+
+    Generate a deterministic synthetic corpus resembling the Salt source tree
+"""
+import random
+
+# The number of execution modules, each with its own test module, of each corpus size
+SIZES = {
+    "small": 10,
+    "medium": 100,
+    "large": 1000,
+}
+
+VERSION_NAMES = ("Hydrogen", "Helium", "Lithium", "Beryllium", "Boron", "Carbon")
+
+LEGACY_DECORATORS = (
+    ("slowTest", "slowTest"),
+    ("destructiveTest", "destructiveTest"),
+    ("expensiveTest", "expensiveTest"),
+    ("skip_if_not_root", "skip_if_not_root"),
+    ("requires_network", "requires_network()"),
+    ("requires_salt_modules", 'requires_salt_modules("cmd.run")'),
+    ("requires_salt_states", 'requires_salt_states("pkg.installed")'),
+    ("skip_if_binaries_missing", 'skip_if_binaries_missing("git")'),
+)
+
+UTILS_MODULE = '''\
+"""
+Utility functions of the {name} modules
+"""
+
+
+def helper_{index}(value):
+    return str(value)
+
+
+def other_helper_{index}(value):
+    return repr(value)
+'''
+
+MODULE_HEADER = '''\
+"""
+Execution module {name}
+
+.. versionadded:: {version}
+"""
+import logging
+
+import salt.utils.versions
+{tornado_import}
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = "{name}"
+
+
+def __virtual__():
+    return __virtualname__
+'''
+
+MODULE_FUNCTION = '''
+
+def func_{index}(value):
+    """
+    Return the processed ``value``
+
+    ..  versionchanged:: {version}
+
+    CLI Example:
+        salt '*' {name}.func_{index} value
+    """
+    salt.utils.versions.warn_until("{version}", "The func_{index} function is deprecated")
+    ret = __utils__["{utils_name}.helper_{utils_index}"](value)
+    log.debug("Returning %s", ret)
+    return __salt__["cmd.run"](ret)
+'''
+
+TEST_HEADER = """\
+from unittest import TestCase
+
+from tests.support.helpers import {imports}
+
+
+class {class_name}(TestCase):
+"""
+
+TEST_METHOD = """
+    @{decorator}
+    def test_func_{index}(self):
+        ret = {{"result": True, "comment": "func_{index}"}}
+        self.assertTrue(ret["result"])
+        self.assertEqual(ret["comment"], "func_{index}")
+        self.assertIn("result", ret)
+        self.assertIsNone(ret.get("changes"))
+"""
+
+
+def get_size(size):
+    """
+    Return the number of execution modules of ``size``, a size name or a number
+    """
+    if isinstance(size, str) and not size.isdigit():
+        try:
+            return SIZES[size]
+        except KeyError:
+            raise ValueError(f"Unknown corpus size {size!r}") from None
+    return int(size)
+
+
+def generate_corpus(root, size="small", seed=0):
+    """
+    Write a corpus of ``size`` execution modules and their test modules under ``root``.
+
+    The same ``size`` and ``seed`` always produce the same files. The corpus holds
+    ``salt/modules``, calling ``__utils__`` and ``warn_until`` and importing tornado, with
+    versioned docstrings and CLI examples, the ``salt/utils`` modules they call and unittest
+    style ``tests/unit/modules/test_*.py`` modules using ``self.assert*`` calls and the
+    legacy testsuite decorators.
+
+    Returns the list of the written paths, relative to ``root``.
+    """
+    rng = random.Random(seed)
+    count = get_size(size)
+    utils_count = max(1, count // 5)
+    files = {"salt/__init__.py": "", "salt/modules/__init__.py": "", "salt/utils/__init__.py": ""}
+    files["salt/utils/versions.py"] = "def warn_until(version, message):\n    pass\n"
+    for index in range(utils_count):
+        files[f"salt/utils/bench_util_{index}.py"] = UTILS_MODULE.format(
+            name=f"bench_util_{index}", index=index
+        )
+    for index in range(count):
+        name = f"bench_mod_{index}"
+        tornado_import = rng.choice(
+            ("", "import tornado.gen", "from tornado import gen", "import tornado.ioloop")
+        )
+        chunks = [
+            MODULE_HEADER.format(
+                name=name, version=rng.choice(VERSION_NAMES), tornado_import=tornado_import
+            )
+        ]
+        for func_index in range(rng.randint(3, 12)):
+            utils_index = rng.randrange(utils_count)
+            chunks.append(
+                MODULE_FUNCTION.format(
+                    name=name,
+                    index=func_index,
+                    version=rng.choice(VERSION_NAMES),
+                    utils_name=f"bench_util_{utils_index}",
+                    utils_index=utils_index,
+                )
+            )
+        files[f"salt/modules/{name}.py"] = "".join(chunks)
+
+        decorators = [rng.choice(LEGACY_DECORATORS) for _ in range(rng.randint(2, 10))]
+        chunks = [
+            TEST_HEADER.format(
+                imports=", ".join(sorted({imported for imported, _ in decorators})),
+                class_name=f"BenchMod{index}TestCase",
+            )
+        ]
+        for method_index, (_, decorator) in enumerate(decorators):
+            chunks.append(TEST_METHOD.format(decorator=decorator, index=method_index))
+        files[f"tests/unit/modules/test_{name}.py"] = "".join(chunks)
+
+    for relpath, contents in files.items():
+        path = root.joinpath(*relpath.split("/"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(contents)
+    return sorted(files)
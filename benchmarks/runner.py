@@ -0,0 +1,133 @@
+"""
+    benchmarks.runner
+    ~~~~~~~~~~~~~~~~~
+
+    Run the fixes against a copy of the synthetic corpus and measure them
+"""
+import contextlib
+import hashlib
+import io
+import multiprocessing
+import os
+import pathlib
+import platform
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from saltrewrite import utils
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import Registry
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # Windows
+    resource = None
+
+try:
+    from importlib.metadata import PackageNotFoundError
+    from importlib.metadata import version
+except ImportError:  # pragma: no cover
+    from importlib_metadata import PackageNotFoundError
+    from importlib_metadata import version
+
+# The name of the benchmark running all of the registered fixes in a single run
+ALL_FIXES = "all"
+
+
+def get_environment():
+    """
+    Return the details of the environment the benchmarks run in
+    """
+    try:
+        salt_rewrite_version = version("salt-rewrite")
+    except PackageNotFoundError:
+        salt_rewrite_version = "unknown"
+    return {
+        "salt_rewrite": salt_rewrite_version,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_benchmark(name, corpus, workdir, jobs=1, repeat=1):
+    """
+    Run the benchmark ``name``, either a fix name or ``all``, ``repeat`` times.
+
+    Every run rewrites a fresh copy of ``corpus``, made under ``workdir``, in a new process
+    so that its peak RSS is not skewed by the previous runs. The fastest run is reported.
+    """
+    if name == ALL_FIXES:
+        fix_names = tuple(Registry.fix_names())
+    else:
+        fix_names = (name,)
+    runs = []
+    for index in range(repeat):
+        target = pathlib.Path(workdir, f"{name}-{index}")
+        shutil.copytree(corpus, target)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            runs.append(executor.submit(_run, fix_names, str(target), jobs).result())
+        runs[-1]["changed_files"] = _count_changed_files(corpus, target)
+        shutil.rmtree(target)
+    best = min(runs, key=lambda run: run["seconds"])
+    return {
+        "name": name,
+        "fixes": list(fix_names),
+        "files": best["files"],
+        "changed_files": best["changed_files"],
+        "seconds": best["seconds"],
+        "files_per_second": best["files"] / best["seconds"] if best["seconds"] else None,
+        "peak_rss_bytes": max(run["peak_rss_bytes"] or 0 for run in runs) or None,
+        "runs": [run["seconds"] for run in runs],
+    }
+
+
+def _run(fix_names, target, jobs):
+    """
+    Rewrite ``target`` with ``fix_names``, in the benchmark's own process
+    """
+    # fix_dunder_utils resolves the salt/utils modules from the current directory
+    os.chdir(target)
+    files = sum(1 for _ in utils.iter_python_files(["."]))
+    engine = Engine(Registry.fixes(only_names=fix_names), silent=True, root=target)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        engine.run(["."], jobs=jobs)
+        seconds = time.perf_counter() - start
+    if engine.exceptions:
+        raise RuntimeError(f"{len(engine.exceptions)} file(s) failed to be rewritten")
+    return {"files": files, "seconds": seconds, "peak_rss_bytes": _get_peak_rss()}
+
+
+def _get_peak_rss():
+    """
+    Return the peak RSS, in bytes, of this process or of its largest worker process
+    """
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform != "darwin":
+        peak *= 1024
+    return peak
+
+
+def _count_changed_files(original, target):
+    changed = 0
+    for path in pathlib.Path(original).rglob("*.py"):
+        other = pathlib.Path(target, path.relative_to(original))
+        if _digest(path) != _digest(other):
+            changed += 1
+    return changed
+
+
+def _digest(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
@@ -4,8 +4,18 @@
 
     ``salt-rewrite``'s CLI interface
 """
+import contextlib
+import os
+import sys
+
 import click
+from saltrewrite import config
+from saltrewrite import daemon
+from saltrewrite import git
+from saltrewrite import report as report_formats
+from saltrewrite.cache import ResultCache
 from saltrewrite.fixes import Registry
+from saltrewrite.profiling import Profiler
 
 try:
     from importlib.metadata import version
@@ -39,18 +49,390 @@ except ImportError:
     type=click.Choice(Registry.fix_names(), case_sensitive=False),
     multiple=True,
 )
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    default=None,
+    help=(
+        "Directory holding the cache of unchanged files and the indexes of the salt checkouts. "
+        "Defaults to ~/.cache/salt-rewrite"
+    ),
+)
+@click.option(
+    "--cache/--no-cache",
+    is_flag=True,
+    default=True,
+    help=(
+        "Skip files which are known to produce no changes with the selected fixes. Without "
+        "it, the indexes of the salt checkouts aren't kept either"
+    ),
+)
+@click.option("--clear-cache", is_flag=True, help="Clear the cache of unchanged files and exit")
+@click.option(
+    "--since",
+    metavar="REV",
+    default=None,
+    help="Only rewrite the python files changed since the git revision REV",
+)
+@click.option("--staged", is_flag=True, help="Only rewrite the python files staged in git")
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Don't write any changes, exit with a non-zero code if any file would be rewritten",
+)
+@click.option(
+    "--fail-fast",
+    "-x",
+    is_flag=True,
+    help="With --check, stop at the first file which would be rewritten",
+)
+@click.option(
+    "--exclude",
+    "-e",
+    metavar="GLOB",
+    multiple=True,
+    help="Skip the files and directories matching GLOB. Can be passed multiple times",
+)
+@click.option(
+    "--test-file-pattern",
+    metavar="GLOB",
+    multiple=True,
+    help=(
+        "File name GLOB of the test modules rewritten by the testsuite fixes. "
+        "Can be passed multiple times. Defaults to 'test_*.py'"
+    ),
+)
+@click.option(
+    "--no-path-scoping",
+    is_flag=True,
+    help="Apply every fix to every file, ignoring the path globs each fix is limited to",
+)
+@click.option(
+    "--salt-root",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    envvar="SALT_REWRITE_SALT_ROOT",
+    default=None,
+    help=(
+        "The salt checkout whose salt/utils modules fix_dunder_utils resolves the __utils__ "
+        "calls against. Defaults to the closest directory holding salt/utils looking up from "
+        "each rewritten file"
+    ),
+)
+@click.option(
+    "--hoist-markers",
+    is_flag=True,
+    envvar="SALT_REWRITE_HOIST_MARKERS",
+    help=(
+        "Hoist the markers replacing the legacy test decorators which all of the tests of a "
+        "module, or of a class, share into a single pytestmark"
+    ),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=None,
+    help=(
+        "Number of worker processes. 0 uses one per CPU. Defaults to 1, or, when served by "
+        "the daemon, to its pool of worker processes, which any value above 1 also uses, "
+        "whatever its size"
+    ),
+)
+@click.option(
+    "--profile",
+    type=click.Path(file_okay=True, dir_okay=False, writable=True),
+    default=None,
+    help=(
+        "Write a JSON report of the time spent on each file and by each fix to this path, "
+        "and show the slowest of them"
+    ),
+)
+@click.option(
+    "--profile-top",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Number of the slowest files and fixes shown with --profile",
+)
+@click.option(
+    "--report",
+    type=click.Choice(sorted(report_formats.FORMATS), case_sensitive=False),
+    default=None,
+    help="Report each rewritten file's changes, and the fixes which made them, in this format",
+)
+@click.option(
+    "--report-file",
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, allow_dash=True),
+    default="-",
+    show_default=True,
+    help=(
+        "Stream the --report to this path. When it's written to stdout, the diffs are not "
+        "shown and the fixes' messages go to stderr"
+    ),
+)
+@click.option(
+    "--daemon",
+    "daemon_mode",
+    is_flag=True,
+    help=(
+        "Keep serving the salt-rewrite-client invocations, with the fixes loaded and a pool "
+        "of --jobs worker processes, one per CPU by default, until stopped. The invocations "
+        "not passing --jobs, or passing a value above 1, use the whole pool"
+    ),
+)
+@click.option("--stop-daemon", is_flag=True, help="Stop the running daemon")
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(file_okay=True, dir_okay=False),
+    default=None,
+    help=(
+        "The daemon's socket path. Defaults to $SALT_REWRITE_SOCKET or to "
+        "salt-rewrite-<uid>.sock in $XDG_RUNTIME_DIR"
+    ),
+)
 @click.version_option(version=version("salt-rewrite"))
-def rewrite(paths, interactive, silent, list_fixes, fix, exclude_fix):
+def rewrite(
+    paths,
+    interactive,
+    silent,
+    list_fixes,
+    fix,
+    exclude_fix,
+    cache_dir,
+    cache,
+    clear_cache,
+    since,
+    staged,
+    check,
+    fail_fast,
+    exclude,
+    test_file_pattern,
+    no_path_scoping,
+    salt_root,
+    hoist_markers,
+    jobs,
+    profile,
+    profile_top,
+    report,
+    report_file,
+    daemon_mode,
+    stop_daemon,
+    socket_path,
+):  # pylint: disable=too-many-arguments,too-many-locals
     """
     Main CLI entry-point
     """
     if list_fixes:
-        click.echo("Fixes:\n{}".format("\n".join(f" - {fix}" for fix in Registry.fix_names())))
+        click.echo(
+            "Fixes:\n{}".format(
+                "\n".join(
+                    f" - {fix}: {Registry.fix_info(fix).description}"
+                    for fix in Registry.fix_names()
+                )
+            )
+        )
+        return
+
+    if clear_cache:
+        ResultCache(cache_dir).clear()
+        return
+
+    state = daemon.get_state()
+    if state is not None and (interactive or daemon_mode):
+        # The prompts can't be answered over the socket, the client runs these itself
+        raise daemon.RunLocally()
+
+    if daemon_mode or stop_daemon:
+        if state is not None:
+            raise click.UsageError("The daemon can't be managed through the daemon")
+        if stop_daemon:
+            if not daemon.stop(socket_path):
+                raise click.ClickException("No salt-rewrite daemon is running")
+            return
+        try:
+            daemon.serve(socket_path, jobs=jobs if jobs and jobs > 1 else None)
+        except RuntimeError as exc:
+            raise click.ClickException(str(exc)) from exc
         return
 
     if fix and exclude_fix:
         raise click.UsageError("The --fix and --exclude-fix are mutually exclusive options")
 
-    for fixname, module in Registry.fixes(excluded_names=exclude_fix, only_names=fix):
-        click.echo(f"Running {fixname} ...", err=True)
-        module.rewrite(paths, interactive=interactive, silent=silent)
+    if check and interactive:
+        raise click.UsageError("The --check and --interactive are mutually exclusive options")
+
+    if since and staged:
+        raise click.UsageError("The --since and --staged are mutually exclusive options")
+
+    if since or staged:
+        try:
+            paths = git.get_changed_files(since=since, staged=staged, paths=paths)
+        except RuntimeError as exc:
+            raise click.ClickException(str(exc)) from exc
+        if not paths:
+            click.echo("No changed python files to rewrite", err=True)
+            return
+
+    if not no_path_scoping:
+        try:
+            root, fix_paths = _get_path_scoping(paths)
+        except RuntimeError as exc:
+            raise click.ClickException(str(exc)) from exc
+    else:
+        root = fix_paths = None
+
+    if salt_root:
+        # Passed along to the worker processes, see ``ENVIRONMENT`` in fix_dunder_utils
+        os.environ["SALT_REWRITE_SALT_ROOT"] = os.path.abspath(salt_root)
+    if hoist_markers:
+        # Passed along to the worker processes, see ``ENVIRONMENT`` in fix_legacy_decorators
+        os.environ["SALT_REWRITE_HOIST_MARKERS"] = "1"
+    # The fixes keeping their own indexes in the cache directory also honor these, see
+    # ``ENVIRONMENT`` in fix_dunder_utils
+    if cache_dir:
+        os.environ["SALT_REWRITE_CACHE_DIR"] = os.path.abspath(cache_dir)
+    if not cache:
+        os.environ["SALT_REWRITE_NO_CACHE"] = "1"
+
+    fixes = list(Registry.fixes(excluded_names=exclude_fix, only_names=fix))
+    report_to_stdout = report is not None and report_file == "-"
+    options = _get_engine_options(
+        interactive=interactive,
+        # The diffs would get mixed with the report
+        silent=silent or report_to_stdout,
+        check=check,
+        fail_fast=fail_fast,
+        test_file_patterns=test_file_pattern,
+        exclude=exclude,
+        root=root,
+        fix_paths=fix_paths,
+    )
+
+    with contextlib.ExitStack() as stack:
+        reporter = None
+        if report is not None:
+            reporter = _open_reporter(stack, report.lower(), report_file, fixes)
+
+        def make_engine():
+            return _make_engine(
+                fixes, options, cache=cache, cache_dir=cache_dir, profile=profile, reporter=reporter
+            )
+
+        if state is None or profile:
+            engine = make_engine()
+        else:
+            # Reuse the engine, and its compiled fixers, of the previous invocations with the
+            # same options
+            engine = state.get_engine(
+                _get_engine_key(fixes, cache and cache_dir, options), make_engine
+            )
+            engine.reporter = reporter
+        if jobs is None:
+            # The daemon's pool is already running
+            jobs = 1 if state is None else state.jobs
+        click.echo(f"Running {', '.join(engine.fixes)} ...", err=True)
+        retcode = engine.run(
+            paths,
+            jobs=jobs or os.cpu_count() or 1,
+            executor=None if state is None else state.get_executor(),
+        )
+        if reporter is not None:
+            reporter.finish()
+    if profile:
+        engine.profiler.write(profile)
+        click.echo(engine.profiler.format_report(top=profile_top), err=True)
+    if check:
+        sys.exit(retcode)
+
+
+def _open_reporter(stack, report, report_file, fixes):
+    """
+    Return the started reporter of the ``report`` format, closed along with ``stack``
+    """
+    if report_file == "-":
+        stream = sys.stdout
+        # Keep the fixes' messages out of the report
+        stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+    else:
+        stream = stack.enter_context(open(report_file, "w"))
+    reporter = report_formats.get_reporter(
+        report,
+        stream,
+        rules=[(name, Registry.fix_info(name).description) for name, _ in fixes],
+        version=version("salt-rewrite"),
+    )
+    reporter.start()
+    return reporter
+
+
+def _get_path_scoping(paths):
+    """
+    Return the ``(root, fix_paths)`` pair limiting the fixes to their paths within the
+    project holding ``paths``, wherever salt-rewrite runs from
+    """
+    root = config.find_project_root(config.get_common_parent(paths))
+    if root is None:
+        return None, None
+    return root, config.get_fix_paths(config.load_config(root))
+
+
+def _get_engine_options(
+    interactive=False,
+    silent=False,
+    check=False,
+    fail_fast=False,
+    test_file_patterns=(),
+    exclude=(),
+    root=None,
+    fix_paths=None,
+):  # pylint: disable=too-many-arguments
+    """
+    Return the engine options of an invocation, the defaults being those of the command line
+    """
+    return {
+        "interactive": interactive,
+        "silent": silent,
+        "check": check,
+        "fail_fast": fail_fast,
+        "test_file_patterns": test_file_patterns,
+        "exclude": exclude,
+        "root": root,
+        "fix_paths": fix_paths,
+    }
+
+
+def _make_engine(fixes, options, cache=True, cache_dir=None, profile=None, reporter=None):
+    # Importing the engine imports bowler and fissix, only do it when actually rewriting
+    from saltrewrite.engine import Engine  # pylint: disable=import-outside-toplevel
+
+    return Engine(
+        fixes,
+        cache=ResultCache(cache_dir) if cache else None,
+        profiler=Profiler() if profile else None,
+        reporter=reporter,
+        **options,
+    )
+
+
+def get_default_engine():
+    """
+    Return the ``(key, factory)`` pair of the daemon's engine serving the invocations with
+    the default options from the current working directory
+    """
+    fixes = list(Registry.fixes())
+    root, fix_paths = _get_path_scoping(())
+    options = _get_engine_options(root=root, fix_paths=fix_paths)
+    return _get_engine_key(fixes, None, options), lambda: _make_engine(fixes, options)
+
+
+def _get_engine_key(fixes, cache_dir, options):
+    """
+    Return the key of the daemon's engine matching the invocation's options
+    """
+    environment = [
+        (name, os.environ.get(name))
+        for _, module in fixes
+        for name in getattr(module, "ENVIRONMENT", ())
+    ]
+    return repr(([name for name, _ in fixes], cache_dir, environment, sorted(options.items())))
@@ -0,0 +1,47 @@
+"""
+    saltrewrite.api
+    ~~~~~~~~~~~~~~~
+
+    Rewrite python source code in memory, without touching the filesystem
+"""
+import os
+from functools import lru_cache
+
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import Registry
+
+
+@lru_cache(maxsize=None)
+def _get_fixes(fixes):
+    if fixes is None:
+        return tuple(Registry.fixes())
+    unknown = set(fixes).difference(Registry.fix_names())
+    if unknown:
+        raise ValueError(f"Unknown fixes: {', '.join(sorted(unknown))}")
+    return tuple(Registry.fixes(only_names=fixes))
+
+
+@lru_cache(maxsize=None)
+def _get_engine(fixes, environment):  # pylint: disable=unused-argument
+    # The fixes' queries depend on the ``environment`` they're compiled in
+    return Engine(_get_fixes(fixes))
+
+
+def rewrite_source(source, fixes=None, filename=None):
+    """
+    Rewrite ``source`` and return a ``(new_source, changes)`` tuple.
+
+    ``fixes`` is a list of fix names to run, all of them by default, which still run in
+    their ``FIX_PRIORITY`` order. When ``filename`` is passed, only the fixes which apply
+    to that path run, for example, the testsuite fixes only apply to ``test_*.py`` files.
+
+    ``changes`` is a list of :class:`saltrewrite.engine.Change`.
+    """
+    if fixes is not None:
+        fixes = tuple(fixes)
+    environment = tuple(
+        (name, os.environ.get(name))
+        for _, module in _get_fixes(fixes)
+        for name in getattr(module, "ENVIRONMENT", ())
+    )
+    return _get_engine(fixes, environment).refactor_string(source, filename=filename)
@@ -0,0 +1,215 @@
+"""
+    saltrewrite.cache
+    ~~~~~~~~~~~~~~~~~
+
+    On-disk cache of the files which the fixes left unchanged
+"""
+import functools
+import hashlib
+import logging
+import os
+import pathlib
+import random
+import shutil
+import sys
+import tempfile
+
+try:
+    from importlib.metadata import PackageNotFoundError
+    from importlib.metadata import version
+except ImportError:
+    from importlib_metadata import PackageNotFoundError
+    from importlib_metadata import version
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100000
+# The entries are spread over this many sub-directories, named after the first two hex
+# digits of their key
+SHARDS = 256
+
+
+def get_default_cache_dir():
+    """
+    Return the default cache directory, honoring ``XDG_CACHE_HOME``
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return pathlib.Path(cache_home, "salt-rewrite")
+
+
+def get_version():
+    """
+    Return the installed ``salt-rewrite`` version, ``unknown`` when not installed
+    """
+    try:
+        return version("salt-rewrite")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_tree_digest(path):
+    hasher = hashlib.sha256()
+    for fpath in sorted(pathlib.Path(path).rglob("*.py")):
+        hasher.update(fpath.relative_to(path).as_posix().encode())
+        hasher.update(fpath.read_bytes())
+    return hasher.hexdigest()
+
+
+def get_package_digest(module):
+    """
+    Return the hash of the source code of all the modules of the top level package of
+    ``module``, the helpers it depends on included, or ``""`` if it's not in a package
+    """
+    package = sys.modules.get(module.__name__.partition(".")[0])
+    paths = getattr(package, "__path__", None)
+    if not paths:
+        return ""
+    return "".join(_get_tree_digest(path) for path in sorted(paths))
+
+
+class ResultCache:
+    """
+    Remember which file contents produced no changes for a given set of fixes.
+
+    Each entry is an empty file named after the hash of the file contents, the
+    ``salt-rewrite`` version and the names and source code of the fixes which were applied,
+    along with the source code of the packages they're part of, which holds their helpers.
+    Entries are created atomically and never rewritten, so several ``salt-rewrite``
+    processes can share the same cache directory. Once the cache holds more than
+    ``max_entries`` entries, the least recently used ones are evicted by :meth:`prune`, which
+    :meth:`maybe_prune` only calls when a sample of the cache shows it's needed.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        if path is None:
+            path = get_default_cache_dir()
+        self.path = pathlib.Path(path)
+        self.max_entries = max_entries
+        self._fingerprints = {}
+
+    def get_fingerprint(self, fixes):
+        """
+        Return the hash identifying the ``(name, module)`` pairs in ``fixes``
+        """
+        fixes = tuple(fixes)
+        # The fixes also depend on the environment variables listed in their ``ENVIRONMENT``
+        environment = tuple(
+            (name, os.environ.get(name))
+            for _, module in fixes
+            for name in getattr(module, "ENVIRONMENT", ())
+        )
+        key = (tuple(name for name, _ in fixes), environment)
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is None:
+            hasher = hashlib.sha256(get_version().encode())
+            packages = set()
+            for name, module in fixes:
+                hasher.update(name.encode())
+                hasher.update(pathlib.Path(module.__file__).read_bytes())
+                packages.add(get_package_digest(module))
+            for digest in sorted(packages):
+                hasher.update(digest.encode())
+            if environment:
+                hasher.update(repr(environment).encode())
+            fingerprint = self._fingerprints[key] = hasher.hexdigest()
+        return fingerprint
+
+    def get_key(self, data, fixes):
+        """
+        Return the cache key of the file contents ``data`` when rewritten with ``fixes``
+        """
+        hasher = hashlib.sha256(self.get_fingerprint(fixes).encode())
+        hasher.update(data)
+        return hasher.hexdigest()
+
+    def _entry_path(self, key):
+        return self.path / key[:2] / key
+
+    def __contains__(self, key):
+        entry = self._entry_path(key)
+        try:
+            # Refresh the entry's mtime so that pruning evicts the least recently used entries
+            os.utime(entry)
+        except OSError:
+            return False
+        return True
+
+    def add(self, key):
+        """
+        Record that the contents identified by ``key`` produced no changes
+        """
+        entry = self._entry_path(key)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=entry.parent, prefix=".tmp-")
+            os.close(tmp_fd)
+            os.replace(tmp_path, entry)
+        except OSError as exc:
+            log.debug("Failed to add cache entry %s: %s", entry, exc)
+
+    def entries(self):
+        """
+        Return the paths of all cache entries
+        """
+        if not self.path.is_dir():
+            return []
+        return [
+            entry
+            for entry in self.path.glob("??/*")
+            if not entry.name.startswith(".") and entry.is_file()
+        ]
+
+    def needs_pruning(self, shard=None):
+        """
+        Estimate whether the cache holds more than ``max_entries`` entries.
+
+        The keys being hashes, the entries are evenly spread over the shards, so only the
+        entries of a single ``shard``, picked at random unless passed, are counted.
+        """
+        if shard is None:
+            shard = random.randrange(SHARDS)
+        try:
+            names = os.listdir(self.path / f"{shard:02x}")
+        except OSError:
+            return False
+        return sum(1 for name in names if not name.startswith(".")) * SHARDS > self.max_entries
+
+    def maybe_prune(self):
+        """
+        Call :meth:`prune` if the cache looks like it holds more than ``max_entries`` entries
+        """
+        if not self.needs_pruning():
+            return 0
+        return self.prune()
+
+    def prune(self):
+        """
+        Evict the least recently used entries once there are more than ``max_entries``
+        """
+        entries = self.entries()
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return 0
+        mtimes = {}
+        for entry in entries:
+            try:
+                mtimes[entry] = entry.stat().st_mtime
+            except OSError:
+                # Removed by a concurrent run
+                mtimes[entry] = 0
+        evicted = 0
+        for entry in sorted(entries, key=mtimes.__getitem__)[:excess]:
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                continue
+            evicted += 1
+        return evicted
+
+    def clear(self):
+        """
+        Remove every cache entry
+        """
+        if self.path.is_dir():
+            shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,92 @@
+"""
+    saltrewrite.client
+    ~~~~~~~~~~~~~~~~~~
+
+    ``salt-rewrite-client``, a thin client forwarding its command line to the daemon.
+
+    Only the standard library is imported, unless no daemon is running, in which case the
+    command runs in this process, exactly like ``salt-rewrite`` would. The daemon hands
+    interactive runs, and starting a daemon, back to the client to run in this process.
+"""
+import os
+import socket
+import sys
+
+from saltrewrite import daemon
+
+
+def main(argv=None):
+    """
+    Client entry-point
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    socket_path = _get_socket_path(argv)
+    if "--stop-daemon" in argv:
+        if not daemon.stop(socket_path):
+            print("No salt-rewrite daemon is running", file=sys.stderr)
+            sys.exit(1)
+        return
+    exit_code = None
+    if hasattr(socket, "AF_UNIX"):
+        exit_code = forward(argv, socket_path=socket_path)
+    if exit_code is None:
+        _run_locally(argv)
+    sys.exit(exit_code)
+
+
+def forward(argv, socket_path=None):
+    """
+    Run ``argv`` in the daemon, returning its exit code.
+
+    Returns ``None`` if no daemon is running or if it can't serve ``argv``.
+    """
+    socket_path = socket_path or daemon.get_socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return None
+        with sock.makefile("rwb") as sockfile:
+            daemon.send_message(
+                sockfile,
+                argv=list(argv),
+                cwd=os.getcwd(),
+                env=dict(os.environ),
+                color=sys.stdout.isatty(),
+            )
+            while True:
+                message = daemon.read_message(sockfile)
+                if message is None:
+                    print("The salt-rewrite daemon closed the connection", file=sys.stderr)
+                    return 1
+                if message.get("local"):
+                    return None
+                if "exit" in message:
+                    return message["exit"]
+                for name, stream in (("stdout", sys.stdout), ("stderr", sys.stderr)):
+                    if name in message:
+                        stream.write(message[name])
+                        stream.flush()
+
+
+def _get_socket_path(argv):
+    for idx, arg in enumerate(argv):
+        if arg == "--socket" and idx + 1 < len(argv):
+            return argv[idx + 1]
+        if arg.startswith("--socket="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+def _run_locally(argv):
+    # pylint: disable=import-outside-toplevel
+    from saltrewrite.__main__ import rewrite
+
+    # pylint: enable=import-outside-toplevel
+
+    rewrite.main(args=argv, prog_name="salt-rewrite")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+    saltrewrite.config
+    ~~~~~~~~~~~~~~~~~~
+
+    Load the ``[tool.salt-rewrite]`` configuration from the project's ``pyproject.toml``
+
+    .. code-block:: toml
+
+        [tool.salt-rewrite.paths]
+        # Path globs, relative to the directory holding pyproject.toml, of the files each
+        # fix applies to. They override the fix's own PATHS.
+        fix_dunder_utils = ["salt/**"]
+        fix_asserts = ["tests/**", "tools/tests/**"]
+"""
+import fnmatch
+import logging
+import os
+import pathlib
+
+try:
+    import tomllib
+except ImportError:  # pragma: no cover
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+log = logging.getLogger(__name__)
+
+
+def find_project_root(start=None):
+    """
+    Return the closest directory, from ``start`` upwards, holding a ``pyproject.toml`` file.
+
+    ``start`` defaults to the current working directory. Returns ``None`` if none is found.
+    """
+    start = pathlib.Path(start or os.getcwd()).resolve()
+    for path in (start, *start.parents):
+        if path.joinpath("pyproject.toml").is_file():
+            return path
+    return None
+
+
+def get_common_parent(paths):
+    """
+    Return the deepest directory holding all of the ``paths``, files or directories.
+
+    Defaults to the current working directory when no ``paths`` are passed.
+    """
+    if not paths:
+        return pathlib.Path(os.getcwd()).resolve()
+    resolved = [pathlib.Path(path).resolve() for path in paths]
+    common = pathlib.Path(os.path.commonpath(resolved))
+    if not common.is_dir():
+        common = common.parent
+    return common
+
+
+def load_config(root):
+    """
+    Return the ``[tool.salt-rewrite]`` table of the ``pyproject.toml`` file in ``root``
+    """
+    pyproject = pathlib.Path(root, "pyproject.toml")
+    if not pyproject.is_file():
+        return {}
+    if tomllib is None:
+        log.warning("Not loading %s since neither 'tomllib' nor 'tomli' is available", pyproject)
+        return {}
+    with open(pyproject, "rb") as rfh:
+        try:
+            data = tomllib.load(rfh)
+        except tomllib.TOMLDecodeError as exc:
+            raise RuntimeError(f"Failed to load {pyproject}: {exc}") from exc
+    return data.get("tool", {}).get("salt-rewrite", {})
+
+
+def get_fix_paths(config):
+    """
+    Return the fix name to path globs mapping from the loaded configuration
+    """
+    fix_paths = config.get("paths", {})
+    for name, patterns in fix_paths.items():
+        if isinstance(patterns, str) or not all(isinstance(pattern, str) for pattern in patterns):
+            raise RuntimeError(f"The [tool.salt-rewrite.paths] {name!r} must be a list of globs")
+    return {name: tuple(patterns) for name, patterns in fix_paths.items()}
+
+
+def path_matches(path, patterns):
+    """
+    Check if the ``/`` separated relative ``path`` matches any of the ``patterns`` globs
+    """
+    return any(fnmatch.fnmatchcase(path, pattern) for pattern in patterns)
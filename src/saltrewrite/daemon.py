@@ -0,0 +1,311 @@
+"""
+    saltrewrite.daemon
+    ~~~~~~~~~~~~~~~~~~
+
+    Serve ``salt-rewrite`` invocations from a long lived process over a local Unix socket.
+
+    The daemon, started with ``salt-rewrite --daemon``, keeps the fix modules imported, the
+    fissix grammar loaded, the engines with their compiled fixers, the caches of the fix
+    modules and a pool of worker processes around between invocations, which the
+    ``salt-rewrite-client`` forwards to it.
+
+    Each request is a single JSON line holding the command line arguments, the working
+    directory and the environment of the client. The daemon answers with JSON lines, the
+    ``stdout`` and ``stderr`` output of the invocation and finally its ``exit`` code.
+    Requests are served one at a time since each of them changes the working directory and
+    the environment of the daemon. Invocations which can't be served over the socket, like
+    interactive ones, are answered with ``local`` for the client to run them itself.
+
+    The invocations which don't pass ``--jobs`` are spread over the daemon's pool of worker
+    processes, as are those passing any value above 1, the pool's size being set when the
+    daemon is started. ``--jobs 1`` runs in the daemon's own process.
+"""
+import io
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+
+log = logging.getLogger(__name__)
+
+# The state of the running daemon, ``None`` when not running as a daemon
+_STATE = None
+
+
+def get_socket_path():
+    """
+    Return the path of the daemon's socket.
+
+    Defaults to ``salt-rewrite-<uid>.sock`` in ``$XDG_RUNTIME_DIR``, or the temporary
+    directory, unless ``$SALT_REWRITE_SOCKET`` is set.
+    """
+    path = os.environ.get("SALT_REWRITE_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"salt-rewrite-{os.getuid()}.sock")
+
+
+def get_state():
+    """
+    Return the :class:`DaemonState` when running as a daemon, ``None`` otherwise
+    """
+    return _STATE
+
+
+def send_message(wfile, **message):
+    """
+    Write a JSON line message
+    """
+    wfile.write(json.dumps(message).encode() + b"\n")
+    wfile.flush()
+
+
+def read_message(rfile):
+    """
+    Read a JSON line message, ``None`` once the connection is closed
+    """
+    line = rfile.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class RunLocally(Exception):
+    """
+    Raised for the invocations the daemon can't serve, which the client then runs itself
+    """
+
+
+class DaemonState:
+    """
+    What the daemon keeps around between invocations
+    """
+
+    # The number of engines, one per distinct set of options, kept around
+    MAX_ENGINES = 16
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.engines = OrderedDict()
+        self._executor = None
+
+    def get_engine(self, key, factory):
+        """
+        Return the engine for the ``key`` options, creating it with ``factory`` if needed
+        """
+        engine = self.engines.get(key)
+        if engine is None:
+            engine = self.engines[key] = factory()
+            while len(self.engines) > self.MAX_ENGINES:
+                self.engines.popitem(last=False)
+        else:
+            self.engines.move_to_end(key)
+            engine.reset()
+        return engine
+
+    def get_executor(self):
+        """
+        Return the worker pool shared by all invocations
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+        return self._executor
+
+    def shutdown(self):
+        """
+        Stop the worker pool
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class _StreamWriter(io.TextIOBase):
+    """
+    Forward what's written to ``stdout`` or ``stderr`` to the client
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, wfile, stream):
+        super().__init__()
+        self.wfile = wfile
+        self.stream = stream
+
+    def writable(self):
+        return True
+
+    def write(self, data):  # pylint: disable=arguments-renamed
+        if not isinstance(data, str):
+            # click probes streams with ``write(b"")`` to tell binary ones from text ones
+            raise TypeError(f"write() argument must be str, not {type(data).__name__}")
+        if data:
+            send_message(self.wfile, **{self.stream: data})
+        return len(data)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = read_message(self.rfile)
+        if request is None:
+            return
+        if request.get("command") == "stop":
+            send_message(self.wfile, exit=0)
+            # shutdown() waits for serve_forever() to return, which this request blocks
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        exit_code = _run_request(
+            request,
+            _StreamWriter(self.wfile, "stdout"),
+            _StreamWriter(self.wfile, "stderr"),
+        )
+        if exit_code is None:
+            send_message(self.wfile, local=True)
+            return
+        send_message(self.wfile, exit=exit_code)
+
+
+def _run_request(request, stdout, stderr):
+    """
+    Run the ``salt-rewrite`` command line of ``request`` and return its exit code.
+
+    Returns ``None`` when the client must run it itself.
+    """
+    # pylint: disable=import-outside-toplevel
+    import click
+    from saltrewrite.__main__ import rewrite
+
+    # pylint: enable=import-outside-toplevel
+
+    cwd = os.getcwd()
+    environ = dict(os.environ)
+    try:
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            try:
+                rewrite.main(
+                    args=request["argv"],
+                    prog_name="salt-rewrite",
+                    standalone_mode=False,
+                    color=request.get("color"),
+                )
+            except RunLocally:
+                return None
+            except click.exceptions.Exit as exc:
+                return exc.exit_code
+            except click.ClickException as exc:
+                exc.show()
+                return exc.exit_code
+            except click.Abort:
+                click.echo("Aborted!", err=True)
+                return 1
+            except SystemExit as exc:
+                if exc.code is None or isinstance(exc.code, int):
+                    return exc.code or 0
+                click.echo(exc.code, err=True)
+                return 1
+            except Exception:  # pylint: disable=broad-except
+                click.echo(traceback.format_exc(), err=True)
+                return 1
+        return 0
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+        os.chdir(cwd)
+
+
+class DaemonServer(socketserver.UnixStreamServer):
+    """
+    Serve the requests, one at a time, until asked to stop
+    """
+
+    def __init__(self, socket_path):
+        # Only the current user can connect to the socket
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+
+
+def is_running(socket_path):
+    """
+    Check if a daemon is accepting connections on ``socket_path``
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def serve(socket_path=None, jobs=None):
+    """
+    Run the daemon until it's interrupted or asked to stop
+    """
+    global _STATE  # pylint: disable=global-statement
+    if not hasattr(socket, "AF_UNIX"):
+        raise RuntimeError("The daemon mode is only supported on platforms with Unix sockets")
+    socket_path = socket_path or get_socket_path()
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            raise RuntimeError(f"A salt-rewrite daemon is already running on {socket_path}")
+        # Left behind by a daemon which didn't exit cleanly
+        os.unlink(socket_path)
+
+    _STATE = DaemonState(jobs or os.cpu_count() or 1)
+    try:
+        _warm_up(_STATE)
+        with DaemonServer(socket_path) as server:
+            print(f"Serving salt-rewrite on {socket_path}", file=sys.stderr, flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        _STATE.shutdown()
+        _STATE = None
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def stop(socket_path=None):
+    """
+    Ask the daemon listening on ``socket_path`` to stop. Returns ``False`` if none is
+    """
+    socket_path = socket_path or get_socket_path()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+        with sock.makefile("rwb") as sockfile:
+            send_message(sockfile, command="stop")
+            read_message(sockfile)
+    return True
+
+
+def _warm_up(state):
+    """
+    Compile the fixers of the engine serving the invocations with the default options, from
+    the daemon's working directory, before serving the first request
+    """
+    from saltrewrite.__main__ import get_default_engine  # pylint: disable=import-outside-toplevel
+
+    key, factory = get_default_engine()
+    engine = state.get_engine(key, factory)
+    for stage in engine.get_stages(tuple(engine.fixes)):
+        engine.get_tool(stage)
@@ -0,0 +1,695 @@
+"""
+    saltrewrite.engine
+    ~~~~~~~~~~~~~~~~~~
+
+    Run several fixes against each file while parsing and serializing it only once
+"""
+import difflib
+import importlib
+import io
+import logging
+import os
+import re
+import tokenize
+import uuid
+from collections import namedtuple
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import wraps
+
+import click
+from bowler.tool import BowlerTool
+from bowler.types import BowlerException
+from bowler.types import BowlerQuit
+from fissix.pygram import python_symbols as syms
+from saltrewrite import config
+from saltrewrite import utils
+from saltrewrite.profiling import Profiler
+
+log = logging.getLogger(__name__)
+
+
+class Engine:
+    """
+    Apply the selected fixes to each file in a single parse/serialize cycle.
+
+    Every fix module provides a ``get_query()`` function returning its Bowler ``Query``.
+    The queries are compiled into fissix fixers which are all handed to the same refactoring
+    tool, keeping the ``FIX_PRIORITY`` order in which the fixes are passed in.
+
+    A fix module can list, in ``RUN_AFTER``, the fixes which must be done with the whole
+    file before it runs, and in ``CONFLICTS``, the fixes it must not run along with. The
+    file is then parsed once but traversed in several passes, see :func:`schedule_fixes`.
+
+    A fix module can also set ``TEST_FILES_ONLY = True`` so that it's only applied to the
+    files matching ``test_file_patterns``, and define ``TRIGGERS``, a sequence of substrings
+    or compiled regular expressions of which at least one must be present in the file
+    contents for the fix to be applied. The triggers are checked against the raw file bytes,
+    so files which can't be touched by any fix are never parsed.
+
+    When the project ``root`` is passed, a fix module's ``PATHS``, a sequence of path globs
+    relative to ``root``, limits the files it's applied to. ``fix_paths`` maps fix names to
+    globs which override their ``PATHS``, see :mod:`saltrewrite.config`. Files outside of
+    ``root`` are not path scoped.
+
+    Directories are walked lazily, skipping the paths matching the ``exclude`` globs.
+
+    When a :class:`~saltrewrite.cache.ResultCache` is passed, files whose contents are known
+    to produce no changes with the fixes which apply to them are skipped. Fix modules whose
+    output depends on more than the file contents and the source code of their package must
+    set ``CACHEABLE = False``. The fix modules depending on environment variables list them in
+    ``ENVIRONMENT``, so they're passed along to the worker processes.
+
+    In ``check`` mode nothing is written to disk, the files which would be rewritten are
+    collected in ``changed`` and, with ``fail_fast``, the run stops at the first of them.
+
+    When a :class:`~saltrewrite.profiling.Profiler` is passed, the time spent reading,
+    parsing, serializing and writing each file, and by each fix matching and modifying its
+    nodes, is recorded in it.
+
+    When a :class:`~saltrewrite.report.Reporter` is passed, the :class:`Change` list of each
+    rewritten file is added to it as soon as the file is done with.
+    """
+
+    def __init__(
+        self,
+        fixes,
+        interactive=False,
+        silent=False,
+        cache=None,
+        check=False,
+        fail_fast=False,
+        test_file_patterns=None,
+        exclude=(),
+        root=None,
+        fix_paths=None,
+        profiler=None,
+        reporter=None,
+    ):  # pylint: disable=too-many-arguments
+        self.fixes = OrderedDict(fixes)
+        self.interactive = interactive
+        self.silent = silent
+        self.cache = cache
+        self.check = check
+        self.fail_fast = fail_fast
+        self.test_file_patterns = test_file_patterns or utils.TEST_FILE_PATTERNS
+        self.exclude = tuple(exclude)
+        self.root = None if root is None else os.path.abspath(root)
+        self.fix_paths = dict(fix_paths or {})
+        self.profiler = profiler
+        self.reporter = reporter
+        self.exceptions = []
+        self.changed = []
+        self._fixers = {}
+        self._triggers = {}
+        self._stages = {}
+        self._tools = {}
+        self._output_tool = None
+        self._modifications = []
+        self._id = uuid.uuid4().hex
+        self._run_id = 0
+        # Fail early on circular dependencies
+        self.get_stages(tuple(self.fixes))
+
+    def get_fixers(self, name):
+        """
+        Return the compiled fixers of the fix named ``name``
+        """
+        fixers = self._fixers.get(name)
+        if fixers is None:
+            query = self.fixes[name].get_query()
+            if query is None:
+                fixers = []
+            else:
+                for transform in query.transforms:
+                    transform.callbacks = [
+                        self._track_modifications(name, callback)
+                        for callback in transform.callbacks
+                    ]
+                    if self.profiler is not None:
+                        transform.filters = [
+                            self.profiler.wrap_filter(name, func) for func in transform.filters
+                        ]
+                        transform.callbacks = [
+                            self.profiler.wrap_callback(name, func) for func in transform.callbacks
+                        ]
+                fixers = query.compile()
+                if self.profiler is not None:
+                    fixers = [self.profiler.wrap_fixer(name, fixer) for fixer in fixers]
+            self._fixers[name] = fixers
+        return fixers
+
+    def _track_modifications(self, name, callback):
+        """
+        Wrap ``callback`` to record the original lines of the nodes it actually changes
+        """
+
+        @wraps(callback)
+        def wrapper(node, capture, filename):
+            line_range = _get_line_range(node)
+            snapshot = utils.get_node_snapshot(node)
+            result = callback(node, capture, filename)
+            if utils.is_node_changed(node, snapshot):
+                self._modifications.append((name,) + line_range)
+            return result
+
+        return wrapper
+
+    def get_triggers(self, name):
+        """
+        Return the compiled triggers of the fix named ``name``, ``None`` if it has none
+        """
+        if name not in self._triggers:
+            triggers = getattr(self.fixes[name], "TRIGGERS", None)
+            if triggers is not None:
+                triggers = [_compile_trigger(trigger) for trigger in triggers]
+            self._triggers[name] = triggers
+        return self._triggers[name]
+
+    def get_fix_names(self, filename, data):
+        """
+        Return the names of the fixes which apply to ``filename``, whose contents are ``data``.
+
+        When ``filename`` is ``None`` all fixes are considered, even ``TEST_FILES_ONLY`` and
+        path scoped ones.
+        """
+        fix_names = []
+        is_test_file = filename is None or utils.is_test_file(filename, self.test_file_patterns)
+        relpath = self.get_relative_path(filename)
+        for name, module in self.fixes.items():
+            if not is_test_file and getattr(module, "TEST_FILES_ONLY", False):
+                continue
+            if relpath is not None:
+                patterns = self.fix_paths.get(name, getattr(module, "PATHS", None))
+                if patterns is not None and not config.path_matches(relpath, patterns):
+                    continue
+            triggers = self.get_triggers(name)
+            if triggers is not None and not any(trigger(data) for trigger in triggers):
+                continue
+            if not self.get_fixers(name):
+                continue
+            fix_names.append(name)
+        return tuple(fix_names)
+
+    def get_relative_path(self, filename):
+        """
+        Return the ``/`` separated path of ``filename`` relative to ``root``.
+
+        Returns ``None`` when not path scoping or when ``filename`` is outside of ``root``.
+        """
+        if self.root is None or filename is None:
+            return None
+        relpath = os.path.relpath(os.path.abspath(filename), self.root)
+        if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+            return None
+        return relpath.replace(os.sep, "/")
+
+    def get_stages(self, fix_names):
+        """
+        Return the passes, each a tuple of fix names, which run ``fix_names`` over a file
+        """
+        stages = self._stages.get(fix_names)
+        if stages is None:
+            stages = self._stages[fix_names] = schedule_fixes(fix_names, self.fixes)
+        return stages
+
+    def get_tool(self, fix_names):
+        """
+        Return the refactoring tool which runs the fixers of ``fix_names`` in a single pass
+        """
+        tool = self._tools.get(fix_names)
+        if tool is None:
+            fixers = []
+            for name in fix_names:
+                fixers.extend(self.get_fixers(name))
+            tool = BowlerTool(
+                fixers,
+                write=True,
+                interactive=self.interactive,
+                silent=self.silent,
+                options={"print_function": True},
+            )
+            self._tools[fix_names] = tool
+        return tool
+
+    def get_cache_key(self, fix_names, data):
+        """
+        Return the result cache key for ``data`` rewritten with ``fix_names``.
+
+        Returns ``None`` when not caching or when any of the fixes is not cacheable.
+        """
+        if self.cache is None:
+            return None
+        modules = [(name, self.fixes[name]) for name in fix_names]
+        if not all(getattr(module, "CACHEABLE", True) for _, module in modules):
+            return None
+        return self.cache.get_key(data, modules)
+
+    def refactor_file(self, filename, changes=None):
+        """
+        Run the fixes which apply to ``filename`` and return the resulting diff hunks.
+
+        Nothing is written to disk. Files which produce no changes are added to the cache.
+        When a ``changes`` list is passed, the :class:`Change` list of the file is appended
+        to it.
+        """
+        if self.profiler is not None:
+            self.profiler.start_file(filename)
+        try:
+            with self._measure("read"):
+                with open(filename, "rb") as rfh:
+                    data = rfh.read()
+        except OSError as exc:
+            log.error("Skipping %s: failed to read because %s", filename, exc)
+            return []
+        fix_names = self.get_fix_names(filename, data)
+        if not fix_names:
+            return []
+        cache_key = self.get_cache_key(fix_names, data)
+        if cache_key is not None and cache_key in self.cache:
+            return []
+        try:
+            with self._measure("read"):
+                source = _decode(data)
+        except (SyntaxError, UnicodeDecodeError) as exc:
+            log.error("Skipping %s: failed to read because %s", filename, exc)
+            return []
+        if not source.endswith("\n"):
+            source += "\n"
+        self._modifications = []
+        # Parsing includes the fixes matching and modifying the tree
+        with self._measure("parse"):
+            tree = self._refactor(fix_names, source, filename)
+        if tree is None:
+            return []
+        with self._measure("serialize"):
+            new_source = str(tree)
+            tool = self.get_tool(self.get_stages(fix_names)[0])
+            hunks = tool.processed_file(new_source, filename, source)
+        if not hunks and cache_key is not None:
+            self.cache.add(cache_key)
+        if hunks and changes is not None:
+            changes.extend(get_changes(source, new_source, self._modifications))
+        return hunks
+
+    def _refactor(self, fix_names, source, name):
+        """
+        Parse ``source`` and run ``fix_names`` over it, returning the tree or ``None``
+        """
+        stages = self.get_stages(fix_names)
+        # The imports the fixers add or remove are applied once each pass is done
+        with utils.deferred_imports() as imports:
+            tree = self.get_tool(stages[0]).refactor_string(source, name)
+            if tree is None:
+                return None
+            imports.apply(tree)
+            for stage in stages[1:]:
+                self.get_tool(stage).refactor_tree(tree, name)
+                imports.apply(tree)
+        return tree
+
+    def _measure(self, step, filename=None):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.measure(step, filename=filename)
+
+    def refactor_string(self, source, filename=None):
+        """
+        Run the fixes which apply to ``source`` and return the new source and its changes.
+
+        ``filename`` is only used to select the fixes which apply and in log messages, nothing
+        is read from or written to disk. The changes are a list of :class:`Change`.
+        """
+        fix_names = self.get_fix_names(filename, source.encode())
+        if not fix_names:
+            return source, []
+        name = filename or "<string>"
+        input_source = source if source.endswith("\n") else source + "\n"
+        self._modifications = []
+        tree = self._refactor(fix_names, input_source, name)
+        if tree is None:
+            raise RuntimeError(f"Failed to parse {name}")
+        new_source = str(tree)
+        if input_source != source and new_source.endswith("\n"):
+            new_source = new_source[:-1]
+        return new_source, get_changes(source, new_source, self._modifications)
+
+    def process_hunks(self, filename, hunks, changes=None):
+        """
+        Show, and unless in check mode write to disk, the diff hunks produced for ``filename``
+
+        The ``changes`` of the file are added to the report, if any.
+        """
+        if not hunks:
+            return
+        if self._output_tool is None:
+            self._output_tool = BowlerTool(
+                [],
+                write=not self.check,
+                interactive=self.interactive and not self.check,
+                silent=self.silent,
+            )
+        with self._measure("write", filename=filename):
+            self._output_tool.process_hunks(filename, hunks)
+        if self.reporter is not None and changes:
+            self.reporter.add_file(filename, changes)
+        if self.check:
+            self.changed.append(filename)
+            click.echo(f"Would rewrite {filename} ({len(hunks)} hunk(s))", err=True)
+            if self.fail_fast:
+                raise BowlerQuit()
+
+    def rewrite_file(self, filename):
+        """
+        Rewrite a single file with all the fixes which apply to it
+        """
+        changes = None if self.reporter is None else []
+        hunks, exc = _safe_refactor_file(self, filename, changes)
+        if exc is not None:
+            self.exceptions.append(exc)
+            return
+        self.process_hunks(filename, hunks, changes)
+
+    def get_environment(self):
+        """
+        Return the values of the environment variables listed in the fixes' ``ENVIRONMENT``
+        """
+        return {
+            name: os.environ.get(name)
+            for module in self.fixes.values()
+            for name in getattr(module, "ENVIRONMENT", ())
+        }
+
+    def reset(self):
+        """
+        Forget the results of the previous run, keeping the compiled fixers and tools
+        """
+        self.exceptions = []
+        self.changed = []
+        self._modifications = []
+        for tool in self._tools.values():
+            tool.files = []
+
+    def invalidate_caches(self):
+        """
+        Call the ``invalidate_caches()`` function of the fix modules defining one
+        """
+        for module in self.fixes.values():
+            invalidate_caches = getattr(module, "invalidate_caches", None)
+            if invalidate_caches is not None:
+                invalidate_caches()
+
+    def warm_caches(self, executor):
+        """
+        Call the ``warm_caches(executor)`` function of the fix modules defining one
+        """
+        for module in self.fixes.values():
+            warm_caches = getattr(module, "warm_caches", None)
+            if warm_caches is not None:
+                warm_caches(executor)
+
+    def run(self, paths, jobs=1, executor=None):
+        """
+        Rewrite the passed in paths.
+
+        With ``jobs`` greater than one, the files are refactored by a single pool of ``jobs``
+        worker processes, shared by all fixes, which is fed the largest files first so that
+        a few big modules don't end up as the tail of the run. The diffs are still shown and
+        written by this process. An already running ``executor`` can be passed to be used as
+        the pool, which is then not shut down when done.
+
+        Fix modules can define an ``invalidate_caches()`` function, called before each run,
+        to drop whatever they cached which might be stale by then. When a pool is used, they
+        can also define a ``warm_caches(executor)`` function, called before the files are
+        dispatched to the pool, to compute what they cache once, using the pool, for the
+        workers to share.
+
+        Returns ``1`` if any file failed to be transformed or, in check mode, if any file
+        would be rewritten. ``0`` otherwise.
+        """
+        if not paths:
+            paths = ["."]
+        self._run_id += 1
+        self.invalidate_caches()
+        filenames = utils.iter_python_files(paths, exclude=self.exclude)
+        try:
+            if jobs > 1:
+                filenames = list(filenames)
+                jobs = min(jobs, len(filenames))
+            if jobs > 1:
+                if executor is None:
+                    with ProcessPoolExecutor(max_workers=jobs) as executor:
+                        self._run_in_pool(filenames, executor)
+                else:
+                    self._run_in_pool(filenames, executor)
+            else:
+                for filename in filenames:
+                    self.rewrite_file(filename)
+        except BowlerQuit:
+            pass
+        if self.cache is not None:
+            self.cache.maybe_prune()
+        if self.check:
+            click.echo(f"{len(self.changed)} file(s) would be rewritten", err=True)
+        return int(bool(self.exceptions or self.changed))
+
+    def _run_in_pool(self, filenames, executor):
+        self.warm_caches(executor)
+        filenames = sorted(filenames, key=_get_size, reverse=True)
+        fixes = [(name, module.__name__) for name, module in self.fixes.items()]
+        options = {
+            "cache": self.cache,
+            "test_file_patterns": self.test_file_patterns,
+            "root": self.root,
+            "fix_paths": self.fix_paths,
+            "profiler": None if self.profiler is None else Profiler(),
+        }
+        task = (self._id, self._run_id, os.getcwd(), self.get_environment(), fixes, options)
+        report = self.reporter is not None
+        futures = {
+            executor.submit(_refactor_in_worker, task, filename, report): filename
+            for filename in filenames
+        }
+        try:
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    hunks, changes, error, profile = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    log.error("Skipping %s: failed to transform because %s", filename, exc)
+                    hunks, changes, error, profile = [], None, exc, None
+                if profile is not None:
+                    self.profiler.files[filename] = profile
+                if error is not None:
+                    self.exceptions.append(error)
+                    continue
+                self.process_hunks(filename, hunks, changes)
+        except BowlerQuit:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+# The engines of each worker process in the pools used by ``Engine.run``, by engine ID.
+# A long lived pool serves several engines, only the most recently used ones are kept.
+_WORKER_ENGINES = OrderedDict()
+_MAX_WORKER_ENGINES = 8
+
+
+def _get_worker_engine(task):
+    engine_id, run_id, cwd, environment, fixes, options = task
+    if os.getcwd() != cwd:
+        os.chdir(cwd)
+    for name, value in environment.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+    engine = _WORKER_ENGINES.get(engine_id)
+    if engine is None:
+        engine = _WORKER_ENGINES[engine_id] = Engine(
+            [(name, importlib.import_module(modname)) for name, modname in fixes], **options
+        )
+        while len(_WORKER_ENGINES) > _MAX_WORKER_ENGINES:
+            _WORKER_ENGINES.popitem(last=False)
+    else:
+        _WORKER_ENGINES.move_to_end(engine_id)
+    if engine._run_id != run_id:  # pylint: disable=protected-access
+        engine._run_id = run_id  # pylint: disable=protected-access
+        engine.reset()
+        engine.invalidate_caches()
+    return engine
+
+
+def _refactor_in_worker(task, filename, report):
+    engine = _get_worker_engine(task)
+    changes = [] if report else None
+    hunks, exc = _safe_refactor_file(engine, filename, changes)
+    profile = None
+    if engine.profiler is not None:
+        profile = engine.profiler.files.pop(filename, None)
+    return hunks, changes, exc, profile
+
+
+def _safe_refactor_file(engine, filename, changes=None):
+    """
+    Return the ``(hunks, exception)`` pair resulting from refactoring ``filename``
+    """
+    try:
+        return engine.refactor_file(filename, changes), None
+    except BowlerException as exc:
+        log.exception("Bowler exception during transform of %s: %s", filename, exc)
+        return [], exc
+    except Exception as exc:  # pylint: disable=broad-except
+        log.exception("Skipping %s: failed to transform because %s", filename, exc)
+        return [], exc
+
+
+class Change(namedtuple("Change", "fixes, start, end, before, after")):
+    """
+    A changed region of a file.
+
+    ``start`` and ``end`` delimit the replaced lines of the original source, 1-based with
+    ``end`` excluded, so an insertion has ``start == end``. ``before`` and ``after`` hold the
+    original and new text of the region and ``fixes`` the names of the fixes which changed it.
+    """
+
+    __slots__ = ()
+
+
+def schedule_fixes(fix_names, modules):
+    """
+    Group ``fix_names``, in ``FIX_PRIORITY`` order, into the passes which run them.
+
+    A fix runs in a later pass than the fixes listed in its module's ``RUN_AFTER`` and in
+    another pass than the fixes listed in its or their ``CONFLICTS``, when those also run.
+    Otherwise a fix runs in the earliest pass possible, so fixes which don't depend on each
+    other share a pass. ``modules`` maps the fix names to their modules.
+
+    Raises ``RuntimeError`` on circular dependencies.
+    """
+    selected = set(fix_names)
+    conflicts = {name: set() for name in fix_names}
+    for name in fix_names:
+        for other in getattr(modules[name], "CONFLICTS", ()):
+            if other in selected and other != name:
+                conflicts[name].add(other)
+                conflicts[other].add(name)
+    passes = {}
+    visiting = []
+
+    def place(name):
+        if name in passes:
+            return passes[name]
+        if name in visiting:
+            cycle = visiting[visiting.index(name) :] + [name]
+            raise RuntimeError(f"Circular fix dependencies: {' -> '.join(cycle)}")
+        visiting.append(name)
+        index = max(
+            (
+                place(other) + 1
+                for other in getattr(modules[name], "RUN_AFTER", ())
+                if other in selected
+            ),
+            default=0,
+        )
+        visiting.pop()
+        while any(passes.get(other) == index for other in conflicts[name]):
+            index += 1
+        passes[name] = index
+        return index
+
+    for name in fix_names:
+        place(name)
+    return tuple(
+        tuple(name for name in fix_names if passes[name] == index)
+        for index in sorted(set(passes.values()))
+    )
+
+
+def get_changes(source, new_source, modifications):
+    """
+    Return the list of :class:`Change` between ``source`` and ``new_source``.
+
+    ``modifications`` are ``(fix_name, first_line, last_line)`` tuples of the original lines
+    the fixes modified, used to attribute each change. The modifications fully contained in
+    a change are preferred over the ones which merely overlap it. A change no modification
+    overlaps, like an added import, is attributed to all the fixes which modified the source.
+    """
+    if source == new_source:
+        return []
+    lines = source.splitlines(True)
+    new_lines = new_source.splitlines(True)
+    all_fixes = tuple(OrderedDict.fromkeys(name for name, _, _ in modifications))
+    changes = []
+    matcher = difflib.SequenceMatcher(None, lines, new_lines, autojunk=False)
+    for tag, idx1, idx2, jdx1, jdx2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        start, end = idx1 + 1, idx2 + 1
+        overlapping = [
+            (name, first, last)
+            for name, first, last in modifications
+            if first < max(end, start + 1) and last >= start
+        ]
+        contained = [
+            (name, first, last) for name, first, last in overlapping if start <= first <= last < end
+        ]
+        fixes = tuple(OrderedDict.fromkeys(name for name, _, _ in contained or overlapping))
+        changes.append(
+            Change(
+                fixes or all_fixes,
+                start,
+                end,
+                "".join(lines[idx1:idx2]),
+                "".join(new_lines[jdx1:jdx2]),
+            )
+        )
+    return changes
+
+
+def _get_line_range(node):
+    """
+    Return the first and last lines of ``node`` in the source it was parsed from.
+
+    The decorators of a decorated class or function are included.
+    """
+    if node.parent is not None and node.parent.type == syms.decorated:  # pylint: disable=no-member
+        node = node.parent
+    last_leaf = node
+    while last_leaf.children:
+        last_leaf = last_leaf.children[-1]
+    return node.get_lineno(), last_leaf.lineno + last_leaf.value.count("\n")
+
+
+def _decode(data):
+    """
+    Decode the python source ``data`` using its declared encoding, like fissix does
+    """
+    encoding = tokenize.detect_encoding(io.BytesIO(data).readline)[0]
+    return data.decode(encoding)
+
+
+def _get_size(filename):
+    try:
+        return os.path.getsize(filename)
+    except OSError:
+        return 0
+
+
+def _compile_trigger(trigger):
+    """
+    Return a callable which checks if ``trigger`` is found in the passed bytes
+    """
+    if isinstance(trigger, str):
+        trigger = trigger.encode()
+    if isinstance(trigger, bytes):
+        return lambda data: trigger in data
+    pattern = trigger.pattern
+    flags = trigger.flags
+    if isinstance(pattern, str):
+        pattern = pattern.encode()
+        flags &= ~re.UNICODE
+    return re.compile(pattern, flags).search
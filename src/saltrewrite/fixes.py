@@ -2,9 +2,29 @@
     saltrewrite.fixes
     ~~~~~~~~~~~~~~~~~
 
-    Entry point for all the salt rewrite fixes
+    Entry point for all the salt rewrite fixes.
+
+    Third-party packages can provide their own fixes by registering their fix modules in the
+    ``salt_rewrite.fixes`` entry-point group, the entry-point name being the fix name:
+
+    .. code-block:: toml
+
+        [project.entry-points."salt_rewrite.fixes"]
+        fix_foo_extension = "saltext.foo.rewrite.fix_foo_extension"
+
+    Like the built-in ones, a fix module provides a ``get_query()`` function and optionally
+    sets ``FIX_PRIORITY``, ``RUN_AFTER``, ``CONFLICTS``, ``TRIGGERS``, ``PATHS``,
+    ``TEST_FILES_ONLY`` and ``CACHEABLE``.
+
+    A fix doing the work of several others lists them in ``SUBSETS``. Those are not run
+    along with it, are excluded along with it, and it's replaced by the ones which remain
+    when any of them is excluded.
+    Plugin modules are only imported when their fix is selected to run.
 """
+import importlib
+import logging
 import operator
+from collections import namedtuple
 from collections import OrderedDict
 
 import saltrewrite.imports
@@ -12,45 +32,157 @@ import saltrewrite.salt
 import saltrewrite.salt_extensions
 import saltrewrite.testsuite
 
+try:
+    from importlib.metadata import entry_points
+except ImportError:  # pragma: no cover
+    from importlib_metadata import entry_points
+
+log = logging.getLogger(__name__)
+
+# The entry-point group third-party packages register their fix modules in
+ENTRY_POINT_GROUP = "salt_rewrite.fixes"
+
+
+class FixInfo(namedtuple("FixInfo", "name, module, priority, description")):
+    """
+    The static metadata of a fix.
+
+    ``module`` is the full name of the fix module, which is only imported when the fix is
+    selected to run. The ``priority`` of plugin fixes is ``None`` since it's only known once
+    their module is imported.
+    """
+
+    __slots__ = ()
+
 
 class RegistryClass:
     """
     Registry class to hold all available fixes
     """
 
-    __slots__ = ("__fixes__",)
+    __slots__ = ("__fixes__", "__plugins_loaded__")
 
     def __init__(self):
-        __fixes__ = (
-            saltrewrite.imports.__fixes__
-            + saltrewrite.testsuite.__fixes__
-            + saltrewrite.salt.__fixes__
-            + saltrewrite.salt_extensions.__fixes__
-        )
+        __fixes__ = []
+        for package in (
+            saltrewrite.imports,
+            saltrewrite.testsuite,
+            saltrewrite.salt,
+            saltrewrite.salt_extensions,
+        ):
+            for priority, modname, description in package.__fixes__:
+                __fixes__.append(
+                    FixInfo(modname, f"{package.__name__}.{modname}", priority, description)
+                )
         __sorted_fixes__ = (
-            (module.__name__.split(".")[-1], module)
-            for (priority, module) in sorted(__fixes__, key=operator.itemgetter(0))
+            (info.name, info) for info in sorted(__fixes__, key=operator.attrgetter("priority"))
         )
         self.__fixes__ = OrderedDict(__sorted_fixes__)
+        self.__plugins_loaded__ = False
+
+    def _load_plugins(self):
+        """
+        Add the fixes registered in the ``salt_rewrite.fixes`` entry-point group, once
+        """
+        if self.__plugins_loaded__:
+            return
+        self.__plugins_loaded__ = True
+        for entry_point in _iter_entry_points(ENTRY_POINT_GROUP):
+            if entry_point.name in self.__fixes__:
+                log.warning(
+                    "Ignoring the %r fix plugin since a fix by that name already exists",
+                    entry_point.name,
+                )
+                continue
+            if ":" in entry_point.value:
+                log.warning(
+                    "Ignoring the %r fix plugin since %r is not a module",
+                    entry_point.name,
+                    entry_point.value,
+                )
+                continue
+            dist = getattr(entry_point, "dist", None)
+            self.__fixes__[entry_point.name] = FixInfo(
+                entry_point.name,
+                entry_point.value.strip(),
+                None,
+                f"Provided by {dist.name}" if dist is not None else "Third-party fix",
+            )
 
     def fixes(self, excluded_names=(), only_names=()):
         """
         Returns all available fixes, optionally skipping those passed in `excluded_names`
+
+        Only the modules of the returned fixes are imported. They're returned in their
+        ``FIX_PRIORITY`` order, plugin fixes included.
         """
+        self._load_plugins()
+        if not only_names:
+            # Excluding a fix excludes the fixes it does the work of too
+            excluded_names = set(excluded_names)
+            for name in list(excluded_names):
+                if name in self.__fixes__:
+                    excluded_names.update(getattr(self.get_module(name), "SUBSETS", ()))
+        selected = []
         for name in self.__fixes__:
             if only_names:
                 if name in only_names:
-                    yield name, self.__fixes__[name]
+                    selected.append((name, self.get_module(name)))
                 continue
             if name in excluded_names:
                 continue
-            yield name, self.__fixes__[name]
+            selected.append((name, self.get_module(name)))
+        selected = _resolve_subsets(selected, () if only_names else excluded_names)
+        # The priority of the plugin fixes is only known once their module is imported
+        selected.sort(key=lambda item: getattr(item[1], "FIX_PRIORITY", 0))
+        yield from selected
 
     def fix_names(self):
         """
         Returns the list of the fix names
         """
+        self._load_plugins()
         return list(self.__fixes__)
 
+    def fix_info(self, name):
+        """
+        Returns the :class:`FixInfo` of the fix named `name`, without importing it
+        """
+        self._load_plugins()
+        return self.__fixes__[name]
+
+    def get_module(self, name):
+        """
+        Import and return the module of the fix named `name`
+        """
+        self._load_plugins()
+        return importlib.import_module(self.__fixes__[name].module)
+
+
+def _resolve_subsets(selected, excluded_names):
+    """
+    Drop the selected fixes a selected fix lists in its ``SUBSETS``, or that fix instead when
+    some of its subsets are excluded
+    """
+    names = {name for name, _ in selected}
+    dropped = set()
+    for name, module in selected:
+        subsets = getattr(module, "SUBSETS", ())
+        if not subsets:
+            continue
+        if any(subset in excluded_names for subset in subsets):
+            dropped.add(name)
+        else:
+            dropped.update(names.intersection(subsets))
+    return [(name, module) for name, module in selected if name not in dropped]
+
+
+def _iter_entry_points(group):
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        return eps.select(group=group)
+    # Python < 3.10
+    return eps.get(group, ())
+
 
 Registry = RegistryClass()  # pylint: disable=invalid-name
@@ -0,0 +1,64 @@
+"""
+    saltrewrite.git
+    ~~~~~~~~~~~~~~~
+
+    Resolve the files to rewrite from the local git repository
+"""
+import os
+import subprocess
+
+
+def _git(*args, cwd=None):
+    """
+    Run a git command and return its output
+    """
+    try:
+        proc = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False,
+            universal_newlines=True,
+        )
+    except FileNotFoundError as exc:
+        raise RuntimeError("The 'git' binary could not be found") from exc
+    if proc.returncode != 0:
+        raise RuntimeError(f"'git {' '.join(args)}' failed: {proc.stderr.strip()}")
+    return proc.stdout
+
+
+def get_changed_files(since=None, staged=False, paths=(), cwd=None):
+    """
+    Return the python files changed since the ``since`` revision, or staged in the index.
+
+    Deleted files are not included. When ``paths`` are passed, only the changed files under
+    those paths are returned. The returned paths are relative to ``cwd``.
+    """
+    if since is None and not staged:
+        raise RuntimeError("Either a revision or staged must be passed")
+    if cwd is None:
+        cwd = os.getcwd()
+    # git resolves the symlinks of the top level directory, compare resolved paths only
+    cwd = os.path.realpath(cwd)
+    toplevel = os.path.realpath(_git("rev-parse", "--show-toplevel", cwd=cwd).strip())
+    args = ["diff", "--name-only", "-z", "--diff-filter=d"]
+    if staged:
+        args.append("--cached")
+    if since is not None:
+        args.append(since)
+    args.append("--")
+    output = _git(*args, cwd=cwd)
+
+    roots = [os.path.realpath(os.path.join(cwd, path)) for path in paths]
+    changed_files = []
+    for name in output.split("\0"):
+        if not name.endswith(".py"):
+            continue
+        path = os.path.join(toplevel, name)
+        if roots and not any(
+            path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots
+        ):
+            continue
+        changed_files.append(os.path.relpath(path, cwd))
+    return sorted(changed_files)
@@ -13,12 +13,21 @@ from fissix.fixer_util import Name
 from fissix.pytree import Leaf
 from fissix.pytree import Node
 
+TRIGGERS = ("tornado",)
+
 
 def rewrite(paths, interactive=False, silent=False):
     """
     Rewrite the passed in paths
     """
-    (
+    get_query(paths).execute(write=True, interactive=interactive, silent=silent)
+
+
+def get_query(paths=()):
+    """
+    Return the query holding this fix's selectors and modifiers
+    """
+    return (
         Query(paths)
         .select_module("tornado")
         .filter(filter_tornado_imports)
@@ -27,7 +36,6 @@ def rewrite(paths, interactive=False, silent=False):
         .select("classdef|funcdef")
         .filter(filter_not_decorated)
         .modify(replace_decorators)
-        .execute(write=True, interactive=interactive, silent=silent)
     )
 
 
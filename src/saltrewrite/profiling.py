@@ -0,0 +1,224 @@
+"""
+    saltrewrite.profiling
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Record where the time of a run goes, per file and per fix
+"""
+import json
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+# The per file steps, in the order they happen
+STEPS = ("read", "parse", "serialize", "write")
+
+
+def _new_file_record():
+    """
+    Return the record of the time spent on each step of a file
+    """
+    record = dict.fromkeys(STEPS, 0.0)
+    record["fixes"] = {}
+    return record
+
+
+def _new_fix_record():
+    """
+    Return the record of the time spent, and of the nodes matched and modified, by a fix
+    """
+    return {"match": 0.0, "modify": 0.0, "matches": 0, "modifications": 0}
+
+
+class Profiler:
+    """
+    Collect the time spent on each step of rewriting each file.
+
+    Besides the ``read``, ``parse``, ``serialize`` and ``write`` steps of each file, the
+    time each fix spent matching nodes, running its filters included, and modifying them is
+    recorded along with the number of matched nodes and of the nodes it actually changed.
+    The parse step is recorded including the fixes' work, which is only subtracted from it
+    when reporting.
+    """
+
+    def __init__(self):
+        self.files = OrderedDict()
+        self._current = None
+
+    def start_file(self, filename):
+        """
+        Start recording the steps of ``filename``
+        """
+        self._current = self.files[filename] = _new_file_record()
+
+    def add(self, step, seconds, filename=None):
+        """
+        Add ``seconds`` to ``step`` of ``filename``, the file being rewritten by default
+        """
+        record = self._current if filename is None else self.files.get(filename)
+        if record is not None:
+            record[step] += seconds
+
+    @contextmanager
+    def measure(self, step, filename=None):
+        """
+        Add the time spent in the ``with`` block to ``step``
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(step, time.perf_counter() - start, filename=filename)
+
+    def add_fix(self, name, key, seconds, count=0):
+        """
+        Add ``seconds`` to the ``key`` time of the fix ``name``, and ``count`` to its counter
+        """
+        if self._current is None:
+            return
+        record = self._current["fixes"].get(name)
+        if record is None:
+            record = self._current["fixes"][name] = _new_fix_record()
+        record[key] += seconds
+        if count:
+            record["matches" if key == "match" else "modifications"] += count
+
+    def wrap_filter(self, name, func):
+        """
+        Wrap a filter of the fix ``name`` to record its time as matching time
+        """
+
+        @wraps(func)
+        def wrapper(node, capture, filename):
+            start = time.perf_counter()
+            try:
+                return func(node, capture, filename)
+            finally:
+                self.add_fix(name, "match", time.perf_counter() - start)
+
+        return wrapper
+
+    def wrap_callback(self, name, func):
+        """
+        Wrap a modifier of the fix ``name`` to record its time and count its modifications.
+
+        Only the calls which changed, or replaced, the node they were passed are counted.
+        """
+        # Only imported once the fixers are compiled, which imports fissix anyway
+        from saltrewrite import utils  # pylint: disable=import-outside-toplevel
+
+        @wraps(func)
+        def wrapper(node, capture, filename):
+            snapshot = utils.get_node_snapshot(node)
+            start = time.perf_counter()
+            try:
+                return func(node, capture, filename)
+            finally:
+                seconds = time.perf_counter() - start
+                modified = utils.is_node_changed(node, snapshot)
+                self.add_fix(name, "modify", seconds, count=int(modified))
+
+        return wrapper
+
+    def wrap_fixer(self, name, fixer):
+        """
+        Return a subclass of the compiled ``fixer`` of the fix ``name`` timing its matching
+        """
+        profiler = self
+
+        class ProfiledFixer(fixer):  # pylint: disable=too-few-public-methods
+            """
+            The ``fixer`` recording the time spent matching nodes
+            """
+
+            def match(self, node):
+                """
+                Match ``node``, recording the time spent
+                """
+                start = time.perf_counter()
+                results = super().match(node)
+                profiler.add_fix(
+                    name, "match", time.perf_counter() - start, count=int(bool(results))
+                )
+                return results
+
+        ProfiledFixer.__name__ = ProfiledFixer.__qualname__ = fixer.__name__
+        return ProfiledFixer
+
+    def report(self):
+        """
+        Return the collected timings, the slowest files first
+        """
+        files = []
+        fixes = {}
+        totals = dict.fromkeys(STEPS + ("match", "modify", "total"), 0.0)
+        for filename, record in self.files.items():
+            fixes_time = 0.0
+            for name, fix_record in record["fixes"].items():
+                fixes_time += fix_record["match"] + fix_record["modify"]
+                fix_totals = fixes.get(name)
+                if fix_totals is None:
+                    fix_totals = fixes[name] = dict(_new_fix_record(), files=0)
+                for key, value in fix_record.items():
+                    fix_totals[key] += value
+                fix_totals["files"] += 1
+            entry = {"filename": filename}
+            entry.update((step, record[step]) for step in STEPS)
+            entry["parse"] = max(0.0, entry["parse"] - fixes_time)
+            entry["match"] = sum(fix_record["match"] for fix_record in record["fixes"].values())
+            entry["modify"] = sum(fix_record["modify"] for fix_record in record["fixes"].values())
+            entry["total"] = sum(record[step] for step in STEPS)
+            entry["fixes"] = record["fixes"]
+            for key in totals:
+                totals[key] += entry[key]
+            files.append(entry)
+        files.sort(key=lambda entry: entry["total"], reverse=True)
+        for fix_totals in fixes.values():
+            fix_totals["total"] = fix_totals["match"] + fix_totals["modify"]
+        fixes = OrderedDict(sorted(fixes.items(), key=lambda item: item[1]["total"], reverse=True))
+        totals["files"] = len(files)
+        return {"totals": totals, "fixes": fixes, "files": files}
+
+    def write(self, path):
+        """
+        Write the JSON report to ``path``
+        """
+        with open(path, "w") as wfh:
+            json.dump(self.report(), wfh, indent=2)
+            wfh.write("\n")
+
+    def format_report(self, top=10):
+        """
+        Return the tables of the ``top`` slowest files and fixes
+        """
+        report = self.report()
+        totals = report["totals"]
+        steps = ", ".join(
+            f"{key} {totals[key]:.3f}s"
+            for key in ("read", "parse", "match", "modify", "serialize", "write")
+        )
+        file_columns = ("total", "read", "parse", "match", "modify", "serialize", "write")
+        lines = [
+            f"Profiled {totals['files']} file(s) in {totals['total']:.3f}s: {steps}",
+            "",
+            f"Slowest {top} files:",
+            " ".join(f"{column:>9}" for column in file_columns) + "  file",
+        ]
+        for entry in report["files"][:top]:
+            timings = " ".join(f"{entry[column]:>9.4f}" for column in file_columns)
+            lines.append(f"{timings}  {entry['filename']}")
+        lines.extend(
+            [
+                "",
+                f"Slowest {top} fixes:",
+                f"{'total':>9} {'match':>9} {'modify':>9} {'matches':>9} {'modifications':>13} "
+                f"{'files':>7}  fix",
+            ]
+        )
+        for name, fix_totals in list(report["fixes"].items())[:top]:
+            lines.append(
+                f"{fix_totals['total']:>9.4f} {fix_totals['match']:>9.4f} "
+                f"{fix_totals['modify']:>9.4f} {fix_totals['matches']:>9} "
+                f"{fix_totals['modifications']:>13} {fix_totals['files']:>7}  {name}"
+            )
+        return "\n".join(lines)
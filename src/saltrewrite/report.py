@@ -0,0 +1,202 @@
+"""
+    saltrewrite.report
+    ~~~~~~~~~~~~~~~~~~
+
+    Machine readable reports of the changes made, or which would be made, by the fixes.
+
+    The reports are streamed, each file being written to the report as soon as it's done
+    with, so that a report can be consumed while the run is still going and nothing is
+    collected in memory.
+"""
+import json
+import os
+import pathlib
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+
+class Reporter:
+    """
+    Base class of the report formats.
+
+    ``rules`` is a sequence of ``(fix_name, description)`` pairs, the fixes which ran, and
+    ``version`` the version of ``salt-rewrite``.
+    """
+
+    def __init__(self, stream, rules=(), version=None):
+        self.stream = stream
+        self.rules = list(rules)
+        self.version = version
+        self.files = 0
+
+    def start(self):
+        """
+        Write what comes before the first file
+        """
+
+    def add_file(self, filename, changes):
+        """
+        Write the :class:`~saltrewrite.engine.Change` list of ``filename`` to the report
+        """
+        self.write_file(filename, changes)
+        self.files += 1
+        self.stream.flush()
+
+    def write_file(self, filename, changes):
+        """
+        Write the entry of ``filename``
+        """
+        raise NotImplementedError
+
+    def finish(self):
+        """
+        Write what comes after the last file
+        """
+        self.stream.flush()
+
+    def _write(self, obj):
+        self.stream.write(json.dumps(obj))
+
+
+def _change_to_dict(change):
+    return {
+        "fixes": list(change.fixes),
+        "start": change.start,
+        "end": change.end,
+        "before": change.before,
+        "after": change.after,
+    }
+
+
+def _file_to_dict(filename, changes):
+    return {"filename": filename, "changes": [_change_to_dict(change) for change in changes]}
+
+
+class NdjsonReporter(Reporter):
+    """
+    One JSON object per line and per file, holding its ``filename`` and ``changes``
+    """
+
+    def write_file(self, filename, changes):
+        self._write(_file_to_dict(filename, changes))
+        self.stream.write("\n")
+
+
+class JsonReporter(Reporter):
+    """
+    A single JSON document whose ``files`` list holds the ``filename`` and ``changes`` of
+    each file. The lines of a change go from ``start`` to ``end``, excluded.
+    """
+
+    def start(self):
+        self.stream.write('{"version": ')
+        self._write(self.version)
+        self.stream.write(', "files": [')
+
+    def write_file(self, filename, changes):
+        self.stream.write("\n  " if not self.files else ",\n  ")
+        self._write(_file_to_dict(filename, changes))
+
+    def finish(self):
+        self.stream.write("\n]}\n" if self.files else "]}\n")
+        super().finish()
+
+
+class SarifReporter(Reporter):
+    """
+    A `SARIF <https://sarifweb.azurewebsites.net>`_ 2.1.0 log, one result per change, whose
+    ``fixes`` hold the replacement of the changed lines
+    """
+
+    def __init__(self, stream, rules=(), version=None):
+        super().__init__(stream, rules=rules, version=version)
+        self.results = 0
+
+    def start(self):
+        driver = {
+            "name": "salt-rewrite",
+            "informationUri": "https://github.com/saltstack/salt-rewrite",
+            "rules": [
+                {"id": name, "shortDescription": {"text": description}}
+                for name, description in self.rules
+            ],
+        }
+        if self.version:
+            driver["version"] = self.version
+        self.stream.write('{"$schema": ')
+        self._write(SARIF_SCHEMA)
+        self.stream.write(', "version": "2.1.0", "runs": [{"tool": {"driver": ')
+        self._write(driver)
+        self.stream.write('}, "results": [')
+
+    def write_file(self, filename, changes):
+        location = {"uri": _get_uri(filename)}
+        for change in changes:
+            fixes = ", ".join(change.fixes) or "salt-rewrite"
+            result = {
+                "ruleId": change.fixes[0] if change.fixes else "salt-rewrite",
+                "level": "warning",
+                "message": {"text": f"Rewritten by {fixes}"},
+                "locations": [
+                    {
+                        "physicalLocation": {
+                            "artifactLocation": location,
+                            "region": {
+                                "startLine": change.start,
+                                "endLine": max(change.start, change.end - 1),
+                            },
+                        }
+                    }
+                ],
+                "fixes": [
+                    {
+                        "artifactChanges": [
+                            {
+                                "artifactLocation": location,
+                                "replacements": [
+                                    {
+                                        # Whole lines, empty for an insertion
+                                        "deletedRegion": {
+                                            "startLine": change.start,
+                                            "startColumn": 1,
+                                            "endLine": change.end,
+                                            "endColumn": 1,
+                                        },
+                                        "insertedContent": {"text": change.after},
+                                    }
+                                ],
+                            }
+                        ]
+                    }
+                ],
+                "properties": {"fixes": list(change.fixes), "before": change.before},
+            }
+            self.stream.write("\n  " if not self.results else ",\n  ")
+            self._write(result)
+            self.results += 1
+
+    def finish(self):
+        self.stream.write("\n]}]}\n" if self.results else "]}]}\n")
+        super().finish()
+
+
+# The report formats, by name
+FORMATS = {
+    "json": JsonReporter,
+    "sarif": SarifReporter,
+    "ndjson": NdjsonReporter,
+}
+
+
+def get_reporter(name, stream, rules=(), version=None):
+    """
+    Return the reporter of the ``name`` format writing to ``stream``
+    """
+    return FORMATS[name](stream, rules=rules, version=version)
+
+
+def _get_uri(filename):
+    path = pathlib.Path(filename)
+    if path.is_absolute():
+        return path.as_uri()
+    return pathlib.PurePath(os.path.normpath(filename)).as_posix()
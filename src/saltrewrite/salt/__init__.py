@@ -1,11 +1,10 @@
 # pylint: disable=missing-module-docstring
-from saltrewrite.salt import fix_docstrings
-from saltrewrite.salt import fix_dunder_utils
-from saltrewrite.salt import fix_warn_until
-
-__all__ = [modname for modname in list(globals()) if modname.startswith("fix_")]
-
+# The ``(FIX_PRIORITY, module name, description)`` of each fix in this package. The fix
+# modules are only imported once they're selected to run, see ``saltrewrite.fixes``.
 __fixes__ = [
-    (getattr(module, "FIX_PRIORITY", 0), module)
-    for module in [globals()[modname] for modname in __all__]
+    (0, "fix_docstrings", "Fix the formatting and version names of salt docstrings"),
+    (0, "fix_dunder_utils", "Replace __utils__ calls with direct salt.utils module function calls"),
+    (0, "fix_warn_until", "Replace version names in warn_until calls with version numbers"),
 ]
+
+__all__ = [modname for _, modname, _ in __fixes__]
@@ -11,12 +11,29 @@ from bowler import Query
 from bowler import TOKEN
 from saltrewrite.salt.utils import SaltStackVersion
 
+# Every docstring fix either targets a ``::`` directive, a version directive, which might
+# be written with a single colon, or a ``CLI Example`` section
+TRIGGERS = (
+    "::",
+    "versionadded",
+    "versionchanged",
+    "deprecated",
+    re.compile("CLI Example", flags=re.I),
+)
+
 
 def rewrite(paths, interactive=False, silent=False):
     """
     Rewrite the passed in paths
     """
-    (
+    get_query(paths).execute(write=True, interactive=interactive, silent=silent)
+
+
+def get_query(paths=()):
+    """
+    Return the query holding this fix's selectors and modifiers
+    """
+    return (
         Query(paths)
         .select(
             """
@@ -59,7 +76,6 @@ def rewrite(paths, interactive=False, silent=False):
         )
         .filter(filter_no_module_docstrings)
         .modify(fix_module_docstrings)
-        .execute(write=True, interactive=interactive, silent=silent)
     )
 
 
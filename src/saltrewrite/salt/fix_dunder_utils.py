@@ -5,6 +5,7 @@
     Fix ``__utils__["*.*"](...)`` calls to import and call the real utils module function.
 """
 import ast
+import hashlib
 import os
 import pathlib
 from functools import lru_cache
@@ -17,8 +18,25 @@ from bowler.types import Leaf
 from bowler.types import Node
 from fissix.fixer_util import Call
 from fissix.fixer_util import Dot
-from fissix.fixer_util import touch_import
+from saltrewrite.cache import get_default_cache_dir
+from saltrewrite.cache import get_version
+from saltrewrite.salt.utils_index import get_index_path
+from saltrewrite.salt.utils_index import UtilsIndex
+from saltrewrite.utils import ensure_import
 
+TRIGGERS = ("__utils__",)
+# The outcome also depends on the salt/utils modules being called
+CACHEABLE = False
+# Only salt's own loader modules use ``__utils__``
+PATHS = ("salt/**",)
+# The salt checkout, see ``--salt-root``, whose salt/utils modules are indexed in the cache
+# directory, see ``--cache-dir`` and ``--no-cache``
+ENVIRONMENT = (
+    "SALT_REWRITE_SALT_ROOT",
+    "SALT_REWRITE_CACHE_DIR",
+    "SALT_REWRITE_NO_CACHE",
+    "XDG_CACHE_HOME",
+)
 
 SALT_DUNDERS = (
     "__active_provider_name__",
@@ -47,75 +65,275 @@ SALT_DUNDERS = (
 )
 
 
-class DunderParser(ast.NodeTransformer):  # pylint: disable=missing-class-docstring
+class DunderParser(ast.NodeTransformer):
+    """
+    Find out which salt dunders a utils module uses, and where.
+
+    Each module level function and class is analyzed on its own, recording whether it uses
+    salt dunders and the names it references. The names assigned at the module level, like
+    aliases or tables of handlers, are recorded along with the names their values reference.
+    Definitions and assignments nested in module level ``if`` and ``try`` statements are
+    still considered module level.
+    """
+
     # pylint: disable=missing-function-docstring,invalid-name
     def __init__(self):
         self.virtualname = None
         self.uses_salt_dunders = False
+        # Whether the code outside of the module level functions and classes uses salt dunders
+        self.module_uses_salt_dunders = False
+        # The ``(uses salt dunders, referenced names)`` of each module level definition and
+        # assigned name
+        self.definitions = {}
+        # The names of the module level functions and classes
+        self.functions = set()
+        self._definition = None
+
+    def visit_Module(self, node):
+        for stmt in node.body:
+            self._visit_module_level(stmt)
+        return node
+
+    def _visit_module_level(self, node):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            self.functions.add(node.name)
+            self._definition = self.definitions.setdefault(node.name, [False, set()])
+            self.generic_visit(node)
+            self._definition = None
+        elif isinstance(node, (ast.Assign, ast.AnnAssign, ast.AugAssign)):
+            self.visit(node)
+            self._record_assignment(node)
+        elif isinstance(node, ast.If):
+            self.visit(node.test)
+            for stmt in node.body + node.orelse:
+                self._visit_module_level(stmt)
+        elif isinstance(node, ast.Try):
+            for stmt in node.body + node.orelse + node.finalbody:
+                self._visit_module_level(stmt)
+            for handler in node.handlers:
+                if handler.type is not None:
+                    self.visit(handler.type)
+                for stmt in handler.body:
+                    self._visit_module_level(stmt)
+        else:
+            self.visit(node)
+
+    def _record_assignment(self, node):
+        """
+        Record the names assigned by the module level ``node`` as referencing the names
+        used in its value, and in its targets, like the ``HANDLERS`` of ``HANDLERS[key] = x``
+        """
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        referenced = set()
+        for expr in [*targets, node.value]:
+            if expr is not None:
+                referenced.update(
+                    child.id for child in ast.walk(expr) if isinstance(child, ast.Name)
+                )
+        for target in targets:
+            for child in ast.walk(target):
+                if isinstance(child, ast.Name):
+                    self.definitions.setdefault(child.id, [False, set()])[1].update(referenced)
 
     def visit_Name(self, node):
         if node.id in SALT_DUNDERS:
             self.uses_salt_dunders = True
+            if self._definition is None:
+                self.module_uses_salt_dunders = True
+            else:
+                self._definition[0] = True
+        elif self._definition is not None:
+            self._definition[1].add(node.id)
         return self.generic_visit(node)
 
     def visit_Assign(self, node):
         for target in node.targets:
             if not isinstance(target, ast.Name):
                 continue
-            if target.id == "__virtualname__":
-                self.virtualname = node.value.s
+            if target.id == "__virtualname__" and isinstance(node.value, ast.Constant):
+                self.virtualname = node.value.value
         return self.generic_visit(node)
 
+    def get_pure_functions(self):
+        """
+        Return the names of the module level functions and classes which can be used without
+        the salt loader.
+
+        Those are the ones which don't use salt dunders, neither directly nor through the
+        module level functions, classes and assigned names they reference, in a module whose
+        module level code doesn't use salt dunders either.
+        """
+        if self.module_uses_salt_dunders:
+            return []
+        referenced_by = {}
+        for name, (_, names) in self.definitions.items():
+            for other in names.intersection(self.definitions):
+                referenced_by.setdefault(other, set()).add(name)
+        impure = {name for name, (uses_dunders, _) in self.definitions.items() if uses_dunders}
+        pending = list(impure)
+        while pending:
+            for name in referenced_by.get(pending.pop(), ()):
+                if name not in impure:
+                    impure.add(name)
+                    pending.append(name)
+        return sorted(self.functions.difference(impure))
+
     # pylint: enable=missing-function-docstring,invalid-name
 
 
-def _get_salt_code_root():
+def _get_salt_code_root(filename=None):
+    """
+    Return the salt checkout, ``$SALT_REWRITE_SALT_ROOT`` when set.
+
+    Otherwise, it's the closest directory holding ``salt/utils`` looking up from the
+    directory of ``filename``, or from the current directory, and defaults to the latter.
+    """
+    salt_root = os.environ.get("SALT_REWRITE_SALT_ROOT")
+    if salt_root:
+        return pathlib.Path(salt_root).resolve()
+    if filename is None:
+        return _find_salt_code_root(os.getcwd())
+    return _find_salt_code_root(os.path.dirname(os.path.abspath(filename)))
+
+
+@lru_cache(maxsize=None)
+def _find_salt_code_root(start):
+    start = pathlib.Path(start)
+    for path in (start, *start.parents):
+        if path.joinpath("salt", "utils").is_dir():
+            return path
     return pathlib.Path.cwd()
 
 
-@lru_cache
+def analyze_utils_module(path, data):
+    """
+    Return the dunder information of the utils module at ``path`` whose source is ``data``
+    """
+    transformer = DunderParser()
+    transformer.visit(ast.parse(data, filename=str(path)))
+    return {
+        "virtualname": transformer.virtualname,
+        "uses_salt_dunders": transformer.uses_salt_dunders,
+        "pure_functions": transformer.get_pure_functions(),
+    }
+
+
+def _get_cache_dir():
+    """
+    Return the directory the index is kept in, ``None`` when it isn't to be persisted
+    """
+    if os.environ.get("SALT_REWRITE_NO_CACHE"):
+        return None
+    return pathlib.Path(os.environ.get("SALT_REWRITE_CACHE_DIR") or get_default_cache_dir())
+
+
+@lru_cache(maxsize=None)
+def _get_utils_index(root, cache_dir):
+    # The index is discarded whenever this module, and so the analysis, changes
+    hasher = hashlib.sha256(get_version().encode())
+    hasher.update(pathlib.Path(__file__).read_bytes())
+    return UtilsIndex(
+        root,
+        get_index_path(root, "dunder-utils", cache_dir),
+        analyze_utils_module,
+        hasher.hexdigest(),
+    )
+
+
 def get_utils_module_info():
     """
-    Collect utils modules dunder information.
-    """
-    mapping = {}
-    salt_utils_package_path = _get_salt_code_root().joinpath("salt", "utils")
-    for path in salt_utils_package_path.rglob("*.py"):
-        transformer = DunderParser()
-        tree = ast.parse(path.read_text())
-        transformer.visit(tree)
-        mapping[path.resolve()] = {
-            "modname": path.stem,
-            "virtualname": transformer.virtualname or path.stem,
-            "uses_salt_dunders": transformer.uses_salt_dunders,
+    Collect utils modules dunder information, by path relative to the salt checkout.
+    """
+    return _get_utils_module_info(_get_salt_code_root())
+
+
+@lru_cache(maxsize=None)
+def _get_utils_module_info(root):
+    return _get_utils_index(root, _get_cache_dir()).refresh()
+
+
+@lru_cache(maxsize=None)
+def _get_utils_modules(root):
+    """
+    Return the details of the utils modules by module name, relative to ``salt.utils``, and
+    by the name the salt loader knows them by
+    """
+    modules = {}
+    loader_names = {}
+    for relpath, info in sorted(_get_utils_module_info(root).items()):
+        parts = relpath[: -len(".py")].split("/")[2:]
+        if parts[-1] == "__init__":
+            # A package is loaded as the module named after it
+            parts.pop()
+            if not parts:
+                continue
+        details = {
+            "modname": ".".join(parts),
+            "virtualname": info["virtualname"] or parts[-1],
+            "uses_salt_dunders": info["uses_salt_dunders"],
+            "pure_functions": frozenset(info["pure_functions"]),
         }
-    return mapping
+        modules[details["modname"]] = details
+        loader_names.setdefault(".".join(parts[:-1] + [details["virtualname"]]), details)
+    return modules, loader_names
 
 
-@lru_cache
-def get_utils_module_details(name):
+def get_utils_module_details(name, filename=None):
     """
     Return utils module details.
+
+    ``name`` is the, possibly dotted, name of the module relative to ``salt.utils`` or the
+    name the salt loader knows it by, its ``__virtualname__``. The salt checkout is looked
+    up from ``filename``, the file being rewritten.
     """
-    full_module_name = f"salt.utils.{name}"
-    full_module_path = pathlib.Path(f"{full_module_name.replace('.', os.sep)}.py").resolve()
-    utils_module_info = get_utils_module_info()
-    if full_module_path.exists():
-        return utils_module_info[full_module_path]
-    modname = name.split(".")[0]
-    for entry in utils_module_info.values():
-        if entry["virtualname"] == modname:
-            return entry
-    raise RuntimeError(
-        f"Could not find the python module for {name!r} and '{full_module_path}' does not exist"
-    )
+    root = _get_salt_code_root(filename)
+    modules, loader_names = _get_utils_modules(root)
+    details = modules.get(name) or loader_names.get(name)
+    if details is None:
+        relpath = f"salt/utils/{name.replace('.', '/')}.py"
+        raise RuntimeError(
+            f"Could not find the python module for {name!r} and '{root.joinpath(relpath)}' "
+            "does not exist"
+        )
+    return details
+
+
+def warm_caches(executor):
+    """
+    Bring the index of the salt/utils modules up to date, analyzing them in ``executor``.
+
+    The engine calls this before dispatching the files to its worker processes, which then
+    load the index from disk.
+    """
+    root = _get_salt_code_root()
+    if root.joinpath("salt", "utils").is_dir():
+        _get_utils_index(root, _get_cache_dir()).refresh(executor=executor)
+
+
+def invalidate_caches():
+    """
+    Make sure the salt/utils modules changed since the previous run are analyzed again.
+
+    The engine calls this before each run. The in-memory index is kept, so only the changed
+    modules are.
+    """
+    _find_salt_code_root.cache_clear()
+    _get_utils_module_info.cache_clear()
+    _get_utils_modules.cache_clear()
 
 
 def rewrite(paths, interactive=False, silent=False):
     """
     Rewrite the passed in paths
     """
-    (
+    get_query(paths).execute(write=True, interactive=interactive, silent=silent)
+
+
+def get_query(paths=()):
+    """
+    Return the query holding this fix's selectors and modifiers
+    """
+    return (
         Query(paths)
         .select(
             """
@@ -130,7 +348,6 @@ def rewrite(paths, interactive=False, silent=False):
             """
         )
         .modify(fix_dunder_utils_calls)
-        .execute(write=True, interactive=interactive, silent=silent)
     )
 
 
@@ -141,11 +358,14 @@ def fix_dunder_utils_calls(node, capture, filename):
     if "dunder_mod_func" not in capture:
         return
     dunder_mod_func = capture["dunder_mod_func"][0].value.strip("'").strip('"')
+    if "." not in dunder_mod_func:
+        return
 
-    utils_module, utils_module_funcname = dunder_mod_func.split(".")
-    details = get_utils_module_details(utils_module)
-    if details["uses_salt_dunders"]:
-
+    # The function of ``pkg.module.func`` is in the ``salt.utils.pkg.module`` module
+    utils_module, utils_module_funcname = dunder_mod_func.rsplit(".", 1)
+    details = get_utils_module_details(utils_module, filename)
+    if details["uses_salt_dunders"] and utils_module_funcname not in details["pure_functions"]:
+        # The function, what it uses, or the module level code uses salt dunders
         click.echo(
             f" * Not calling 'salt.utils.{details['modname']}.{utils_module_funcname}' "
             f"directly because internally the 'salt.utils.{details['modname']}' "
@@ -155,7 +375,7 @@ def fix_dunder_utils_calls(node, capture, filename):
         return
 
     # Make sure we import the right utils module
-    touch_import(None, f"salt.utils.{details['modname']}", node)
+    ensure_import(None, f"salt.utils.{details['modname']}", node)
     click.echo(f" * Fixing dunder module func call: '{dunder_mod_func}'")
 
     # Un-parent the function arguments so we can add them to a new call
@@ -172,6 +392,10 @@ def fix_dunder_utils_calls(node, capture, filename):
         capture["function_arguments"],
     )
 
+    module_leaves = []
+    for part in details["modname"].split("."):
+        module_leaves.extend([Dot(), Leaf(TOKEN.NAME, part, prefix="")])
+
     # Create replacement node
     replacement = Node(
         SYMBOL.power,
@@ -182,8 +406,7 @@ def fix_dunder_utils_calls(node, capture, filename):
                 [
                     Dot(),
                     Leaf(TOKEN.NAME, "utils", prefix=""),
-                    Dot(),
-                    Leaf(TOKEN.NAME, details["modname"], prefix=""),
+                    *module_leaves,
                     Dot(),
                     call_node,
                 ],
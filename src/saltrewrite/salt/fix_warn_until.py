@@ -9,12 +9,21 @@ from bowler import TOKEN
 from fissix.pytree import Leaf
 from saltrewrite.salt.utils import SaltStackVersion
 
+TRIGGERS = ("warn_until",)
+
 
 def rewrite(paths, interactive=False, silent=False):
     """
     Rewrite the passed in paths
     """
-    (
+    get_query(paths).execute(write=True, interactive=interactive, silent=silent)
+
+
+def get_query(paths=()):
+    """
+    Return the query holding this fix's selectors and modifiers
+    """
+    return (
         Query(paths)
         .select(
             """
@@ -39,7 +48,6 @@ def rewrite(paths, interactive=False, silent=False):
         )
         .filter(filter_versions)
         .modify(fix_warn_unil_version)
-        .execute(write=True, interactive=interactive, silent=silent)
     )
 
 
@@ -0,0 +1,177 @@
+"""
+    saltrewrite.salt.utils_index
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    On-disk index of what the fixes need to know about the ``salt/utils`` modules.
+
+    Analyzing the several hundred ``salt/utils`` modules of a salt checkout takes a while, so
+    the result of analyzing each of them is kept in a JSON file in the cache directory, one
+    per salt checkout, unless persisting it is disabled. Each entry records the modification
+    time, size and hash of the module it was computed from. Loading the index only takes a
+    ``stat()`` call per module, the modules whose modification time or size changed are
+    hashed and only those whose contents changed are analyzed again.
+
+    When the index has to be (re)built, the modules can be analyzed by a pool of worker
+    processes. Once written, the index is loaded from disk by the processes rewriting files
+    instead of each of them analyzing the modules again.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from concurrent.futures import as_completed
+
+log = logging.getLogger(__name__)
+
+# Bumped whenever the layout of the index file changes
+INDEX_FORMAT = 1
+# Below this number of modules to analyze, doing it in worker processes isn't worth it
+PARALLEL_THRESHOLD = 16
+# The number of modules analyzed by each task submitted to the worker processes
+CHUNK_SIZE = 8
+
+
+def get_index_path(root, name, cache_dir):
+    """
+    Return the path of the ``name`` index of the salt checkout at ``root`` in ``cache_dir``,
+    ``None`` when ``cache_dir`` is ``None``, persisting the index being disabled
+    """
+    if cache_dir is None:
+        return None
+    checkout = hashlib.sha256(str(pathlib.Path(root).resolve()).encode()).hexdigest()
+    return pathlib.Path(cache_dir) / "index" / f"{name}-{checkout[:16]}.json"
+
+
+class UtilsIndex:
+    """
+    The result of ``analyze(path, data)`` for each ``salt/utils`` module of ``root``.
+
+    ``fingerprint`` identifies the analysis, the entries recorded with another one are
+    discarded. The index is only written to ``path`` when it changed, and is neither loaded
+    nor written when ``path`` is ``None``.
+    """
+
+    def __init__(self, root, path, analyze, fingerprint):
+        self.root = pathlib.Path(root)
+        self.path = None if path is None else pathlib.Path(path)
+        self.analyze = analyze
+        self.fingerprint = fingerprint
+        self.entries = None
+
+    def load(self):
+        """
+        Load the entries recorded on disk
+        """
+        self.entries = {}
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as rfh:
+                index = json.load(rfh)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            log.debug("Ignoring the unreadable index %s: %s", self.path, exc)
+            return
+        if index.get("format") != INDEX_FORMAT or index.get("fingerprint") != self.fingerprint:
+            return
+        self.entries = index["entries"]
+
+    def refresh(self, executor=None):
+        """
+        Bring the index up to date and return the analysis of each module by relative path.
+
+        When an ``executor`` is passed, the modules to analyze are analyzed by its worker
+        processes, which requires ``analyze`` to be picklable.
+        """
+        if self.entries is None:
+            self.load()
+        stale = []
+        seen = set()
+        for path in self.root.joinpath("salt", "utils").rglob("*.py"):
+            relpath = path.relative_to(self.root).as_posix()
+            seen.add(relpath)
+            stat = path.stat()
+            entry = self.entries.get(relpath)
+            if (
+                entry is not None
+                and entry["mtime_ns"] == stat.st_mtime_ns
+                and entry["size"] == stat.st_size
+            ):
+                continue
+            stale.append((relpath, path, stat, entry))
+        removed = set(self.entries).difference(seen)
+        for relpath in removed:
+            del self.entries[relpath]
+        for (relpath, _, stat, entry), (digest, info) in self._analyze(stale, executor):
+            if info is None:
+                # Only touched, like after switching git branches back and forth
+                info = entry["info"]
+            self.entries[relpath] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+                "info": info,
+            }
+        if stale or removed:
+            self.save()
+        return {relpath: entry["info"] for relpath, entry in self.entries.items()}
+
+    def _analyze(self, stale, executor):
+        """
+        Yield each stale module along with its ``(sha256, info)``, as soon as it's analyzed
+        """
+        if executor is None or len(stale) < PARALLEL_THRESHOLD:
+            for item in stale:
+                yield item, _analyze_module(self.analyze, item[1], _get_digest(item[3]))
+            return
+        futures = {}
+        for idx in range(0, len(stale), CHUNK_SIZE):
+            chunk = stale[idx : idx + CHUNK_SIZE]
+            modules = [(item[1], _get_digest(item[3])) for item in chunk]
+            futures[executor.submit(_analyze_modules, self.analyze, modules)] = chunk
+        for future in as_completed(futures):
+            yield from zip(futures[future], future.result())
+
+    def save(self):
+        """
+        Atomically write the index to disk
+        """
+        if self.path is None:
+            return
+        index = {"format": INDEX_FORMAT, "fingerprint": self.fingerprint, "entries": self.entries}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        except OSError as exc:
+            log.debug("Failed to write the index %s: %s", self.path, exc)
+            return
+        try:
+            with os.fdopen(tmp_fd, "w") as wfh:
+                json.dump(index, wfh)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            log.debug("Failed to write the index %s: %s", self.path, exc)
+            os.unlink(tmp_path)
+
+
+def _get_digest(entry):
+    return None if entry is None else entry["sha256"]
+
+
+def _analyze_module(analyze, path, digest):
+    """
+    Return the ``(sha256, info)`` of the module at ``path``, ``info`` being ``None`` when its
+    contents still hash to ``digest``
+    """
+    data = path.read_bytes()
+    new_digest = hashlib.sha256(data).hexdigest()
+    if new_digest == digest:
+        return new_digest, None
+    return new_digest, analyze(path, data)
+
+
+def _analyze_modules(analyze, modules):
+    return [_analyze_module(analyze, path, digest) for path, digest in modules]
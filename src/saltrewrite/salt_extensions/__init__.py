@@ -1,9 +1,8 @@
 # pylint: disable=missing-module-docstring
-from saltrewrite.salt_extensions import fix_saltext
-
-__all__ = [modname for modname in list(globals()) if modname.startswith("fix_")]
-
+# The ``(FIX_PRIORITY, module name, description)`` of each fix in this package. The fix
+# modules are only imported once they're selected to run, see ``saltrewrite.fixes``.
 __fixes__ = [
-    (getattr(module, "FIX_PRIORITY", 0), module)
-    for module in [globals()[modname] for modname in __all__]
+    (0, "fix_saltext", "Fix imports and module references of salt modules migrated to extensions"),
 ]
+
+__all__ = [modname for _, modname, _ in __fixes__]
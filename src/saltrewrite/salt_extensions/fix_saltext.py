@@ -14,33 +14,50 @@ from bowler import Query
 
 log = logging.getLogger(__name__)
 
+# The rewrites depend on the SALTEXT_NAME environment variable
+CACHEABLE = False
+ENVIRONMENT = ("SALTEXT_NAME",)
+# The extension package, in either the src or the flat layout, and its tests
+PATHS = ("src/saltext/**", "saltext/**", "tests/**")
+
 
 def rewrite(paths, interactive=False, silent=False):
     """
     Rewrite the passed in paths
     """
-    if "SALTEXT_NAME" in os.environ:
+    query = get_query(paths)
+    if query is not None:
         log.warning("PATHS: %s", paths)
-        (
-            Query(paths)
-            .select_module("tests.support.mock")
-            .rename("unittest.mock")
-            .select_module("salt.utils")
-            .filter(filter_salt_imports)
-            .rename(f"saltext.saltext_{os.environ['SALTEXT_NAME']}.utils")
-            .select_root()
-            .select_module("salt.modules")
-            .filter(filter_salt_imports)
-            .rename(f"saltext.saltext_{os.environ['SALTEXT_NAME']}.modules")
-            .select_module("salt.states")
-            .filter(filter_salt_imports)
-            .rename(f"saltext.saltext_{os.environ['SALTEXT_NAME']}.states")
-            .select_root()
-            .select_function("patch")
-            .filter(filter_salt_imports)
-            .modify(replace_patch_arglist)
-            .execute(write=True, interactive=interactive, silent=silent)
-        )
+        query.execute(write=True, interactive=interactive, silent=silent)
+
+
+def get_query(paths=()):
+    """
+    Return the query holding this fix's selectors and modifiers.
+
+    Returns ``None`` when ``SALTEXT_NAME`` is not set in the environment.
+    """
+    if "SALTEXT_NAME" not in os.environ:
+        return None
+    return (
+        Query(paths)
+        .select_module("tests.support.mock")
+        .rename("unittest.mock")
+        .select_module("salt.utils")
+        .filter(filter_salt_imports)
+        .rename(f"saltext.saltext_{os.environ['SALTEXT_NAME']}.utils")
+        .select_root()
+        .select_module("salt.modules")
+        .filter(filter_salt_imports)
+        .rename(f"saltext.saltext_{os.environ['SALTEXT_NAME']}.modules")
+        .select_module("salt.states")
+        .filter(filter_salt_imports)
+        .rename(f"saltext.saltext_{os.environ['SALTEXT_NAME']}.states")
+        .select_root()
+        .select_function("patch")
+        .filter(filter_salt_imports)
+        .modify(replace_patch_arglist)
+    )
 
 
 def filter_salt_imports(node, capture, filename):
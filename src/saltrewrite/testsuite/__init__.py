@@ -1,17 +1,45 @@
 # pylint: disable=missing-module-docstring
-from saltrewrite.testsuite import fix_asserts
-from saltrewrite.testsuite import fix_destructive_test_decorator
-from saltrewrite.testsuite import fix_expensive_test_decorator
-from saltrewrite.testsuite import fix_requires_network_decorator
-from saltrewrite.testsuite import fix_requires_salt_modules_decorator
-from saltrewrite.testsuite import fix_requires_salt_states_decorator
-from saltrewrite.testsuite import fix_skip_if_binaries_missing_decorator
-from saltrewrite.testsuite import fix_skip_if_not_root_decorator
-from saltrewrite.testsuite import fix_slow_test_decorator
-
-__all__ = [modname for modname in list(globals()) if modname.startswith("fix_")]
-
+# The ``(FIX_PRIORITY, module name, description)`` of each fix in this package. The fix
+# modules are only imported once they're selected to run, see ``saltrewrite.fixes``.
 __fixes__ = [
-    (getattr(module, "FIX_PRIORITY", 0), module)
-    for module in [globals()[modname] for modname in __all__]
+    (0, "fix_asserts", "Rewrite unittest self.assert* calls into plain assertions"),
+    (
+        0,
+        "fix_destructive_test_decorator",
+        "Replace @destructiveTest with @pytest.mark.destructive_test",
+    ),
+    (0, "fix_expensive_test_decorator", "Replace @expensiveTest with @pytest.mark.expensive_test"),
+    (
+        0,
+        "fix_legacy_decorators",
+        "Replace all of the legacy test decorators with their pytest markers in one pass",
+    ),
+    (
+        0,
+        "fix_requires_network_decorator",
+        "Replace @requires_network with @pytest.mark.requires_network",
+    ),
+    (
+        0,
+        "fix_requires_salt_modules_decorator",
+        "Replace @requires_salt_modules with @pytest.mark.requires_salt_modules",
+    ),
+    (
+        0,
+        "fix_requires_salt_states_decorator",
+        "Replace @requires_salt_states with @pytest.mark.requires_salt_states",
+    ),
+    (
+        0,
+        "fix_skip_if_binaries_missing_decorator",
+        "Replace @skip_if_binaries_missing with @pytest.mark.skip_if_binaries_missing",
+    ),
+    (
+        0,
+        "fix_skip_if_not_root_decorator",
+        "Replace @skip_if_not_root with @pytest.mark.skip_if_not_root",
+    ),
+    (0, "fix_slow_test_decorator", "Replace @slowTest with @pytest.mark.slow_test"),
 ]
+
+__all__ = [modname for _, modname, _ in __fixes__]
@@ -9,6 +9,7 @@
         https://github.com/craigds/decrapify/blob/master/pytestify.py
 """
 # pylint: disable=no-member,missing-function-docstring
+from functools import lru_cache
 from functools import wraps
 
 from bowler import Query
@@ -21,8 +22,8 @@ from fissix.fixer_util import Call
 from fissix.fixer_util import Comma
 from fissix.fixer_util import Dot
 from fissix.fixer_util import KeywordArg
-from fissix.fixer_util import touch_import
 from fissix.pygram import python_symbols as syms
+from saltrewrite.utils import ensure_import
 from saltrewrite.utils import filter_test_files
 from saltrewrite.utils import keyword
 
@@ -99,6 +100,26 @@ INVERT_FUNCTIONS = {
 }
 BOOLEAN_VALUES = ("True", "False")
 
+# Only test modules are rewritten by this fix
+TEST_FILES_ONLY = True
+# All of the rewritten calls are method calls, ``self.assert*(...)``, ``self.fail*(...)``
+TRIGGERS = (".assert", ".fail")
+# Path globs, relative to the project root, of the files this fix applies to
+PATHS = ("tests/**",)
+# The decorator fixes settle the imports of the test module, which the assertions rewritten
+# into ``pytest.raises()`` calls add ``import pytest`` to, before this fix runs
+RUN_AFTER = (
+    "fix_destructive_test_decorator",
+    "fix_expensive_test_decorator",
+    "fix_legacy_decorators",
+    "fix_requires_network_decorator",
+    "fix_requires_salt_modules_decorator",
+    "fix_requires_salt_states_decorator",
+    "fix_skip_if_binaries_missing_decorator",
+    "fix_skip_if_not_root_decorator",
+    "fix_slow_test_decorator",
+)
+
 
 def rewrite(paths, interactive=False, silent=False):
     """
@@ -108,98 +129,69 @@ def rewrite(paths, interactive=False, silent=False):
     paths = filter_test_files(paths)
     if not paths:
         return
-    (
+    get_query(paths).execute(write=True, interactive=interactive, silent=silent)
+
+
+def get_query(paths=()):
+    """
+    Return the query holding this fix's selectors and modifiers
+    """
+    conversions = get_conversions()
+    # A single matcher for all of the assertion methods, each of the calls it matches being
+    # dispatched on the method name, instead of one matcher per assertion method
+    raises_names = " | ".join(
+        f"'{name}'" for name in sorted(conversions) if name in RAISES_CONVERSIONS
+    )
+    method_names = " | ".join(
+        f"'{name}'" for name in sorted(conversions) if name not in RAISES_CONVERSIONS
+    )
+    return (
         Query(paths)
-        .select_class("TestCase")
-        # NOTE: You can append as many .select().modify() bits as you want to one query.
-        # Each .modify() acts only on the .select[_*]() immediately prior.
-        .select_method("assertEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertEquals")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("failUnlessEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertNotEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("failIfEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertIs")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertIsNot")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertIn")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertNotIn")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertTrue")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertFalse")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assert_")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("failUnless")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("failIf")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertIsNone")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertIsNotNone")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertGreater")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertGreaterEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertLess")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertLessEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertIsInstance")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertNotIsInstance")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertDictEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertSetEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertListEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertTupleEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertSequenceEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertMultiLineEqual")
-        .modify(callback=assertmethod_to_assert)
-        .select_method("assertAlmostEqual")
-        .modify(callback=assertalmostequal_to_assert)
-        .select_method("assertNotAlmostEqual")
-        .modify(callback=assertalmostequal_to_assert)
         .select(
-            """
+            f"""
             function_call=power<
-                self_attr="self" raises_attr=trailer< "." "assertRaises" >
-                trailer< '(' function_arguments=any* ')' >
+                (
+                    self_attr="self"
+                    raises_attr=trailer< "." function_name=( {raises_names} ) >
+                    trailer< '(' function_arguments=any* ')' >
+                |
+                    any*
+                    trailer< "." function_name=( {method_names} ) >
+                    trailer< '(' function_arguments=any* ')' >
+                    any*
+                )
             >
         """
         )
-        .modify(callback=handle_assertraises)
-        .select(
-            """
-            function_call=power<
-                self_attr="self" raises_attr=trailer< "." "assertRaisesRegex" >
-                trailer< '(' function_arguments=any* ')' >
-            >
-        """
-        )
-        .modify(callback=handle_assertraises_regex)
-        .select_method("assertRegex")
-        .modify(callback=handle_assert_regex)
-        .select_method("assertNotRegex")
-        .modify(callback=handle_assert_regex)
-        # Actually run all of the above.
-        .execute(write=True, interactive=interactive, silent=silent)
+        .modify(callback=convert_assertion)
     )
 
 
+@lru_cache(maxsize=None)
+def get_conversions():
+    """
+    Return the conversion of each of the assertion methods, by method name.
+
+    Derived from ``SYNONYMS``, ``ARGUMENTS`` and ``INVERT_FUNCTIONS``, the methods with no
+    conversion of their own in ``CONVERSIONS`` being rewritten into plain assertions.
+    """
+    conversions = {}
+    for name in set(ARGUMENTS).union(SYNONYMS, INVERT_FUNCTIONS):
+        conversions[name] = CONVERSIONS.get(SYNONYMS.get(name, name), assertmethod_to_assert)
+    conversions.update(RAISES_CONVERSIONS)
+    return conversions
+
+
+def convert_assertion(node, capture, filename):
+    """
+    Dispatch the matched ``self.<name>(...)`` call to the conversion of ``<name>``
+    """
+    # Named alternatives capture the list of the nodes they matched
+    (capture["function_name"],) = capture["function_name"]
+    conversion_func = get_conversions()[capture["function_name"].value]
+    return conversion_func(node, capture, filename)
+
+
 # TODO : Add this to fissix.fixer_util
 def Assert(test, message=None, **kwargs):  # pylint: disable=invalid-name
     """Build an assertion statement"""
@@ -326,7 +318,7 @@ def assertmethod_to_assert(node, capture, arguments):
             )
         ]
         # Adds a 'import pytest' if there wasn't one already
-        touch_import(None, "pytest", node)
+        ensure_import(None, "pytest", node)
 
     else:
         op_tokens = OPERATORS[function_name]
@@ -434,7 +426,7 @@ def assertalmostequal_to_assert(node, capture, arguments):
         )
     ]
     # Adds a 'import pytest' if there wasn't one already
-    touch_import(None, "pytest", node)
+    ensure_import(None, "pytest", node)
 
     return Assert(assert_test_nodes, msg.clone() if msg else None, prefix=node.prefix)
 
@@ -476,7 +468,7 @@ def handle_assertraises(node, capture, arguments):
                                 previous_argument.remove()
 
     # Adds a 'import pytest' if there wasn't one already
-    touch_import(None, "pytest", node)
+    ensure_import(None, "pytest", node)
 
 
 @conversion
@@ -557,7 +549,7 @@ def handle_assertraises_regex(node, capture, arguments):
                 break
 
     # Adds a 'import pytest' if there wasn't one already
-    touch_import(None, "pytest", node)
+    ensure_import(None, "pytest", node)
 
 
 @conversion
@@ -591,7 +583,7 @@ def handle_assert_regex(node, capture, arguments):
     arguments[1].prefix = ""
 
     # Adds a 'import re' if there wasn't one already
-    touch_import(None, "re", node)
+    ensure_import(None, "re", node)
 
     op_tokens = []
     if invert:
@@ -606,3 +598,15 @@ def handle_assert_regex(node, capture, arguments):
         )
     ]
     return Assert(assert_test_nodes, message.clone() if message else None, prefix=node.prefix)
+
+
+# The assertion methods, by their name in ``SYNONYMS``, not rewritten into plain assertions
+CONVERSIONS = {
+    "assertAlmostEqual": assertalmostequal_to_assert,
+    "assertRegex": handle_assert_regex,
+}
+# The ``self.assertRaises*(...)`` methods, only matched when called on ``self``
+RAISES_CONVERSIONS = {
+    "assertRaises": handle_assertraises,
+    "assertRaisesRegex": handle_assertraises_regex,
+}
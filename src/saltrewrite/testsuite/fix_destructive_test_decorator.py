@@ -6,11 +6,18 @@
     and, in case ``pytest`` isn't yet imported, it additionall adds the missing
     import
 """
-from bowler import Query
 from saltrewrite import utils
+from saltrewrite.testsuite import fix_legacy_decorators
 
 MARKER = "pytest.mark.destructive_test"
 DECORATOR = "destructiveTest"
+# Only test modules are rewritten by this fix
+TEST_FILES_ONLY = True
+TRIGGERS = (DECORATOR,)
+# Path globs, relative to the project root, of the files this fix applies to
+PATHS = ("tests/**",)
+# Set by ``--hoist-markers``, see fix_legacy_decorators
+ENVIRONMENT = fix_legacy_decorators.ENVIRONMENT
 
 
 def rewrite(paths, interactive=False, silent=False):
@@ -21,24 +28,11 @@ def rewrite(paths, interactive=False, silent=False):
     paths = utils.filter_test_files(paths)
     if not paths:
         return
-    (
-        Query(paths)
-        .select("classdef|funcdef")
-        .filter(filter_not_decorated)
-        .modify(replace_decorator)
-        .execute(write=True, interactive=interactive, silent=silent)
-    )
+    get_query(paths).execute(write=True, interactive=interactive, silent=silent)
 
 
-def filter_not_decorated(node, capture, filename):
+def get_query(paths=()):
     """
-    Filter undecorated nodes
+    Return the query holding this fix's selectors and modifiers
     """
-    return bool(utils.get_decorator(node, DECORATOR, MARKER))
-
-
-def replace_decorator(node, capture, filename):
-    """
-    Replaces usage of ``@destructiveTest`` with ``@pytest.mark.destructive_test``
-    """
-    return utils.rewrite_decorator(node, DECORATOR, MARKER)
+    return fix_legacy_decorators.get_query(paths, decorators={DECORATOR: MARKER})
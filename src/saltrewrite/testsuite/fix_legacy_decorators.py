@@ -0,0 +1,402 @@
+"""
+    saltrewrite.testsuite.fix_legacy_decorators
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Replaces any use of the legacy test suite decorators, like ``@slowTest``, with their
+    pytest markers, like ``@pytest.mark.slow_test``, all of them in a single pass, and, in
+    case ``pytest`` isn't yet imported, it additionally adds the missing import.
+
+    Optionally, see ``--hoist-markers``, the markers shared by all of the tests of a module,
+    or of a class, are hoisted into its ``pytestmark``, which pytest then only evaluates once
+    instead of once per test.
+"""
+# pylint: disable=no-member
+import logging
+import os
+
+from bowler import Query
+from bowler import TOKEN
+from fissix import pygram
+from fissix import pytree
+from fissix.pgen2.driver import Driver
+from fissix.pygram import python_symbols as syms
+from saltrewrite import utils
+
+log = logging.getLogger(__name__)
+
+# The marker replacing each of the legacy decorators
+DECORATORS = {
+    "destructiveTest": "pytest.mark.destructive_test",
+    "expensiveTest": "pytest.mark.expensive_test",
+    "requires_network": "pytest.mark.requires_network",
+    "requires_salt_modules": "pytest.mark.requires_salt_modules",
+    "requires_salt_states": "pytest.mark.requires_salt_states",
+    "skip_if_binaries_missing": "pytest.mark.skip_if_binaries_missing",
+    "skip_if_not_root": "pytest.mark.skip_if_not_root",
+    "slowTest": "pytest.mark.slow_test",
+}
+# The fixes each rewriting one of the decorators, which this fix supersedes
+SUBSETS = (
+    "fix_destructive_test_decorator",
+    "fix_expensive_test_decorator",
+    "fix_requires_network_decorator",
+    "fix_requires_salt_modules_decorator",
+    "fix_requires_salt_states_decorator",
+    "fix_skip_if_binaries_missing_decorator",
+    "fix_skip_if_not_root_decorator",
+    "fix_slow_test_decorator",
+)
+# Only test modules are rewritten by this fix
+TEST_FILES_ONLY = True
+TRIGGERS = tuple(DECORATORS)
+# Path globs, relative to the project root, of the files this fix applies to
+PATHS = ("tests/**",)
+# The base classes of salt's test suite, which define no tests the classes inheriting from
+# them would inherit
+TEST_CASE_BASES = frozenset(
+    (
+        "object",
+        "TestCase",
+        "unittest.TestCase",
+        "ModuleCase",
+        "ShellCase",
+        "SSHCase",
+        "SyndicCase",
+        "MultimasterModuleCase",
+        "LoaderModuleMockMixin",
+        "SaltReturnAssertsMixin",
+    )
+)
+# Set by ``--hoist-markers`` to hoist the markers shared by all of the tests of a module, or
+# of a class, into its ``pytestmark``
+ENVIRONMENT = ("SALT_REWRITE_HOIST_MARKERS",)
+
+
+def rewrite(paths, interactive=False, silent=False):
+    """
+    Rewrite the passed in paths
+    """
+    # Don't waste time on non-test files
+    paths = utils.filter_test_files(paths)
+    if not paths:
+        return
+    get_query(paths).execute(write=True, interactive=interactive, silent=silent)
+
+
+def get_query(paths=(), decorators=None):
+    """
+    Return the query holding this fix's selectors and modifiers.
+
+    Only the ``decorators``, a mapping of legacy decorators to their markers, are rewritten
+    when passed, all of ``DECORATORS`` otherwise.
+    """
+    if decorators is None:
+        decorators = DECORATORS
+
+    def filter_not_decorated(node, capture, filename):
+        """
+        Filter nodes not decorated with any of the decorators
+        """
+        return bool(get_legacy_decorators(node, decorators))
+
+    def replace_decorators(node, capture, filename):
+        """
+        Replaces usage of the decorators with their markers
+        """
+        for decorator_name in get_legacy_decorators(node, decorators):
+            utils.rewrite_decorator(node, decorator_name, decorators[decorator_name])
+
+    query = (
+        Query(paths)
+        .select("classdef|funcdef")
+        .filter(filter_not_decorated)
+        .modify(replace_decorators)
+    )
+    if hoist_markers_enabled():
+        markers = frozenset(decorators.values())
+
+        def filter_no_shared_markers(node, capture, filename):
+            """
+            Filter modules where no marker is shared by all of the tests of a module or class
+            """
+            return bool(get_hoistable_markers(node, markers))
+
+        def hoist_shared_markers(node, capture, filename):
+            """
+            Hoist the markers shared by all of the tests of a module or class
+            """
+            for container, units, shared in get_hoistable_markers(node, markers):
+                hoist_markers(container, units, shared, markers)
+
+        # The root node is the last one visited, once all of the decorators are replaced
+        query = query.select_root().filter(filter_no_shared_markers).modify(hoist_shared_markers)
+    return query
+
+
+def get_legacy_decorators(node, decorators):
+    """
+    Return the names of the ``decorators`` the class or function ``node`` is decorated with,
+    either still, or already replaced by their marker
+    """
+    return [
+        decorator_name
+        for decorator_name, marker in decorators.items()
+        if utils.get_decorator(node, decorator_name, marker)
+    ]
+
+
+def hoist_markers_enabled():
+    """
+    Check if the shared markers should be hoisted into ``pytestmark``
+    """
+    return os.environ.get("SALT_REWRITE_HOIST_MARKERS", "") not in ("", "0")
+
+
+def get_hoistable_markers(root, markers):
+    """
+    Return a ``(container, units, shared)`` tuple for the module ``root``, and each of its
+    classes, where at least two tests all have some of the ``markers`` in common.
+
+    The ``units`` are the nodes of the tests, the classes also being units of the module,
+    and ``shared`` the source of the markers they have in common, in the order they're
+    applied to the first unit.
+
+    Hoisting must not mark any test which wasn't marked, so a module or class is left alone
+    when it already sets ``pytestmark`` or defines tests which are not units, like those
+    under an ``if`` or ``try`` statement, or in a nested class. So is a class inheriting
+    from any class but those known not to define tests, the ``TEST_CASE_BASES`` and the
+    classes of the module only inheriting from those, since the inherited tests would be
+    marked too, and a class which any class of the module inherits from, whose tests would
+    be marked.
+    """
+    hoistable = []
+    units = _get_units(root, module_level=True)
+    shared = _get_shared_markers(units, markers)
+    if shared and not _sets_pytestmark(root) and not _has_other_tests(root, units):
+        hoistable.append((root, units, shared))
+    classes = [unit for unit in units if unit.type == syms.classdef]
+    test_free_classes = _get_test_free_classes(classes)
+    # The classes of the module whose pytestmark their subclasses would inherit
+    base_classes = {
+        name.rpartition(".")[-1]
+        for node in root.pre_order()
+        if node.type == syms.classdef
+        for name in _get_base_names(node)
+    }
+    for cls in classes:
+        if cls.children[1].value in base_classes:
+            continue
+        if not test_free_classes.issuperset(_get_base_names(cls)):
+            continue
+        suite = cls.children[-1]
+        units = _get_units(suite)
+        shared = _get_shared_markers(units, markers)
+        if shared and not _sets_pytestmark(suite) and not _has_other_tests(suite, units):
+            hoistable.append((suite, units, shared))
+    return hoistable
+
+
+def hoist_markers(container, units, shared, markers):
+    """
+    Remove the ``shared`` markers from each of the ``units`` and add a ``pytestmark``
+    statement applying them to the ``container``, a module or a class body
+    """
+    for unit in units:
+        for decorator in _get_decorators(unit):
+            if _get_marker(decorator, markers) in shared:
+                _remove_decorator(decorator)
+    if container.type == syms.file_input:
+        _insert_module_statement(container, _build_pytestmark(shared, ""))
+    else:
+        _insert_class_statement(container, _build_pytestmark(shared, container.children[1].value))
+
+
+def _get_units(container, module_level=False):
+    """
+    Return the test functions defined in ``container``, and the classes too at the module level
+    """
+    units = []
+    for stmt in container.children:
+        node = stmt.children[-1] if stmt.type == syms.decorated else stmt
+        if node.type == syms.classdef:
+            if module_level:
+                units.append(node)
+            continue
+        funcdef = node.children[-1] if node.type in (syms.async_funcdef, syms.async_stmt) else node
+        if funcdef.type == syms.funcdef and funcdef.children[1].value.startswith("test"):
+            units.append(node)
+    return units
+
+
+def _get_test_free_classes(classes):
+    """
+    Return the names of the classes which can be inherited from without inheriting tests,
+    the ``TEST_CASE_BASES`` and those of the module ``classes`` which define no tests and
+    only inherit from such classes
+    """
+    by_name = {cls.children[1].value: cls for cls in classes}
+    # The module's own classes shadow the test suite's ones
+    test_free = set(TEST_CASE_BASES).difference(by_name)
+    pending = {
+        name: cls
+        for name, cls in by_name.items()
+        if not _sets_pytestmark(cls.children[-1]) and not _has_other_tests(cls.children[-1], [])
+    }
+    while True:
+        found = {
+            name for name, cls in pending.items() if test_free.issuperset(_get_base_names(cls))
+        }
+        if not found:
+            return test_free
+        test_free.update(found)
+        for name in found:
+            del pending[name]
+
+
+def _has_other_tests(container, units):
+    """
+    Check if ``container`` defines any test which is not one of the ``units``, nor in one
+    """
+    units = {id(unit) for unit in units}
+    nodes = list(container.children)
+    while nodes:
+        node = nodes.pop()
+        if id(node) in units:
+            continue
+        if node.type == syms.funcdef:
+            if node.children[1].value.startswith("test"):
+                return True
+            # Functions defined in a function are not collected
+            continue
+        nodes.extend(node.children)
+    return False
+
+
+def _get_decorators(node):
+    """
+    Return the decorator nodes of the class or function ``node``
+    """
+    if node.parent is None or node.parent.type != syms.decorated:
+        return []
+    child = node.parent.children[0]
+    if child.type == syms.decorator:
+        return [child]
+    return list(child.children)
+
+
+def _get_marker(decorator, markers):
+    """
+    Return the source of the marker ``decorator`` applies if it's one of ``markers``
+    """
+    if str(decorator.children[1]).strip() not in markers:
+        return None
+    return "".join(str(child) for child in decorator.children[1:-1]).strip()
+
+
+def _get_shared_markers(units, markers):
+    if len(units) < 2:
+        return []
+    applied = [
+        [_get_marker(decorator, markers) for decorator in _get_decorators(unit)] for unit in units
+    ]
+    return [
+        marker
+        for marker in applied[0]
+        if marker is not None and all(marker in others for others in applied[1:])
+    ]
+
+
+def _get_base_names(cls):
+    """
+    Return the names of the classes ``cls`` inherits from
+    """
+    if cls.children[2].type != TOKEN.LPAR or cls.children[3].type == TOKEN.RPAR:
+        return set()
+    bases = cls.children[3]
+    if bases.type == syms.arglist:
+        return {str(base).strip() for base in bases.children if str(base).strip() != ","}
+    return {str(bases).strip()}
+
+
+def _sets_pytestmark(container):
+    for stmt in container.children:
+        if stmt.type != syms.simple_stmt:
+            continue
+        expr = stmt.children[0]
+        if expr.type == syms.expr_stmt and str(expr.children[0]).strip() == "pytestmark":
+            return True
+    return False
+
+
+def _remove_decorator(decorator):
+    prefix = decorator.prefix
+    parent = decorator.parent
+    if parent.type == syms.decorators:
+        first = parent.children[0] is decorator
+        decorator.remove()
+        if first:
+            parent.children[0].prefix = prefix
+        if len(parent.children) == 1:
+            remaining = parent.children[0]
+            remaining.remove()
+            parent.replace(remaining)
+        return
+    # The only decorator, the decorated class or function takes its place
+    node = parent.children[-1]
+    node.remove()
+    node.prefix = prefix
+    parent.replace(node)
+
+
+def _build_pytestmark(shared, indent):
+    """
+    Return the ``pytestmark = [...]`` statement applying the ``shared`` markers
+    """
+    markers = "".join(f"{indent}    {marker},\n" for marker in shared)
+    source = f"pytestmark = [\n{markers}{indent}]\n"
+    driver = Driver(pygram.python_grammar_no_print_statement, convert=pytree.convert, logger=log)
+    stmt = driver.parse_string(source).children[0]
+    stmt.remove()
+    return stmt
+
+
+def _insert_module_statement(root, stmt):
+    """
+    Insert ``stmt`` after the last import statement, or the docstring, of the module
+    """
+    idx = None
+    for child_idx, child in enumerate(root.children):
+        if child.type == syms.simple_stmt and child.children[0].type in (
+            syms.import_name,
+            syms.import_from,
+        ):
+            idx = child_idx + 1
+    if idx is None and _is_docstring(root.children[0]):
+        idx = 1
+    if idx is None:
+        first = root.children[0]
+        stmt.prefix = first.prefix
+        first.prefix = "\n\n"
+        root.insert_child(0, stmt)
+        return
+    stmt.prefix = "\n"
+    root.insert_child(idx, stmt)
+
+
+def _insert_class_statement(suite, stmt):
+    """
+    Insert ``stmt`` first in the class body ``suite``, after its docstring
+    """
+    indent = suite.children[1].value
+    # NEWLINE and INDENT come first
+    first = suite.children[2]
+    if _is_docstring(first):
+        stmt.prefix = "\n" + indent
+        suite.insert_child(3, stmt)
+        return
+    first.prefix = "\n" + indent + first.prefix.lstrip(" \t")
+    suite.insert_child(2, stmt)
+
+
+def _is_docstring(node):
+    return node.type == syms.simple_stmt and node.children[0].type == TOKEN.STRING
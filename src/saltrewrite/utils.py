@@ -4,7 +4,10 @@
 
     @todo: add description
 """
+import fnmatch
 import os
+from collections import OrderedDict
+from contextlib import contextmanager
 
 from bowler import SYMBOL
 from bowler import TOKEN
@@ -16,6 +19,9 @@ from fissix.fixer_util import touch_import
 from fissix.pygram import python_symbols as syms
 from fissix.pytree import Leaf
 
+# The ledger of the imports to add and remove, while the imports are deferred
+_IMPORTS_LEDGER = None
+
 
 def get_indent(node):
     """
@@ -32,25 +38,206 @@ def get_indent(node):
     return indent
 
 
-def remove_import(node, name):
+class ImportIndex:
     """
-    Removes the import.
+    The imports of a module, found where ``fissix.fixer_util.find_binding`` looks for them,
+    indexed by the name they bind and by what they import.
+
+    ``import a.b`` is found by ``a.b``, ``import a.b as c`` only by ``c``, and
+    ``from p import n as a`` by ``a``, as well as by ``(p, n)`` in the ``from`` imports.
+
+    The index is built once per module and the entries of the imports removed through it are
+    dropped. Entries whose import was removed some other way are ignored when looked up.
+    Adding imports requires rebuilding the index, which :func:`ensure_import` and
+    :meth:`ImportsLedger.apply` ask for through :meth:`invalidate`.
     """
 
-    # def is_import_stmt(node):
-    #    return (
-    #        node.type == fixer_util.syms.simple_stmt  # pylint: disable=no-member
-    #        and node.children
-    #        and fixer_util.is_import(node.children[0])
-    #    )
+    def __init__(self, root):
+        self.root = root
+        self.names = None
+        self.from_names = None
+
+    def invalidate(self):
+        """
+        Have the index rebuilt when next looked up
+        """
+        self.names = None
+        self.from_names = None
+
+    # pylint: disable=no-member
+
+    def build(self):
+        """
+        (Re)build the index from the module
+        """
+        self.names = {}
+        self.from_names = {}
+        for import_node in _iter_import_nodes(self.root):
+            if import_node.type == syms.import_name:
+                self._add_import_name(import_node)
+            else:
+                self._add_import_from(import_node)
+
+    def _add_import_name(self, import_node):
+        names = import_node.children[1]
+        if names.type == syms.dotted_as_names:
+            names = [child for child in names.children if child.type != TOKEN.COMMA]
+        else:
+            names = [names]
+        for name_node in names:
+            entry = (import_node, name_node)
+            if name_node.type == syms.dotted_as_name:
+                # Only the alias is bound, ``import a as b`` is not an import of ``a``
+                self.names.setdefault(name_node.children[-1].value, []).append(entry)
+            else:
+                self.names.setdefault(_get_dotted_name(name_node), []).append(entry)
+
+    def _add_import_from(self, import_node):
+        idx = 1
+        while (
+            import_node.children[idx].type != TOKEN.NAME
+            or import_node.children[idx].value != "import"
+        ):
+            idx += 1
+        module = "".join(str(child).strip() for child in import_node.children[1:idx])
+        names = import_node.children[idx + 1]
+        if names.type == TOKEN.LPAR:
+            names = import_node.children[idx + 2]
+        if names.type == syms.import_as_names:
+            names = [child for child in names.children if child.type != TOKEN.COMMA]
+        else:
+            names = [names]
+        for name_node in names:
+            entry = (import_node, name_node)
+            if name_node.type == syms.import_as_name:
+                name, _, alias = name_node.children
+                self.from_names.setdefault((module, name.value), []).append(entry)
+                self.names.setdefault(alias.value, []).append(entry)
+            elif name_node.type == TOKEN.NAME:
+                self.from_names.setdefault((module, name_node.value), []).append(entry)
+                self.names.setdefault(name_node.value, []).append(entry)
+
+    # pylint: enable=no-member
+
+    def find(self, name, package=None):
+        """
+        Return the ``(import_node, name_node)`` of the import of ``name``, or the ``from
+        package import name`` import when ``package`` is passed, ``None`` if there's none
+        """
+        if self.names is None:
+            self.build()
+        return self._find(name, package)
+
+    def _find(self, name, package):
+        if package is None:
+            entries = self.names.get(name)
+        else:
+            entries = self.from_names.get((package, name))
+        while entries:
+            _, name_node = entries[0]
+            top = name_node
+            while top.parent is not None:
+                top = top.parent
+            if top is self.root:
+                return entries[0]
+            # Removed, or changed, since the index was built
+            entries.pop(0)
+        return None
+
+    def remove(self, name, package=None):
+        """
+        Remove the import of ``name``, or the ``from package import name`` import when
+        ``package`` is passed. Returns ``False`` if there's no such import.
+        """
+        entry = self.find(name, package)
+        if entry is None:
+            return False
+        import_node, name_node = entry
+        names = name_node.parent
+        remaining = []
+        if names is not import_node:
+            # import_as_names or dotted_as_names
+            remaining = [
+                child
+                for child in names.children
+                if child is not name_node and child.type != TOKEN.COMMA
+            ]
+        if not remaining:
+            import_node.remove()
+        else:
+            # Remove the name along with the comma separating it from the next, or previous,
+            # name. The names keep their own formatting.
+            idx = names.children.index(name_node)
+            if idx + 1 < len(names.children) and names.children[idx + 1].type == TOKEN.COMMA:
+                names.children[idx + 1].remove()
+            elif idx > 0 and names.children[idx - 1].type == TOKEN.COMMA:
+                names.children[idx - 1].remove()
+            prefix = name_node.prefix
+            name_node.remove()
+            if idx == 0:
+                # The name which is now first takes the place of the removed one
+                names.children[0].prefix = prefix
+        return True
+
+
+# pylint: disable=no-member
+# The statements which can hold the import statements find_binding() looks for
+_IMPORT_CONTAINERS = (
+    syms.simple_stmt,
+    syms.suite,
+    syms.if_stmt,
+    syms.try_stmt,
+    syms.while_stmt,
+    syms.for_stmt,
+    syms.with_stmt,
+)
+
+
+def _iter_import_nodes(node):
+    """
+    Yield the import statements of a module where ``fissix.fixer_util.find_binding`` looks
+    for them, which excludes the function and class bodies
+    """
+    for child in node.children:
+        if child.type in (syms.import_name, syms.import_from):
+            yield child
+        elif child.type in _IMPORT_CONTAINERS:
+            yield from _iter_import_nodes(child)
+
 
+# pylint: enable=no-member
+
+
+def _get_dotted_name(node):
+    return "".join(str(child).strip() for child in node.leaves())
+
+
+def get_import_index(node):
+    """
+    Return the :class:`ImportIndex` of the module ``node`` belongs to
+    """
     root = fixer_util.find_root(node)
-    if "." in name:
-        raise NotImplementedError("Dotted imports not yet supported")
+    index = getattr(root, "import_index", None)
+    if index is None:
+        index = root.import_index = ImportIndex(root)
+    return index
 
-    import_node = fixer_util.find_binding(name, root)
-    if import_node:
-        import_node.remove()
+
+def invalidate_import_index(node):
+    """
+    Have the :class:`ImportIndex` of the module ``node`` belongs to rebuilt, after adding
+    imports to it
+    """
+    index = getattr(fixer_util.find_root(node), "import_index", None)
+    if index is not None:
+        index.invalidate()
+
+
+def remove_import(node, name):
+    """
+    Removes the import binding ``name``, or importing the dotted ``name`` module.
+    """
+    get_import_index(node).remove(name)
 
 
 def get_from_imports(node):
@@ -71,28 +258,82 @@ def remove_from_import(node, package, name):
     """
     Removes the ``from X import Y`` from the module.
     """
+    get_import_index(node).remove(name, package=package)
 
-    root = fixer_util.find_root(node)
 
-    import_node = fixer_util.find_binding(name, root, package)
-    if not import_node:
-        return
-    from_imports = get_from_imports(import_node)
+class ImportsLedger:
+    """
+    The imports to add to, and remove from, a module once the fixers are done with it.
 
-    from_imports_children = []
-    while from_imports:
-        from_import = from_imports.pop(0)
-        if from_import.value == name:
-            from_import.remove()
-            continue
-        from_imports_children.append(from_import)
+    Each import statement added or removed has to look through the module's top level
+    statements, which for every converted assertion of a test module with hundreds of them
+    adds up. The ledger records each operation only once, in the order they were first
+    requested, and applies them in that same order, which gives the same module as applying
+    each of them right away.
+    """
+
+    def __init__(self):
+        self.operations = OrderedDict()
+
+    def touch_import(self, package, name):
+        """
+        Record that ``import name`` or ``from package import name`` is needed
+        """
+        self.operations.setdefault(("touch", package, name), None)
+
+    def remove_from_import(self, package, name):
+        """
+        Record that ``from package import name`` is no longer needed
+        """
+        self.operations.setdefault(("remove_from", package, name), None)
+
+    def apply(self, tree):
+        """
+        Apply the recorded operations to ``tree`` and forget about them
+        """
+        for operation, package, name in self.operations:
+            if operation == "touch":
+                touch_import(package, name, tree)
+                invalidate_import_index(tree)
+            else:
+                remove_from_import(tree, package, name)
+        self.operations.clear()
+
+
+@contextmanager
+def deferred_imports():
+    """
+    Defer the imports added by :func:`ensure_import` and removed by
+    :func:`discard_from_import` to the yielded :class:`ImportsLedger`
+    """
+    global _IMPORTS_LEDGER  # pylint: disable=global-statement
+    previous = _IMPORTS_LEDGER
+    _IMPORTS_LEDGER = ImportsLedger()
+    try:
+        yield _IMPORTS_LEDGER
+    finally:
+        _IMPORTS_LEDGER = previous
+
+
+def ensure_import(package, name, node):
+    """
+    Like ``fissix.fixer_util.touch_import``, deferred while in :func:`deferred_imports`
+    """
+    if _IMPORTS_LEDGER is None:
+        touch_import(package, name, node)
+        invalidate_import_index(node)
+    else:
+        _IMPORTS_LEDGER.touch_import(package, name)
 
-    if not from_imports_children:
-        import_node.remove()
-        return
 
-    new_import = fixer_util.FromImport(package, from_imports_children)
-    import_node.replace(new_import)
+def discard_from_import(node, package, name):
+    """
+    Like :func:`remove_from_import`, deferred while in :func:`deferred_imports`
+    """
+    if _IMPORTS_LEDGER is None:
+        remove_from_import(node, package, name)
+    else:
+        _IMPORTS_LEDGER.remove_from_import(package, name)
 
 
 def is_multiline(node):
@@ -131,18 +372,96 @@ def keyword(name, **kwargs):
     return Leaf(TOKEN.NAME, name, **kwargs)
 
 
-def filter_test_files(paths):
+# The file name globs of salt test modules
+TEST_FILE_PATTERNS = ("test_*.py",)
+
+
+def is_test_file(path, patterns=None):
+    """
+    Check if the path matches a salt test module
+    """
+    if patterns is None:
+        patterns = TEST_FILE_PATTERNS
+    basename = os.path.basename(path)
+    return any(fnmatch.fnmatch(basename, pattern) for pattern in patterns)
+
+
+def is_excluded(path, exclude):
+    """
+    Check if the path, or its base name, matches any of the ``exclude`` globs
+    """
+    if not exclude:
+        return False
+    path = os.path.normpath(path)
+    basename = os.path.basename(path)
+    return any(
+        fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(basename, pattern) for pattern in exclude
+    )
+
+
+def filter_test_files(paths, patterns=None, exclude=()):
+    """
+    Filter paths which don't match a salt test module, descending into directories
+    """
+    return list(iter_test_files(paths, patterns=patterns, exclude=exclude))
+
+
+def iter_python_files(paths, exclude=()):
     """
-    Filter paths which don't match a salt test module
+    Lazily yield the python files in ``paths``, descending into directories.
+
+    Files and directories starting with ``.`` are skipped while walking directories, the same
+    way Bowler does it, and so are the ones matching any of the ``exclude`` globs.
     """
     if not isinstance(paths, (list, tuple)):
         paths = [paths]
-    _paths = []
-    for path in paths:
-        if not os.path.basename(path).startswith("test_"):
+    for path in sorted(paths):
+        if is_excluded(path, exclude):
+            continue
+        if not os.path.isdir(path):
+            yield path
             continue
-        _paths.append(path)
-    return _paths
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(
+                dirname
+                for dirname in dirnames
+                if not dirname.startswith(".")
+                and not is_excluded(os.path.join(dirpath, dirname), exclude)
+            )
+            for filename in sorted(filenames):
+                if filename.startswith(".") or not filename.endswith(".py"):
+                    continue
+                filename = os.path.join(dirpath, filename)
+                if is_excluded(filename, exclude):
+                    continue
+                yield filename
+
+
+def iter_test_files(paths, patterns=None, exclude=()):
+    """
+    Lazily yield the salt test modules in ``paths``, descending into directories
+    """
+    for path in iter_python_files(paths, exclude=exclude):
+        if is_test_file(path, patterns=patterns):
+            yield path
+
+
+def get_node_snapshot(node):
+    """
+    Return what :func:`is_node_changed` compares ``node``, decorators included, against
+    """
+    outer = node
+    if node.parent is not None and node.parent.type == syms.decorated:  # pylint: disable=no-member
+        outer = node.parent
+    return node.parent, outer, outer.parent, str(outer)
+
+
+def is_node_changed(node, snapshot):
+    """
+    Check if ``node``, or its decorators, changed, or got replaced, since its ``snapshot``
+    """
+    parent, outer, outer_parent, source = snapshot
+    return node.parent is not parent or outer.parent is not outer_parent or str(outer) != source
 
 
 def get_decorator(node, decorator_name, marker):
@@ -218,5 +537,5 @@ def rewrite_decorator(node, decorator_name, marker):
 
     # pylint: enable=no-member
 
-    touch_import(None, "pytest", node)
-    remove_from_import(node, "tests.support.helpers", decorator_name)
+    ensure_import(None, "pytest", node)
+    discard_from_import(node, "tests.support.helpers", decorator_name)
@@ -45,3 +45,13 @@ def tempfiles(request):
     Temporary files fixture
     """
     return Tempfiles(request)
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path_factory, monkeypatch):
+    """
+    Keep what the tests cache out of the user's cache directory
+    """
+    path = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    return path
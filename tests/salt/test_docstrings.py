@@ -2,6 +2,7 @@
 import textwrap
 
 import pytest
+from saltrewrite.api import rewrite_source
 from saltrewrite.salt import fix_docstrings
 
 
@@ -155,6 +156,22 @@ def test_fix_versionadded(tempfiles, vtype):
     assert new_code == expected_code
 
 
+@pytest.mark.parametrize("vtype", ["versionadded", "versionchanged", "deprecated"])
+def test_fix_versionadded_single_colon_trigger(vtype):
+    code = textwrap.dedent(
+        """
+    def one():
+        '''
+        .. {}: 3001
+        '''
+    """.format(
+            vtype
+        )
+    )
+    new_code, _ = rewrite_source(code, fixes=["fix_docstrings"])
+    assert new_code == code.replace(f"{vtype}: 3001", f"{vtype}:: 3001")
+
+
 @pytest.mark.parametrize("vtype", ["versionadded", "versionchanged", "deprecated"])
 def test_fix_versionadded_multiple(tempfiles, vtype):
     code = textwrap.dedent(
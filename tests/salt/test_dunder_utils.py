@@ -1,13 +1,22 @@
 # pylint: disable=missing-module-docstring,missing-function-docstring,too-many-lines,redefined-outer-name
+import ast
+import json
 import logging
 import textwrap
+from concurrent.futures import ProcessPoolExecutor
 from unittest.mock import patch
 
 import pytest
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import Registry
 from saltrewrite.salt import fix_dunder_utils
+from saltrewrite.salt import utils_index
 
 log = logging.getLogger(__name__)
 
+# The fixture below patches it
+_get_salt_code_root = fix_dunder_utils._get_salt_code_root  # pylint: disable=protected-access
+
 
 @pytest.fixture(autouse=True)
 def salt_utils_package(tmp_path):
@@ -218,3 +227,256 @@ def test_fix_call_trailing_code(tempfiles):
     with open(fpath) as rfh:
         new_code = rfh.read()
     assert new_code == expected_code
+
+
+def test_utils_index(salt_utils_package, cache_home):
+    modpath = salt_utils_package / "foo.py"
+    fix_dunder_utils.invalidate_caches()
+    fix_dunder_utils._get_utils_index.cache_clear()  # pylint: disable=protected-access
+    assert fix_dunder_utils.get_utils_module_info() == {
+        "salt/utils/__init__.py": {
+            "virtualname": None,
+            "uses_salt_dunders": False,
+            "pure_functions": [],
+        },
+        "salt/utils/foo.py": {
+            "virtualname": None,
+            "uses_salt_dunders": False,
+            "pure_functions": ["bar"],
+        },
+    }
+    assert list(cache_home.joinpath("salt-rewrite", "index").glob("dunder-utils-*.json"))
+
+    # A new process loads the index from disk and only analyzes the changed modules
+    fix_dunder_utils.invalidate_caches()
+    fix_dunder_utils._get_utils_index.cache_clear()  # pylint: disable=protected-access
+    modpath.write_text("__virtualname__ = 'baz'\ndef bar():\n    return __opts__\n")
+    salt_utils_package.joinpath("__init__.py").touch()
+    with patch(
+        "saltrewrite.salt.fix_dunder_utils.analyze_utils_module",
+        wraps=fix_dunder_utils.analyze_utils_module,
+    ) as analyze:
+        assert fix_dunder_utils.get_utils_module_details("baz") == {
+            "modname": "foo",
+            "virtualname": "baz",
+            "uses_salt_dunders": True,
+            "pure_functions": frozenset(),
+        }
+    assert [call.args[0].name for call in analyze.call_args_list] == ["foo.py"]
+
+
+def test_utils_index_parallel(salt_utils_package, cache_home, monkeypatch):
+    for idx in range(5):
+        salt_utils_package.joinpath(f"mod{idx}.py").write_text(f"__virtualname__ = 'virt{idx}'\n")
+    monkeypatch.setattr(utils_index, "PARALLEL_THRESHOLD", 2)
+    monkeypatch.setattr(utils_index, "CHUNK_SIZE", 2)
+    fix_dunder_utils.invalidate_caches()
+    fix_dunder_utils._get_utils_index.cache_clear()  # pylint: disable=protected-access
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        fix_dunder_utils.warm_caches(executor)
+    index_paths = list(cache_home.joinpath("salt-rewrite", "index").glob("dunder-utils-*.json"))
+    assert len(index_paths) == 1
+    entries = json.loads(index_paths[0].read_text())["entries"]
+    assert len(entries) == 7
+    assert entries["salt/utils/mod3.py"]["info"]["virtualname"] == "virt3"
+    assert fix_dunder_utils.get_utils_module_details("virt3")["modname"] == "mod3"
+
+
+def test_utils_index_cache_dir(cache_home, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache-dir"
+    monkeypatch.setenv("SALT_REWRITE_CACHE_DIR", str(cache_dir))
+    fix_dunder_utils.invalidate_caches()
+    assert fix_dunder_utils.get_utils_module_details("foo")["pure_functions"] == {"bar"}
+    assert list(cache_dir.joinpath("index").glob("dunder-utils-*.json"))
+    assert not cache_home.joinpath("salt-rewrite").exists()
+
+    # Without the cache, the modules are analyzed again and the index isn't written
+    monkeypatch.delenv("SALT_REWRITE_CACHE_DIR")
+    monkeypatch.setenv("SALT_REWRITE_NO_CACHE", "1")
+    fix_dunder_utils.invalidate_caches()
+    with patch(
+        "saltrewrite.salt.fix_dunder_utils.analyze_utils_module",
+        wraps=fix_dunder_utils.analyze_utils_module,
+    ) as analyze:
+        assert fix_dunder_utils.get_utils_module_details("foo")["pure_functions"] == {"bar"}
+    assert analyze.call_count == 2
+    assert not cache_home.joinpath("salt-rewrite").exists()
+
+
+def test_fix_with_jobs(tempfiles):
+    code = '__utils__["foo.bar"]("one")\n'
+    fpaths = [tempfiles.makepyfile(code) for _ in range(2)]
+    fix_dunder_utils.invalidate_caches()
+    fix_dunder_utils._get_utils_index.cache_clear()  # pylint: disable=protected-access
+    engine = Engine(Registry.fixes(only_names=("fix_dunder_utils",)), silent=True)
+    assert engine.run(fpaths, jobs=2) == 0
+    for fpath in fpaths:
+        with open(fpath) as rfh:
+            assert rfh.read() == 'import salt.utils.foo\nsalt.utils.foo.bar("one")\n'
+
+
+def test_fix_dotted_module(salt_utils_package, tempfiles):
+    package_path = salt_utils_package / "vmware"
+    package_path.mkdir()
+    package_path.joinpath("__init__.py").write_text("def connect():\n    pass\n")
+    package_path.joinpath("cluster.py").write_text("__virtualname__ = 'vmcluster'\n")
+    code = textwrap.dedent(
+        """
+    __utils__["vmware.connect"]()
+    __utils__["vmware.cluster.create"]("one")
+    __utils__["vmware.vmcluster.delete"]("one")
+    """
+    )
+    expected_code = textwrap.dedent(
+        """\
+    import salt.utils.vmware
+    import salt.utils.vmware.cluster
+
+    salt.utils.vmware.connect()
+    salt.utils.vmware.cluster.create("one")
+    salt.utils.vmware.cluster.delete("one")
+    """
+    )
+    fix_dunder_utils.invalidate_caches()
+    fpath = tempfiles.makepyfile(code, prefix="test_")
+    fix_dunder_utils.rewrite(fpath)
+    with open(fpath) as rfh:
+        new_code = rfh.read()
+    assert new_code == expected_code
+
+
+def test_salt_code_root(tmp_path, monkeypatch):
+    subdir = tmp_path / "salt" / "modules"
+    subdir.mkdir(parents=True)
+    monkeypatch.delenv("SALT_REWRITE_SALT_ROOT", raising=False)
+    monkeypatch.chdir(subdir)
+    fix_dunder_utils.invalidate_caches()
+    assert _get_salt_code_root(str(subdir / "foo.py")) == tmp_path
+    assert _get_salt_code_root() == tmp_path
+    monkeypatch.setenv("SALT_REWRITE_SALT_ROOT", str(subdir))
+    assert _get_salt_code_root(str(subdir / "foo.py")) == subdir
+
+
+def test_pure_functions():
+    code = textwrap.dedent(
+        """
+        import os
+
+        try:
+            import yaml
+
+            def load(data):
+                return yaml.safe_load(data)
+
+        except ImportError:
+
+            def load(data):
+                return data
+
+        def pure(path):
+            return helper(os.path.basename(path))
+
+        def helper(name):
+            return name.upper()
+
+        def impure():
+            return __opts__["id"]
+
+        def calls_impure():
+            return indirect()
+
+        def indirect():
+            return impure()
+
+        class Client:
+            def get(self):
+                return __salt__["cmd.run"]("ls")
+
+        def make_client():
+            return Client()
+
+        def recursive(value):
+            return recursive(value - 1) if value else pure("")
+        """
+    )
+    parser = fix_dunder_utils.DunderParser()
+    parser.visit(ast.parse(code))
+    assert parser.uses_salt_dunders is True
+    assert parser.get_pure_functions() == ["helper", "load", "pure", "recursive"]
+
+    parser = fix_dunder_utils.DunderParser()
+    parser.visit(ast.parse(code + "\nCACHE = __context__\n"))
+    assert parser.get_pure_functions() == []
+
+
+@pytest.mark.parametrize(
+    "assignment",
+    [
+        "alias = _impure",
+        "alias: Callable = _impure",
+        "alias = {'x': _impure}",
+        "alias = functools.partial(_impure, 1)",
+        "alias, other = _impure, None",
+        "alias = {}\nalias['x'] = _impure",
+        "alias = {}\nalias |= {'x': _impure}",
+        "if True:\n    alias = [_impure]",
+    ],
+)
+def test_pure_functions_module_level_assignments(assignment):
+    code = textwrap.dedent(
+        """
+        import functools
+
+        def _impure():
+            return __opts__["id"]
+
+        {}
+
+        def uses_alias():
+            return alias["x"]()
+
+        def pure():
+            return CONSTANT
+
+        CONSTANT = 1
+        """
+    ).format(assignment)
+    parser = fix_dunder_utils.DunderParser()
+    parser.visit(ast.parse(code))
+    assert parser.get_pure_functions() == ["pure"]
+
+
+def test_fix_pure_function_of_impure_module(salt_utils_package, tempfiles, capsys):
+    salt_utils_package.joinpath("mixed.py").write_text(
+        textwrap.dedent(
+            """
+            def pure(one):
+                return _helper(one)
+
+            def _helper(one):
+                return one
+
+            def impure(one):
+                return __salt__["cmd.run"](one)
+            """
+        )
+    )
+    code = textwrap.dedent(
+        """\
+    __utils__["mixed.pure"]("one")
+    __utils__["mixed.impure"]("one")
+    """
+    )
+    expected_code = textwrap.dedent(
+        """\
+    import salt.utils.mixed
+    salt.utils.mixed.pure("one")
+    __utils__["mixed.impure"]("one")
+    """
+    )
+    fpath = tempfiles.makepyfile(code, prefix="test_")
+    fix_dunder_utils.rewrite(fpath)
+    with open(fpath) as rfh:
+        new_code = rfh.read()
+    assert new_code == expected_code
+    assert "Not calling 'salt.utils.mixed.impure' directly" in capsys.readouterr().err
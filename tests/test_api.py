@@ -0,0 +1,86 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import textwrap
+
+import pytest
+from saltrewrite.api import rewrite_source
+from saltrewrite.engine import Change
+
+
+def test_rewrite_source():
+    code = textwrap.dedent(
+        """
+    import pytest
+    from unittest import TestCase
+    from tests.support.helpers import slowTest
+
+    class TestFoo(TestCase):
+
+        @slowTest
+        def test_one(self):
+            self.assertEqual(1, 1)
+            self.assertTrue(True)
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    import pytest
+    from unittest import TestCase
+
+
+    class TestFoo(TestCase):
+
+        @pytest.mark.slow_test
+        def test_one(self):
+            assert 1 == 1
+            assert True
+    """
+    )
+    new_code, changes = rewrite_source(code, fixes=["fix_asserts", "fix_slow_test_decorator"])
+    assert new_code == expected_code
+    assert changes == [
+        # The removed import is not attributed to a single fix, fix_asserts runs after the
+        # decorator fixes
+        Change(
+            ("fix_slow_test_decorator", "fix_asserts"),
+            4,
+            5,
+            "from tests.support.helpers import slowTest\n",
+            "\n",
+        ),
+        Change(
+            ("fix_slow_test_decorator",),
+            8,
+            9,
+            "    @slowTest\n",
+            "    @pytest.mark.slow_test\n",
+        ),
+        Change(
+            ("fix_asserts",),
+            10,
+            12,
+            "        self.assertEqual(1, 1)\n        self.assertTrue(True)\n",
+            "        assert 1 == 1\n        assert True\n",
+        ),
+    ]
+
+
+def test_rewrite_source_filename():
+    code = "self.assertTrue(True)\nwarn_until('Argon', 'Deprecated')"
+    new_code, _ = rewrite_source(code, fixes=["fix_asserts", "fix_warn_until"])
+    assert new_code == "assert True\nwarn_until(3008, 'Deprecated')"
+    new_code, _ = rewrite_source(code, fixes=["fix_asserts", "fix_warn_until"], filename="foo.py")
+    assert new_code == "self.assertTrue(True)\nwarn_until(3008, 'Deprecated')"
+
+
+def test_rewrite_source_unchanged():
+    assert rewrite_source("import os\n", fixes=["fix_warn_until"]) == ("import os\n", [])
+
+
+def test_rewrite_source_unchanged_without_trailing_newline():
+    code = 'warn_until(3008, "Deprecated")'
+    assert rewrite_source(code, fixes=["fix_warn_until"]) == (code, [])
+
+
+def test_rewrite_source_unknown_fix():
+    with pytest.raises(ValueError):
+        rewrite_source("import os\n", fixes=["fix_unknown"])
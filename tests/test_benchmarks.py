@@ -0,0 +1,30 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import pytest
+from benchmarks import corpus
+from benchmarks import runner
+
+
+def test_generate_corpus(tmp_path):
+    files = corpus.generate_corpus(tmp_path / "one", size=3, seed=1)
+    assert "salt/modules/bench_mod_2.py" in files
+    assert "tests/unit/modules/test_bench_mod_2.py" in files
+    assert corpus.generate_corpus(tmp_path / "two", size=3, seed=1) == files
+    for path in files:
+        assert (tmp_path / "one" / path).read_bytes() == (tmp_path / "two" / path).read_bytes()
+
+
+def test_corpus_size():
+    assert corpus.get_size("medium") == 100
+    assert corpus.get_size("7") == 7
+    with pytest.raises(ValueError):
+        corpus.get_size("huge")
+
+
+def test_run_benchmark(tmp_path):
+    files = corpus.generate_corpus(tmp_path / "corpus", size=2)
+    result = runner.run_benchmark("fix_warn_until", tmp_path / "corpus", tmp_path)
+    assert result["fixes"] == ["fix_warn_until"]
+    assert result["files"] == len(files)
+    # Both execution modules call warn_until
+    assert result["changed_files"] == 2
+    assert result["seconds"] > 0
@@ -0,0 +1,135 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import importlib
+import os
+import sys
+import textwrap
+from unittest.mock import patch
+
+from saltrewrite import cache as cache_module
+from saltrewrite.cache import ResultCache
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import Registry
+from saltrewrite.salt import fix_docstrings
+from saltrewrite.salt import fix_warn_until
+from saltrewrite.testsuite import fix_legacy_decorators
+
+
+def test_key_changes_with_contents_and_fixes(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache.get_key(b"foo", [("fix_warn_until", fix_warn_until)])
+    assert key == cache.get_key(b"foo", [("fix_warn_until", fix_warn_until)])
+    assert key != cache.get_key(b"bar", [("fix_warn_until", fix_warn_until)])
+    assert key != cache.get_key(b"foo", [("fix_docstrings", fix_docstrings)])
+    assert key != cache.get_key(
+        b"foo", [("fix_warn_until", fix_warn_until), ("fix_docstrings", fix_docstrings)]
+    )
+
+
+def test_key_changes_with_environment(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path)
+    fixes = [("fix_legacy_decorators", fix_legacy_decorators)]
+    key = cache.get_key(b"foo", fixes)
+    monkeypatch.setenv("SALT_REWRITE_HOIST_MARKERS", "1")
+    assert key != cache.get_key(b"foo", fixes)
+    monkeypatch.delenv("SALT_REWRITE_HOIST_MARKERS")
+    assert key == cache.get_key(b"foo", fixes)
+
+
+def test_key_changes_with_helpers(tmp_path, monkeypatch):
+    package = tmp_path / "fixes_pkg"
+    package.mkdir()
+    package.joinpath("__init__.py").write_text("")
+    package.joinpath("helpers.py").write_text("def rewrite(node):\n    pass\n")
+    package.joinpath("fix_foo.py").write_text("from fixes_pkg import helpers\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    fix_foo = importlib.import_module("fixes_pkg.fix_foo")
+    key = ResultCache(tmp_path).get_key(b"foo", [("fix_foo", fix_foo)])
+    package.joinpath("helpers.py").write_text("def rewrite(node):\n    return node\n")
+    # The source code is hashed once per process
+    cache_module._get_tree_digest.cache_clear()  # pylint: disable=protected-access
+    assert key != ResultCache(tmp_path).get_key(b"foo", [("fix_foo", fix_foo)])
+    monkeypatch.delitem(sys.modules, "fixes_pkg")
+    monkeypatch.delitem(sys.modules, "fixes_pkg.fix_foo")
+    monkeypatch.delitem(sys.modules, "fixes_pkg.helpers")
+
+
+def test_add_and_contains(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache.get_key(b"foo", [("fix_warn_until", fix_warn_until)])
+    assert key not in cache
+    cache.add(key)
+    assert key in cache
+    assert ResultCache(tmp_path).entries() == cache.entries()
+
+
+def test_prune(tmp_path):
+    cache = ResultCache(tmp_path, max_entries=2)
+    keys = [cache.get_key(str(idx).encode(), []) for idx in range(4)]
+    for mtime, key in enumerate(keys):
+        cache.add(key)
+        os.utime(cache._entry_path(key), (mtime, mtime))  # pylint: disable=protected-access
+    assert cache.prune() == 2
+    assert [key in cache for key in keys] == [False, False, True, True]
+
+
+def test_maybe_prune(tmp_path):
+    cache = ResultCache(tmp_path, max_entries=1024)
+    for idx in range(4):
+        key = cache.get_key(str(idx).encode(), [])
+        cache.add(key)
+    shards = {int(entry.parent.name, 16) for entry in cache.entries()}
+    empty_shard = next(shard for shard in range(256) if shard not in shards)
+    assert not cache.needs_pruning(min(shards))
+    cache.max_entries = 2
+    assert cache.needs_pruning(min(shards))
+    assert not cache.needs_pruning(empty_shard)
+    # Only a sample of the cache is looked at unless pruning is needed
+    with patch.object(cache, "needs_pruning", return_value=False), patch.object(
+        cache, "prune"
+    ) as prune:
+        assert cache.maybe_prune() == 0
+    prune.assert_not_called()
+    with patch.object(cache, "needs_pruning", return_value=True):
+        assert cache.maybe_prune() == 2
+    assert len(cache.entries()) == 2
+
+
+def test_clear(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    cache.add(cache.get_key(b"foo", []))
+    assert cache.entries()
+    cache.clear()
+    assert not cache.entries()
+
+
+def test_engine_skips_unchanged_files(tempfiles, tmp_path):
+    code = textwrap.dedent(
+        """
+    warn_until(3008, "Deprecated")
+    """
+    )
+    fpath = tempfiles.makepyfile(code)
+    cache = ResultCache(tmp_path)
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), cache=cache)
+    assert engine.run([fpath]) == 0
+    assert len(cache.entries()) == 1
+
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), cache=cache)
+    with patch.object(engine, "get_tool") as get_tool:
+        assert engine.run([fpath]) == 0
+    get_tool.assert_not_called()
+
+
+def test_engine_does_not_cache_changed_files(tempfiles, tmp_path):
+    code = textwrap.dedent(
+        """
+    warn_until("Argon", "Deprecated")
+    """
+    )
+    fpath = tempfiles.makepyfile(code)
+    cache = ResultCache(tmp_path)
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), cache=cache)
+    assert engine.run([fpath]) == 0
+    assert not cache.entries()
+    with open(fpath) as rfh:
+        assert rfh.read() == code.replace('"Argon"', "3008")
@@ -0,0 +1,86 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import textwrap
+
+import pytest
+from click.testing import CliRunner
+from saltrewrite import config
+
+
+def test_find_project_root(tmp_path):
+    tmp_path.joinpath("pyproject.toml").write_text("")
+    subdir = tmp_path / "tests" / "unit"
+    subdir.mkdir(parents=True)
+    assert config.find_project_root(subdir) == tmp_path.resolve()
+    assert config.find_project_root(tmp_path) == tmp_path.resolve()
+
+
+def test_get_common_parent(tmp_path, monkeypatch):
+    tests_dir = tmp_path / "tests"
+    tests_dir.mkdir()
+    salt_dir = tmp_path / "salt"
+    salt_dir.mkdir()
+    tests_file = tests_dir / "test_foo.py"
+    tests_file.write_text("")
+    assert config.get_common_parent([tests_file]) == tests_dir.resolve()
+    assert config.get_common_parent([tests_dir]) == tests_dir.resolve()
+    assert config.get_common_parent([tests_file, salt_dir]) == tmp_path.resolve()
+    monkeypatch.chdir(salt_dir)
+    assert config.get_common_parent([]) == salt_dir.resolve()
+
+
+def test_project_root_from_paths(tmp_path, monkeypatch):
+    rewrite = pytest.importorskip("saltrewrite.__main__").rewrite
+    # Running from a parent directory with a pyproject.toml of its own
+    tmp_path.joinpath("pyproject.toml").write_text("")
+    project = tmp_path / "project"
+    project.joinpath("tests").mkdir(parents=True)
+    project.joinpath("pyproject.toml").write_text("")
+    fpath = project / "tests" / "test_foo.py"
+    fpath.write_text(
+        textwrap.dedent(
+            """
+        from tests.support.helpers import slowTest
+
+        @slowTest
+        def test_foo():
+            pass
+        """
+        )
+    )
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(
+        rewrite, ["--no-cache", "-j", "1", "-F", "fix_legacy_decorators", str(fpath)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "@pytest.mark.slow_test" in fpath.read_text()
+
+
+def test_load_config(tmp_path):
+    assert config.load_config(tmp_path) == {}
+    tmp_path.joinpath("pyproject.toml").write_text(
+        textwrap.dedent(
+            """
+        [tool.black]
+        line-length = 100
+
+        [tool.salt-rewrite.paths]
+        fix_dunder_utils = ["salt/**", "tools/**"]
+        """
+        )
+    )
+    loaded = config.load_config(tmp_path)
+    assert config.get_fix_paths(loaded) == {"fix_dunder_utils": ("salt/**", "tools/**")}
+
+
+def test_bad_config(tmp_path):
+    tmp_path.joinpath("pyproject.toml").write_text("[tool.salt-rewrite")
+    with pytest.raises(RuntimeError):
+        config.load_config(tmp_path)
+    with pytest.raises(RuntimeError):
+        config.get_fix_paths({"paths": {"fix_dunder_utils": "salt/**"}})
+
+
+def test_path_matches():
+    assert config.path_matches("tests/unit/test_foo.py", ("tests/**",))
+    assert not config.path_matches("salt/tests/test_foo.py", ("tests/**",))
+    assert config.path_matches("salt/utils/foo.py", ("tests/**", "salt/**"))
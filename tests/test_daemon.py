@@ -0,0 +1,168 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import io
+import os
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+import pytest
+from saltrewrite import client
+from saltrewrite import daemon
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import Registry
+from saltrewrite.salt import fix_dunder_utils
+
+CODE = textwrap.dedent(
+    """
+    warn_until("Argon", "Deprecated")
+    """
+)
+EXPECTED_CODE = textwrap.dedent(
+    """
+    warn_until(3008, "Deprecated")
+    """
+)
+
+
+def test_messages():
+    buf = io.BytesIO()
+    daemon.send_message(buf, argv=["--check", "."], cwd="/")
+    daemon.send_message(buf, exit=1)
+    buf.seek(0)
+    assert daemon.read_message(buf) == {"argv": ["--check", "."], "cwd": "/"}
+    assert daemon.read_message(buf) == {"exit": 1}
+    assert daemon.read_message(buf) is None
+
+
+def test_stream_writer():
+    buf = io.BytesIO()
+    stream = daemon._StreamWriter(buf, "stderr")  # pylint: disable=protected-access
+    click.echo("Running fix_warn_until ...", file=stream)
+    buf.seek(0)
+    assert daemon.read_message(buf) == {"stderr": "Running fix_warn_until ...\n"}
+    with pytest.raises(TypeError):
+        stream.write(b"")
+
+
+def test_state_engines():
+    state = daemon.DaemonState(jobs=1)
+    engines = []
+
+    def factory():
+        engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), silent=True)
+        engines.append(engine)
+        return engine
+
+    engine = state.get_engine("key", factory)
+    engine.changed.append("foo.py")
+    assert state.get_engine("key", factory) is engine
+    # The reused engine forgets about the previous invocation
+    assert engine.changed == []
+    assert state.get_engine("other-key", factory) is not engine
+    assert len(engines) == 2
+
+
+def test_run_reuses_executor(tempfiles):
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), silent=True)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for _ in range(2):
+            fpaths = [tempfiles.makepyfile(CODE) for _ in range(3)]
+            engine.reset()
+            assert engine.run(fpaths, jobs=2, executor=executor) == 0
+            for fpath in fpaths:
+                with open(fpath) as rfh:
+                    assert rfh.read() == EXPECTED_CODE
+
+
+def test_dunder_utils_invalidate_caches(tmp_path, monkeypatch):
+    utils_path = tmp_path / "salt" / "utils"
+    utils_path.mkdir(parents=True)
+    utils_module = utils_path / "foo.py"
+    utils_module.write_text("def bar():\n    pass\n")
+    monkeypatch.chdir(tmp_path)
+    fix_dunder_utils.invalidate_caches()
+    assert fix_dunder_utils.get_utils_module_details("foo")["uses_salt_dunders"] is False
+    utils_module.write_text("def bar():\n    return __opts__\n")
+    assert fix_dunder_utils.get_utils_module_details("foo")["uses_salt_dunders"] is False
+    fix_dunder_utils.invalidate_caches()
+    assert fix_dunder_utils.get_utils_module_details("foo")["uses_salt_dunders"] is True
+
+
+def _run_client(*args):
+    # The client runs in its own process since the daemon redirects this process' stdout
+    return subprocess.run(
+        [sys.executable, "-m", "saltrewrite.client", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=False,
+    )
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Requires Unix sockets")
+def test_daemon(tempfiles, tmp_path):
+    pytest.importorskip("saltrewrite.__main__")
+    socket_path = str(tmp_path / "salt-rewrite.sock")
+    assert client.forward(["--version"], socket_path=socket_path) is None
+
+    thread = threading.Thread(target=daemon.serve, args=(socket_path,), kwargs={"jobs": 2})
+    thread.start()
+    try:
+        for _ in range(100):
+            if daemon.is_running(socket_path):
+                break
+            thread.join(0.1)
+        fpath = tempfiles.makepyfile(CODE)
+        args = ["--socket", socket_path, "--no-cache", "-F", "fix_warn_until"]
+        ret = _run_client(*args, "--check", fpath)
+        assert ret.returncode == 1
+        assert "1 file(s) would be rewritten" in ret.stderr
+        ret = _run_client(*args, fpath)
+        assert ret.returncode == 0
+        assert "Running fix_warn_until ..." in ret.stderr
+        with open(fpath) as rfh:
+            assert rfh.read() == EXPECTED_CODE
+        ret = _run_client("--socket", socket_path, "--bogus")
+        assert ret.returncode == 2
+        assert "No such option: --bogus" in ret.stderr
+        # Interactive runs are handed back to the client, however the flags are combined
+        for interactive in ("-i", "-si", "-Si", "--interactive"):
+            assert client.forward([interactive, fpath], socket_path=socket_path) is None
+    finally:
+        assert _run_client("--socket", socket_path, "--stop-daemon").returncode == 0
+        thread.join()
+    assert not os.path.exists(socket_path)
+    assert daemon.get_state() is None
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Requires Unix sockets")
+def test_daemon_default_engine(tmp_path, monkeypatch):
+    pytest.importorskip("saltrewrite.__main__")
+    socket_path = str(tmp_path / "salt-rewrite.sock")
+    fpath = tmp_path / "foo.py"
+    fpath.write_text(CODE)
+    monkeypatch.chdir(tmp_path)
+    thread = threading.Thread(target=daemon.serve, args=(socket_path,), kwargs={"jobs": 2})
+    thread.start()
+    try:
+        for _ in range(100):
+            if daemon.is_running(socket_path):
+                break
+            thread.join(0.1)
+        state = daemon.get_state()
+        # The engine of the invocations with the default options is ready before the first one
+        (engine,) = state.engines.values()
+        assert engine._tools  # pylint: disable=protected-access
+        ret = _run_client("--socket", socket_path)
+        assert ret.returncode == 0, ret.stderr
+        assert fpath.read_text() == EXPECTED_CODE
+        # The invocation was served by the warmed up engine, using the daemon's pool
+        assert list(state.engines.values()) == [engine]
+        assert state._executor is not None  # pylint: disable=protected-access
+    finally:
+        assert _run_client("--socket", socket_path, "--stop-daemon").returncode == 0
+        thread.join()
@@ -0,0 +1,261 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import textwrap
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from bowler import Query
+from saltrewrite import engine as engine_module
+from saltrewrite.engine import Engine
+from saltrewrite.engine import schedule_fixes
+from saltrewrite.fixes import Registry
+from saltrewrite.salt import fix_warn_until
+from saltrewrite.testsuite import fix_asserts
+from saltrewrite.testsuite import fix_slow_test_decorator
+
+
+def test_multiple_fixes_single_pass(tempfiles):
+    code = textwrap.dedent(
+        """
+    from unittest import TestCase
+    from tests.support.helpers import slowTest
+    import salt.utils.versions
+
+    class TestFoo(TestCase):
+
+        @slowTest
+        def test_one(self):
+            salt.utils.versions.warn_until("Argon", "Deprecated")
+            self.assertEqual(1, 1)
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    from unittest import TestCase
+
+    import salt.utils.versions
+    import pytest
+
+    class TestFoo(TestCase):
+
+        @pytest.mark.slow_test
+        def test_one(self):
+            salt.utils.versions.warn_until(3008, "Deprecated")
+            assert 1 == 1
+    """
+    )
+    fpath = tempfiles.makepyfile(code, prefix="test_")
+    engine = Engine(
+        Registry.fixes(
+            only_names=("fix_asserts", "fix_slow_test_decorator", "fix_warn_until"),
+        )
+    )
+    assert engine.run([fpath]) == 0
+    with open(fpath) as rfh:
+        new_code = rfh.read()
+    assert new_code == expected_code
+
+    # Running the fixes one after the other produces the same code
+    fpath = tempfiles.makepyfile(code, prefix="test_")
+    for module in (fix_slow_test_decorator, fix_warn_until, fix_asserts):
+        module.rewrite(fpath)
+    with open(fpath) as rfh:
+        new_code = rfh.read()
+    assert new_code == expected_code
+
+
+def test_filename_filter(tempfiles):
+    code = textwrap.dedent(
+        """
+    from tests.support.helpers import slowTest
+
+    @slowTest
+    def foo():
+        salt.utils.versions.warn_until("Argon", "Deprecated")
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    from tests.support.helpers import slowTest
+
+    @slowTest
+    def foo():
+        salt.utils.versions.warn_until(3008, "Deprecated")
+    """
+    )
+    fpath = tempfiles.makepyfile(code, prefix="foo_")
+    engine = Engine(Registry.fixes(only_names=("fix_slow_test_decorator", "fix_warn_until")))
+    assert engine.get_fix_names(fpath, code.encode()) == ("fix_warn_until",)
+    assert engine.run([fpath]) == 0
+    with open(fpath) as rfh:
+        new_code = rfh.read()
+    assert new_code == expected_code
+
+
+def test_triggers(tempfiles):
+    code = textwrap.dedent(
+        """
+    def foo():
+        return __salt__["test.ping"]()
+    """
+    )
+    fpath = tempfiles.makepyfile(code)
+    engine = Engine(Registry.fixes(only_names=("fix_dunder_utils", "fix_warn_until")))
+    assert not engine.get_fix_names(fpath, code.encode())
+    assert engine.get_fix_names(fpath, b"warn_until(3008)") == ("fix_warn_until",)
+    assert engine.run([fpath]) == 0
+    # No fix was triggered, nothing got parsed
+    assert not engine._tools  # pylint: disable=protected-access
+
+
+def test_regex_triggers():
+    engine = Engine(Registry.fixes(only_names=("fix_docstrings",)))
+    assert not engine.get_fix_names("foo.py", b"def foo(): pass")
+    assert engine.get_fix_names("foo.py", b"    cli example:") == ("fix_docstrings",)
+    assert engine.get_fix_names("foo.py", b".. versionadded:: 3006") == ("fix_docstrings",)
+
+
+def test_jobs(tempfiles):
+    code = textwrap.dedent(
+        """
+    warn_until("Argon", "Deprecated")
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    warn_until(3008, "Deprecated")
+    """
+    )
+    fpaths = [tempfiles.makepyfile(code * (idx + 1)) for idx in range(4)]
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), silent=True)
+    assert engine.run(fpaths, jobs=2) == 0
+    for idx, fpath in enumerate(fpaths):
+        with open(fpath) as rfh:
+            new_code = rfh.read()
+        assert new_code == expected_code * (idx + 1)
+
+
+def test_check(tempfiles):
+    code = textwrap.dedent(
+        """
+    warn_until("Argon", "Deprecated")
+    """
+    )
+    fpaths = [tempfiles.makepyfile(code), tempfiles.makepyfile("import os\n")]
+    fpaths.append(tempfiles.makepyfile(code))
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), check=True)
+    assert engine.run(fpaths) == 1
+    assert engine.changed == sorted([fpaths[0], fpaths[2]])
+    for fpath in fpaths:
+        with open(fpath) as rfh:
+            assert rfh.read() in (code, "import os\n")
+
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), check=True, fail_fast=True)
+    assert engine.run(fpaths) == 1
+    assert len(engine.changed) == 1
+
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), check=True)
+    assert engine.run([fpaths[1]]) == 0
+    assert not engine.changed
+
+
+def test_test_file_patterns():
+    engine = Engine(Registry.fixes(only_names=("fix_slow_test_decorator",)))
+    assert engine.get_fix_names("tests/test_foo.py", b"@slowTest") == ("fix_slow_test_decorator",)
+    assert not engine.get_fix_names("tests/foo_test.py", b"@slowTest")
+    engine = Engine(
+        Registry.fixes(only_names=("fix_slow_test_decorator",)),
+        test_file_patterns=["*_test.py"],
+    )
+    assert not engine.get_fix_names("tests/test_foo.py", b"@slowTest")
+    assert engine.get_fix_names("tests/foo_test.py", b"@slowTest") == ("fix_slow_test_decorator",)
+
+
+def test_path_scoping(tmp_path):
+    engine = Engine(
+        Registry.fixes(only_names=("fix_slow_test_decorator", "fix_warn_until")), root=tmp_path
+    )
+    data = b"@slowTest\nwarn_until('Argon', 'Deprecated')"
+    assert engine.get_fix_names(str(tmp_path / "tests" / "unit" / "test_foo.py"), data) == (
+        "fix_slow_test_decorator",
+        "fix_warn_until",
+    )
+    assert engine.get_fix_names(str(tmp_path / "salt" / "test_foo.py"), data) == ("fix_warn_until",)
+    # Files outside of the project root are not path scoped
+    assert engine.get_fix_names(str(tmp_path.parent / "test_foo.py"), data) == (
+        "fix_slow_test_decorator",
+        "fix_warn_until",
+    )
+
+
+def test_path_scoping_override(tmp_path):
+    engine = Engine(
+        Registry.fixes(only_names=("fix_slow_test_decorator", "fix_warn_until")),
+        root=tmp_path,
+        fix_paths={"fix_slow_test_decorator": ["pkg/tests/*"], "fix_warn_until": ["salt/**"]},
+    )
+    data = b"@slowTest\nwarn_until('Argon', 'Deprecated')"
+    assert not engine.get_fix_names(str(tmp_path / "tests" / "test_foo.py"), data)
+    assert engine.get_fix_names(str(tmp_path / "pkg" / "tests" / "test_foo.py"), data) == (
+        "fix_slow_test_decorator",
+    )
+    assert engine.get_fix_names(str(tmp_path / "salt" / "foo.py"), data) == ("fix_warn_until",)
+
+
+def test_schedule_fixes():
+    modules = {
+        "fix_a": types.SimpleNamespace(),
+        "fix_b": types.SimpleNamespace(RUN_AFTER=("fix_a", "fix_unselected")),
+        "fix_c": types.SimpleNamespace(CONFLICTS=("fix_a",)),
+        "fix_d": types.SimpleNamespace(),
+    }
+    assert schedule_fixes(("fix_a", "fix_d"), modules) == (("fix_a", "fix_d"),)
+    assert schedule_fixes(("fix_b", "fix_d"), modules) == (("fix_b", "fix_d"),)
+    assert schedule_fixes(("fix_a", "fix_b", "fix_d"), modules) == (
+        ("fix_a", "fix_d"),
+        ("fix_b",),
+    )
+    assert schedule_fixes(("fix_a", "fix_b", "fix_c", "fix_d"), modules) == (
+        ("fix_a", "fix_d"),
+        ("fix_b", "fix_c"),
+    )
+    assert schedule_fixes(("fix_c", "fix_a"), modules) == (("fix_c",), ("fix_a",))
+    modules["fix_a"].RUN_AFTER = ("fix_b",)
+    with pytest.raises(RuntimeError, match="fix_a -> fix_b -> fix_a"):
+        schedule_fixes(("fix_a", "fix_b"), modules)
+
+
+def test_stages():
+    engine = Engine(Registry.fixes(only_names=("fix_asserts", "fix_slow_test_decorator")))
+    assert engine.get_stages(("fix_asserts", "fix_slow_test_decorator")) == (
+        ("fix_slow_test_decorator",),
+        ("fix_asserts",),
+    )
+    assert engine.get_stages(("fix_asserts",)) == (("fix_asserts",),)
+
+
+def test_changes_only_attributed_to_changing_fixes():
+    def noop(node, capture, filename):
+        return None
+
+    fix_noop = types.SimpleNamespace(
+        get_query=lambda: Query().select_function("warn_until").modify(noop)
+    )
+    engine = Engine([("fix_noop", fix_noop), ("fix_warn_until", fix_warn_until)])
+    new_code, changes = engine.refactor_string('warn_until("Argon", "Deprecated")\n')
+    assert new_code == 'warn_until(3008, "Deprecated")\n'
+    assert [change.fixes for change in changes] == [("fix_warn_until",)]
+
+
+def test_pool_failures(tempfiles, monkeypatch):
+    def refactor_in_worker(task, filename, report):
+        raise RuntimeError(f"Failed on {filename}")
+
+    monkeypatch.setattr(engine_module, "_refactor_in_worker", refactor_in_worker)
+    fpaths = [tempfiles.makepyfile('warn_until("Argon", "Deprecated")\n') for _ in range(2)]
+    engine = Engine(Registry.fixes(only_names=("fix_warn_until",)), silent=True)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert engine.run(fpaths, jobs=2, executor=executor) == 1
+    assert sorted(str(exc) for exc in engine.exceptions) == sorted(
+        f"Failed on {fpath}" for fpath in fpaths
+    )
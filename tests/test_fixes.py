@@ -0,0 +1,103 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import subprocess
+import sys
+import textwrap
+
+import pytest
+import saltrewrite.fixes
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import ENTRY_POINT_GROUP
+from saltrewrite.fixes import Registry
+from saltrewrite.fixes import RegistryClass
+
+try:
+    from importlib.metadata import EntryPoint
+except ImportError:
+    from importlib_metadata import EntryPoint
+
+
+@pytest.mark.parametrize("name", Registry.fix_names())
+def test_static_metadata(name):
+    info = Registry.fix_info(name)
+    module = Registry.get_module(name)
+    assert module.__name__ == info.module
+    assert info.name == name == module.__name__.split(".")[-1]
+    assert getattr(module, "FIX_PRIORITY", 0) == info.priority
+    assert info.description
+
+
+def test_lazy_imports():
+    code = textwrap.dedent(
+        """
+        import sys
+        from saltrewrite.fixes import Registry
+
+        assert Registry.fix_names()
+        assert "bowler" not in sys.modules
+        assert [name for name, _ in Registry.fixes(only_names=["fix_warn_until"])] == [
+            "fix_warn_until"
+        ]
+        assert "saltrewrite.salt.fix_warn_until" in sys.modules
+        assert "saltrewrite.testsuite.fix_asserts" not in sys.modules
+        """
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+PLUGIN_CODE = """
+from bowler import Query
+
+FIX_PRIORITY = -1
+TRIGGERS = ("old_function",)
+
+
+def get_query(paths=()):
+    return Query(paths).select_function("old_function").rename("new_function")
+"""
+
+
+@pytest.fixture
+def plugin_registry(tmp_path, monkeypatch):
+    tmp_path.joinpath("salt_rewrite_plugin_fix.py").write_text(PLUGIN_CODE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    entry_points = [
+        EntryPoint("fix_plugin", "salt_rewrite_plugin_fix", ENTRY_POINT_GROUP),
+        # Built-in fixes can't be overridden
+        EntryPoint("fix_asserts", "salt_rewrite_plugin_fix", ENTRY_POINT_GROUP),
+        EntryPoint("fix_not_a_module", "salt_rewrite_plugin_fix:get_query", ENTRY_POINT_GROUP),
+    ]
+    monkeypatch.setattr(saltrewrite.fixes, "_iter_entry_points", lambda group: entry_points)
+    yield RegistryClass()
+    sys.modules.pop("salt_rewrite_plugin_fix", None)
+
+
+def test_plugins(plugin_registry):
+    assert plugin_registry.fix_names()[-1] == "fix_plugin"
+    assert "fix_not_a_module" not in plugin_registry.fix_names()
+    assert plugin_registry.fix_info("fix_asserts").module == "saltrewrite.testsuite.fix_asserts"
+    assert plugin_registry.fix_info("fix_plugin").priority is None
+    # The plugin is not imported until selected
+    assert "salt_rewrite_plugin_fix" not in sys.modules
+    fixes = list(plugin_registry.fixes(only_names=("fix_warn_until", "fix_plugin")))
+    # Sorted by their FIX_PRIORITY
+    assert [name for name, _ in fixes] == ["fix_plugin", "fix_warn_until"]
+
+    engine = Engine(fixes)
+    new_code, _ = engine.refactor_string("old_function(warn_until('Argon', 'Deprecated'))\n")
+    assert new_code == "new_function(warn_until(3008, 'Deprecated'))\n"
+
+
+def test_subsets():
+    subsets = Registry.get_module("fix_legacy_decorators").SUBSETS
+    names = [name for name, _ in Registry.fixes()]
+    assert "fix_legacy_decorators" in names
+    assert not set(subsets).intersection(names)
+    # Excluding one of the subsets runs the others instead
+    names = [name for name, _ in Registry.fixes(excluded_names=("fix_slow_test_decorator",))]
+    assert "fix_legacy_decorators" not in names
+    assert set(subsets).intersection(names) == set(subsets) - {"fix_slow_test_decorator"}
+    # Excluding the fix excludes its subsets too
+    names = [name for name, _ in Registry.fixes(excluded_names=("fix_legacy_decorators",))]
+    assert not {"fix_legacy_decorators", *subsets}.intersection(names)
+    names = [name for name, _ in Registry.fixes(only_names=subsets[:2])]
+    assert names == list(subsets[:2])
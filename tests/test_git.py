@@ -0,0 +1,73 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import subprocess
+
+import pytest
+from saltrewrite import git
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=salt", "-c", "user.email=salt@localhost", *args],
+        cwd=repo,
+        check=True,
+        stdout=subprocess.PIPE,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    tmp_path.joinpath("salt", "modules").mkdir(parents=True)
+    tmp_path.joinpath("tests").mkdir()
+    for name in ("salt/modules/foo.py", "salt/modules/bar.py", "tests/test_foo.py", "README"):
+        tmp_path.joinpath(name).write_text("")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "Initial commit")
+    return tmp_path
+
+
+def test_since(repo):
+    repo.joinpath("salt", "modules", "foo.py").write_text("import os\n")
+    repo.joinpath("tests", "test_foo.py").write_text("import os\n")
+    repo.joinpath("README").write_text("Changed")
+    assert git.get_changed_files(since="HEAD", cwd=repo) == [
+        "salt/modules/foo.py",
+        "tests/test_foo.py",
+    ]
+
+
+def test_since_committed_and_deleted(repo):
+    repo.joinpath("salt", "modules", "foo.py").write_text("import os\n")
+    repo.joinpath("salt", "modules", "bar.py").unlink()
+    _git(repo, "commit", "-q", "-a", "-m", "Second commit")
+    assert git.get_changed_files(since="HEAD~1", cwd=repo) == ["salt/modules/foo.py"]
+
+
+def test_staged(repo):
+    repo.joinpath("salt", "modules", "foo.py").write_text("import os\n")
+    repo.joinpath("tests", "test_foo.py").write_text("import os\n")
+    _git(repo, "add", "tests/test_foo.py")
+    assert git.get_changed_files(staged=True, cwd=repo) == ["tests/test_foo.py"]
+
+
+def test_paths_and_subdirectory(repo):
+    repo.joinpath("salt", "modules", "foo.py").write_text("import os\n")
+    repo.joinpath("tests", "test_foo.py").write_text("import os\n")
+    assert git.get_changed_files(since="HEAD", paths=["tests"], cwd=repo) == ["tests/test_foo.py"]
+    assert git.get_changed_files(since="HEAD", cwd=repo / "salt") == [
+        "../tests/test_foo.py",
+        "modules/foo.py",
+    ]
+
+
+def test_symlinked_checkout(repo, tmp_path_factory):
+    link = tmp_path_factory.mktemp("link") / "checkout"
+    link.symlink_to(repo, target_is_directory=True)
+    repo.joinpath("tests", "test_foo.py").write_text("import os\n")
+    assert git.get_changed_files(since="HEAD", cwd=link) == ["tests/test_foo.py"]
+    assert git.get_changed_files(since="HEAD", paths=["tests"], cwd=link) == ["tests/test_foo.py"]
+
+
+def test_bad_revision(repo):
+    with pytest.raises(RuntimeError):
+        git.get_changed_files(since="not-a-revision", cwd=repo)
@@ -0,0 +1,79 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import json
+import textwrap
+
+import pytest
+from fissix import pygram
+from fissix import pytree
+from fissix.pgen2.driver import Driver
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import Registry
+from saltrewrite.profiling import Profiler
+
+CODE = textwrap.dedent(
+    """
+    from unittest import TestCase
+
+    class TestFoo(TestCase):
+
+        def test_one(self):
+            warn_until("Argon", "Deprecated")
+            self.assertEqual(1, 1)
+            self.assertTrue(True)
+    """
+)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_profile(tempfiles, jobs):
+    fpaths = [tempfiles.makepyfile(CODE, prefix="test_"), tempfiles.makepyfile("import os\n")]
+    engine = Engine(
+        Registry.fixes(only_names=("fix_asserts", "fix_warn_until")),
+        silent=True,
+        profiler=Profiler(),
+    )
+    assert engine.run(fpaths, jobs=jobs) == 0
+    report = engine.profiler.report()
+    assert report["totals"]["files"] == 2
+    entry = next(entry for entry in report["files"] if entry["filename"] == fpaths[0])
+    assert entry["total"] > 0
+    assert entry["write"] > 0
+    # The pattern matches include the nodes which are not modified, like the TestCase class
+    assert entry["fixes"]["fix_asserts"]["matches"] >= 2
+    assert entry["fixes"]["fix_asserts"]["modifications"] == 2
+    assert entry["fixes"]["fix_warn_until"]["modifications"] == 1
+    assert report["fixes"]["fix_asserts"]["files"] == 1
+    # The file no fix applies to is only read
+    entry = next(entry for entry in report["files"] if entry["filename"] == fpaths[1])
+    assert entry["fixes"] == {}
+    assert entry["parse"] == 0
+
+
+def test_profile_unchanged_nodes():
+    profiler = Profiler()
+    profiler.start_file("test_foo.py")
+    tree = Driver(pygram.python_grammar, convert=pytree.convert).parse_string("foo(1)\n")
+    node = tree.children[0].children[0]
+
+    def unchanged(node, capture, filename):
+        return None
+
+    def rename(node, capture, filename):
+        node.children[0].value = "bar"
+
+    for callback in (unchanged, rename, unchanged):
+        profiler.wrap_callback("fix_foo", callback)(node, {}, "test_foo.py")
+    assert profiler.files["test_foo.py"]["fixes"]["fix_foo"]["modifications"] == 1
+
+
+def test_profile_report(tempfiles, tmp_path):
+    fpath = tempfiles.makepyfile(CODE, prefix="test_")
+    engine = Engine(Registry.fixes(only_names=("fix_asserts",)), silent=True, profiler=Profiler())
+    engine.run([fpath])
+    engine.profiler.write(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json") as rfh:
+        assert json.load(rfh)["files"][0]["filename"] == fpath
+    table = engine.profiler.format_report(top=1)
+    assert "Slowest 1 files:" in table
+    assert fpath in table
+    assert "fix_asserts" in table
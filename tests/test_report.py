@@ -0,0 +1,112 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import io
+import json
+import textwrap
+
+import pytest
+from saltrewrite.engine import Change
+from saltrewrite.engine import Engine
+from saltrewrite.fixes import Registry
+from saltrewrite.report import get_reporter
+
+CODE = textwrap.dedent(
+    """
+    import os
+
+    warn_until("Argon", "Deprecated")
+    """
+)
+
+CHANGES = [
+    Change(("fix_warn_until",), 4, 5, 'warn_until("Argon", "Deprecated")\n', ""),
+    Change(("fix_dunder_utils",), 2, 2, "", "import salt.utils.foo\n"),
+]
+
+
+def _report(name, files):
+    stream = io.StringIO()
+    reporter = get_reporter(
+        name, stream, rules=[("fix_warn_until", "Fix warn_until")], version="1.0"
+    )
+    reporter.start()
+    for filename, changes in files:
+        reporter.add_file(filename, changes)
+    reporter.finish()
+    return stream.getvalue()
+
+
+def test_json():
+    report = json.loads(_report("json", [("foo.py", CHANGES), ("bar.py", CHANGES[:1])]))
+    assert report["version"] == "1.0"
+    assert [entry["filename"] for entry in report["files"]] == ["foo.py", "bar.py"]
+    assert report["files"][0]["changes"][1] == {
+        "fixes": ["fix_dunder_utils"],
+        "start": 2,
+        "end": 2,
+        "before": "",
+        "after": "import salt.utils.foo\n",
+    }
+    assert json.loads(_report("json", [])) == {"version": "1.0", "files": []}
+
+
+def test_ndjson():
+    lines = _report("ndjson", [("foo.py", CHANGES), ("bar.py", CHANGES[:1])]).splitlines()
+    assert [json.loads(line)["filename"] for line in lines] == ["foo.py", "bar.py"]
+    assert json.loads(lines[1])["changes"][0]["fixes"] == ["fix_warn_until"]
+    assert _report("ndjson", []) == ""
+
+
+def test_sarif():
+    report = json.loads(_report("sarif", [("foo.py", CHANGES), ("/tmp/bar.py", CHANGES[:1])]))
+    assert report["version"] == "2.1.0"
+    run = report["runs"][0]
+    assert run["tool"]["driver"]["version"] == "1.0"
+    assert run["tool"]["driver"]["rules"] == [
+        {"id": "fix_warn_until", "shortDescription": {"text": "Fix warn_until"}}
+    ]
+    results = run["results"]
+    assert [result["ruleId"] for result in results] == [
+        "fix_warn_until",
+        "fix_dunder_utils",
+        "fix_warn_until",
+    ]
+    location = results[0]["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"] == {"uri": "foo.py"}
+    assert location["region"] == {"startLine": 4, "endLine": 4}
+    replacement = results[1]["fixes"][0]["artifactChanges"][0]["replacements"][0]
+    assert replacement["deletedRegion"] == {
+        "startLine": 2,
+        "startColumn": 1,
+        "endLine": 2,
+        "endColumn": 1,
+    }
+    assert replacement["insertedContent"] == {"text": "import salt.utils.foo\n"}
+    uri = results[2]["locations"][0]["physicalLocation"]["artifactLocation"]["uri"]
+    assert uri == "file:///tmp/bar.py"
+    assert json.loads(_report("sarif", []))["runs"][0]["results"] == []
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_engine_report(tempfiles, jobs):
+    fpaths = [tempfiles.makepyfile(CODE), tempfiles.makepyfile("import os\n")]
+    stream = io.StringIO()
+    reporter = get_reporter("ndjson", stream)
+    engine = Engine(
+        Registry.fixes(only_names=("fix_warn_until",)), silent=True, check=True, reporter=reporter
+    )
+    assert engine.run(fpaths, jobs=jobs) == 1
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert entries == [
+        {
+            "filename": fpaths[0],
+            "changes": [
+                {
+                    "fixes": ["fix_warn_until"],
+                    "start": 4,
+                    "end": 5,
+                    "before": 'warn_until("Argon", "Deprecated")\n',
+                    "after": 'warn_until(3008, "Deprecated")\n',
+                }
+            ],
+        }
+    ]
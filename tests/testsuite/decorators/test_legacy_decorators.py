@@ -0,0 +1,313 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring
+import textwrap
+
+from saltrewrite.api import rewrite_source
+from saltrewrite.testsuite import fix_legacy_decorators
+
+CODE = textwrap.dedent(
+    """
+    from unittest import TestCase
+    from tests.support.helpers import destructiveTest, requires_network, slowTest
+
+    @destructiveTest
+    class TestFoo(TestCase):
+
+        @requires_network()
+        @slowTest
+        def test_one(self):
+            assert True
+    """
+)
+
+
+def test_all_decorators(tempfiles):
+    expected_code = textwrap.dedent(
+        """
+    from unittest import TestCase
+
+    import pytest
+
+    @pytest.mark.destructive_test
+    class TestFoo(TestCase):
+
+        @pytest.mark.requires_network()
+        @pytest.mark.slow_test
+        def test_one(self):
+            assert True
+    """
+    )
+    fpath = tempfiles.makepyfile(CODE, prefix="test_")
+    fix_legacy_decorators.rewrite(fpath)
+    with open(fpath) as rfh:
+        new_code = rfh.read()
+    assert new_code == expected_code
+
+
+def test_same_as_subsets():
+    new_code, changes = rewrite_source(
+        CODE, fixes=("fix_legacy_decorators",), filename="tests/test_foo.py"
+    )
+    subsets_code, _ = rewrite_source(
+        CODE, fixes=fix_legacy_decorators.SUBSETS, filename="tests/test_foo.py"
+    )
+    assert new_code == subsets_code
+    assert {change.fixes for change in changes} == {("fix_legacy_decorators",)}
+
+
+def test_subset(tempfiles):
+    expected_code = textwrap.dedent(
+        """
+    from unittest import TestCase
+    from tests.support.helpers import destructiveTest, requires_network
+    import pytest
+
+    @destructiveTest
+    class TestFoo(TestCase):
+
+        @requires_network()
+        @pytest.mark.slow_test
+        def test_one(self):
+            assert True
+    """
+    )
+    new_code, _ = rewrite_source(
+        CODE, fixes=("fix_slow_test_decorator",), filename="tests/test_foo.py"
+    )
+    assert new_code == expected_code
+
+
+def test_hoist_markers(monkeypatch):
+    monkeypatch.setenv("SALT_REWRITE_HOIST_MARKERS", "1")
+    code = textwrap.dedent(
+        """
+    import pytest
+    from tests.support.helpers import destructiveTest, requires_salt_modules, slowTest
+    from tests.support.unit import TestCase
+
+
+    @slowTest
+    @requires_salt_modules("cmd.run")
+    def test_one():
+        pass
+
+
+    @requires_salt_modules("cmd.run")
+    @slowTest
+    def test_two():
+        pass
+
+
+    @slowTest
+    class FooTestCase(TestCase):
+        \"""
+        Class docs
+        \"""
+
+        @destructiveTest
+        def test_three(self):
+            pass
+
+        @pytest.mark.parametrize("x", [1])
+        @destructiveTest
+        def test_four(self, x):
+            pass
+
+
+    @slowTest
+    class BarTestCase(FooTestCase):
+
+        @destructiveTest
+        def test_five(self):
+            pass
+
+        @destructiveTest
+        def test_six(self):
+            pass
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    import pytest
+
+    from tests.support.unit import TestCase
+
+    pytestmark = [
+        pytest.mark.slow_test,
+    ]
+
+
+    @pytest.mark.requires_salt_modules("cmd.run")
+    def test_one():
+        pass
+
+
+    @pytest.mark.requires_salt_modules("cmd.run")
+    def test_two():
+        pass
+
+
+    class FooTestCase(TestCase):
+        \"""
+        Class docs
+        \"""
+
+        @pytest.mark.destructive_test
+        def test_three(self):
+            pass
+
+        @pytest.mark.parametrize("x", [1])
+        @pytest.mark.destructive_test
+        def test_four(self, x):
+            pass
+
+
+    class BarTestCase(FooTestCase):
+
+        @pytest.mark.destructive_test
+        def test_five(self):
+            pass
+
+        @pytest.mark.destructive_test
+        def test_six(self):
+            pass
+    """
+    )
+    new_code, _ = rewrite_source(
+        code, fixes=("fix_legacy_decorators",), filename="tests/test_foo.py"
+    )
+    assert new_code == expected_code
+    # Hoisting the shared markers is optional
+    monkeypatch.delenv("SALT_REWRITE_HOIST_MARKERS")
+    new_code, _ = rewrite_source(
+        code, fixes=("fix_legacy_decorators",), filename="tests/test_foo.py"
+    )
+    assert "pytestmark" not in new_code
+
+
+def test_hoist_markers_subclassed_class(monkeypatch):
+    monkeypatch.setenv("SALT_REWRITE_HOIST_MARKERS", "1")
+    code = textwrap.dedent(
+        """
+    from tests.support.helpers import slowTest
+
+
+    class BaseTest:
+
+        @slowTest
+        def test_one(self):
+            pass
+
+        @slowTest
+        def test_two(self):
+            pass
+
+
+    class SubTest(BaseTest):
+
+        def test_fast(self):
+            pass
+    """
+    )
+    new_code, _ = rewrite_source(
+        code, fixes=("fix_legacy_decorators",), filename="tests/test_foo.py"
+    )
+    # The pytestmark of BaseTest would also mark the tests of SubTest
+    assert "pytestmark" not in new_code
+    assert new_code.count("@pytest.mark.slow_test") == 2
+
+
+def test_hoist_markers_imported_base_class(monkeypatch):
+    monkeypatch.setenv("SALT_REWRITE_HOIST_MARKERS", "1")
+    code = textwrap.dedent(
+        """
+    from tests.support.case import ModuleCase
+    from tests.support.helpers import slowTest
+    from tests.support.mixins import SharedTestsMixin
+
+
+    class Helper:
+
+        def run_it(self):
+            pass
+
+
+    class FooTest(SharedTestsMixin, ModuleCase):
+
+        @slowTest
+        def test_one(self):
+            pass
+
+        @slowTest
+        def test_two(self):
+            pass
+
+
+    class BarTest(Helper, ModuleCase):
+
+        @slowTest
+        def test_three(self):
+            pass
+
+        @slowTest
+        def test_four(self):
+            pass
+    """
+    )
+    new_code, _ = rewrite_source(
+        code, fixes=("fix_legacy_decorators",), filename="tests/test_foo.py"
+    )
+    # The mixin's tests would also be marked by FooTest's pytestmark
+    assert new_code.count("pytestmark") == 1
+    assert new_code.count("@pytest.mark.slow_test") == 2
+    # While the module's Helper class defines no tests
+    assert "pytestmark" in new_code.split("class BarTest")[1]
+
+
+def test_hoist_markers_nested_tests(monkeypatch):
+    monkeypatch.setenv("SALT_REWRITE_HOIST_MARKERS", "1")
+    code = textwrap.dedent(
+        """
+    import sys
+
+    from tests.support.helpers import slowTest
+
+
+    @slowTest
+    def test_one():
+        pass
+
+
+    @slowTest
+    def test_two():
+        pass
+
+
+    if sys.platform.startswith("linux"):
+
+        def test_fast():
+            pass
+
+
+    @slowTest
+    class TestFoo:
+
+        @slowTest
+        def test_three(self):
+            pass
+
+        @slowTest
+        def test_four(self):
+            pass
+
+        class TestNested:
+
+            def test_fast(self):
+                pass
+    """
+    )
+    new_code, _ = rewrite_source(
+        code, fixes=("fix_legacy_decorators",), filename="tests/test_foo.py"
+    )
+    # The module's and TestFoo's pytestmark would also mark the test_fast tests
+    assert "pytestmark" not in new_code
+    assert new_code.count("@pytest.mark.slow_test") == 5
@@ -1796,3 +1796,41 @@ def test_assert_not_regex(tempfiles):
     with open(fpath) as rfh:
         new_code = rfh.read()
     assert new_code == expected_code
+
+
+def test_unknown_methods_and_definitions(tempfiles):
+    code = textwrap.dedent(
+        """
+    from unittest import TestCase
+
+    class TestMe(TestCase):
+
+        def assertEqual(self, first, second, msg=None):
+            pass
+
+        def test_one(self):
+            self.assertCountEqual([1, 2], [2, 1])
+            self.helper.assertEqual(1, 1)
+            helper.assertRaises(ValueError, func)
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    from unittest import TestCase
+
+    class TestMe(TestCase):
+
+        def assertEqual(self, first, second, msg=None):
+            pass
+
+        def test_one(self):
+            self.assertCountEqual([1, 2], [2, 1])
+            assert 1 == 1
+            helper.assertRaises(ValueError, func)
+    """
+    )
+    fpath = tempfiles.makepyfile(code, prefix="test_")
+    fix_asserts.rewrite(fpath)
+    with open(fpath) as rfh:
+        new_code = rfh.read()
+    assert new_code == expected_code
@@ -0,0 +1,97 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import logging
+import textwrap
+
+import pytest
+from fissix import pygram
+from fissix import pytree
+from fissix.pgen2.driver import Driver
+from saltrewrite import utils
+from saltrewrite.api import rewrite_source
+
+log = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def driver():
+    return Driver(pygram.python_grammar, convert=pytree.convert, logger=log)
+
+
+def test_imports_ledger(driver):
+    code = textwrap.dedent(
+        """
+    import os
+    from tests.support.helpers import slowTest, destructiveTest
+
+    os.getcwd()
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    import os
+
+    import pytest
+
+    os.getcwd()
+    """
+    )
+    tree = driver.parse_string(code)
+    with utils.deferred_imports() as imports:
+        for name in ("slowTest", "destructiveTest"):
+            utils.ensure_import(None, "pytest", tree)
+            utils.discard_from_import(tree, "tests.support.helpers", name)
+        # Nothing changes until the ledger is applied
+        assert str(tree) == code
+        assert list(imports.operations) == [
+            ("touch", None, "pytest"),
+            ("remove_from", "tests.support.helpers", "slowTest"),
+            ("remove_from", "tests.support.helpers", "destructiveTest"),
+        ]
+        imports.apply(tree)
+    assert str(tree) == expected_code
+    assert not imports.operations
+
+
+def test_immediate_imports(driver):
+    tree = driver.parse_string("import os\n")
+    utils.ensure_import(None, "pytest", tree)
+    assert str(tree) == "import os\nimport pytest\n"
+
+
+def test_engine_defers_imports():
+    code = textwrap.dedent(
+        """
+    from unittest import TestCase
+    from tests.support.helpers import slowTest
+
+    class TestMe(TestCase):
+
+        @slowTest
+        def test_one(self):
+            self.assertAlmostEqual(1.0, 1.0)
+            with self.assertRaises(ValueError):
+                pass
+            self.assertRegex("foo", "^f")
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    from unittest import TestCase
+    import re
+
+    import pytest
+
+    class TestMe(TestCase):
+
+        @pytest.mark.slow_test
+        def test_one(self):
+            assert 1.0 == pytest.approx(1.0, abs=1e-7)
+            with pytest.raises(ValueError):
+                pass
+            assert re.search("^f", "foo")
+    """
+    )
+    new_code, _ = rewrite_source(
+        code, fixes=("fix_slow_test_decorator", "fix_asserts"), filename="tests/test_foo.py"
+    )
+    assert new_code == expected_code
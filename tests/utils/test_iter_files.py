@@ -0,0 +1,96 @@
+# pylint: disable=missing-module-docstring,missing-function-docstring,redefined-outer-name
+import os
+import textwrap
+
+import pytest
+from saltrewrite import utils
+from saltrewrite.testsuite import fix_slow_test_decorator
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in (
+        "salt/modules/foo.py",
+        "salt/modules/README",
+        "tests/unit/test_foo.py",
+        "tests/unit/conftest.py",
+        "tests/unit/.hidden/test_hidden.py",
+        "tests/integration/test_bar.py",
+        "tests/integration/bar_test.py",
+    ):
+        path = tmp_path.joinpath(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    return tmp_path
+
+
+def _relative(tree, paths):
+    return [os.path.relpath(path, tree) for path in paths]
+
+
+def test_iter_python_files(tree):
+    assert _relative(tree, utils.iter_python_files([str(tree)])) == [
+        "salt/modules/foo.py",
+        "tests/integration/bar_test.py",
+        "tests/integration/test_bar.py",
+        "tests/unit/conftest.py",
+        "tests/unit/test_foo.py",
+    ]
+
+
+def test_iter_python_files_exclude(tree):
+    assert _relative(tree, utils.iter_python_files([str(tree)], exclude=["integration"])) == [
+        "salt/modules/foo.py",
+        "tests/unit/conftest.py",
+        "tests/unit/test_foo.py",
+    ]
+    assert _relative(tree, utils.iter_python_files([str(tree)], exclude=["*/salt/*"])) == [
+        "tests/integration/bar_test.py",
+        "tests/integration/test_bar.py",
+        "tests/unit/conftest.py",
+        "tests/unit/test_foo.py",
+    ]
+
+
+def test_filter_test_files(tree):
+    assert _relative(tree, utils.filter_test_files(str(tree / "tests"))) == [
+        "tests/integration/test_bar.py",
+        "tests/unit/test_foo.py",
+    ]
+    assert _relative(
+        tree, utils.filter_test_files(str(tree / "tests"), patterns=["test_*.py", "*_test.py"])
+    ) == [
+        "tests/integration/bar_test.py",
+        "tests/integration/test_bar.py",
+        "tests/unit/test_foo.py",
+    ]
+    assert _relative(tree, utils.filter_test_files(str(tree / "tests"), exclude=["unit"])) == [
+        "tests/integration/test_bar.py",
+    ]
+
+
+def test_rewrite_directory(tree):
+    code = textwrap.dedent(
+        """
+    import pytest
+    from tests.support.helpers import slowTest
+
+    @slowTest
+    def test_one():
+        assert True
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    import pytest
+
+
+    @pytest.mark.slow_test
+    def test_one():
+        assert True
+    """
+    )
+    fpath = tree / "tests" / "unit" / "test_foo.py"
+    fpath.write_text(code)
+    fix_slow_test_decorator.rewrite(str(tree / "tests"))
+    assert fpath.read_text() == expected_code
@@ -6,6 +6,10 @@ import pytest
 from fissix import pygram
 from fissix import pytree
 from fissix.pgen2.driver import Driver
+from saltrewrite.utils import deferred_imports
+from saltrewrite.utils import ensure_import
+from saltrewrite.utils import get_import_index
+from saltrewrite.utils import invalidate_import_index
 from saltrewrite.utils import remove_from_import
 from saltrewrite.utils import remove_import
 
@@ -28,7 +32,6 @@ def test_remove_package_import(driver):
     assert str(tree).strip() == ""
 
 
-@pytest.mark.xfail(strict=True)
 def test_remove_package_import_dotted(driver):
     code = textwrap.dedent(
         """
@@ -60,3 +63,130 @@ def test_remove_from_import_multiple(driver):
     tree = driver.parse_string(code)
     remove_from_import(tree, "tests.support.helpers", "destructiveTest")
     assert str(tree).strip() == "from tests.support.helpers import dedent"
+
+
+def test_remove_from_import_multiple_remaining(driver):
+    code = textwrap.dedent(
+        """
+    from tests.support.helpers import destructiveTest, dedent, slowTest
+    """
+    )
+    tree = driver.parse_string(code)
+    remove_from_import(tree, "tests.support.helpers", "destructiveTest")
+    assert str(tree).strip() == "from tests.support.helpers import dedent, slowTest"
+
+
+def test_remove_package_import_aliased(driver):
+    code = textwrap.dedent(
+        """
+    import os, tests.support.helpers as helpers
+    """
+    )
+    tree = driver.parse_string(code)
+    remove_import(tree, "helpers")
+    assert str(tree).strip() == "import os"
+    # Aliased imports don't bind the name of what they import
+    tree = driver.parse_string(code)
+    remove_import(tree, "tests.support.helpers")
+    assert str(tree) == code
+
+
+def test_remove_import_keeps_aliased_import(driver):
+    code = textwrap.dedent(
+        """
+    import a as b
+    import a.c as d
+    """
+    )
+    tree = driver.parse_string(code)
+    remove_import(tree, "a")
+    remove_import(tree, "a.c")
+    assert str(tree) == code
+    remove_import(tree, "b")
+    assert str(tree).strip() == "import a.c as d"
+
+
+def test_remove_from_import_aliased(driver):
+    code = textwrap.dedent(
+        """
+    from tests.support.helpers import destructiveTest as destructive, slowTest as slow
+    """
+    )
+    tree = driver.parse_string(code)
+    remove_from_import(tree, "tests.support.helpers", "destructiveTest")
+    assert str(tree).strip() == "from tests.support.helpers import slowTest as slow"
+    remove_import(tree, "slow")
+    assert str(tree).strip() == ""
+
+
+def test_remove_from_import_parenthesized(driver):
+    code = textwrap.dedent(
+        """
+    from tests.support.helpers import (
+        dedent,
+        destructiveTest,
+        slowTest,
+    )
+    """
+    )
+    expected_code = textwrap.dedent(
+        """
+    from tests.support.helpers import (
+        dedent,
+        slowTest,
+    )
+    """
+    )
+    tree = driver.parse_string(code)
+    remove_from_import(tree, "tests.support.helpers", "destructiveTest")
+    assert str(tree) == expected_code
+
+
+def test_import_index(driver):
+    code = textwrap.dedent(
+        """
+    import os
+    try:
+        from tests.support.helpers import slowTest
+    except ImportError:
+        pass
+
+    def func():
+        from tests.support.helpers import destructiveTest
+    """
+    )
+    tree = driver.parse_string(code)
+    index = get_import_index(tree)
+    assert get_import_index(tree.children[0]) is index
+    assert index.find("slowTest", package="tests.support.helpers") is not None
+    # Only the imports find_binding() would find are indexed
+    assert index.find("destructiveTest", package="tests.support.helpers") is None
+    assert index.find("pytest") is None
+    # The imports added afterwards are picked up
+    ensure_import(None, "pytest", tree)
+    assert index.find("pytest") is not None
+    remove_import(tree, "pytest")
+    assert index.find("pytest") is None
+
+
+def test_import_index_replaced_import(driver):
+    code = textwrap.dedent(
+        """
+    import os
+    import sys
+    """
+    )
+    tree = driver.parse_string(code)
+    index = get_import_index(tree)
+    assert index.find("os") is not None
+    # The module keeps as many top level statements
+    tree.children[0].replace(driver.parse_string("import pytest\n").children[0])
+    invalidate_import_index(tree)
+    assert index.find("os") is None
+    assert index.find("pytest") is not None
+    with deferred_imports() as ledger:
+        ensure_import(None, "re", tree)
+        ledger.remove_from_import(None, "pytest")
+    ledger.apply(tree)
+    assert index.find("re") is not None
+    assert str(tree) == "\nimport sys\nimport re\n"